@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+from dataclasses import dataclass
+from email.message import EmailMessage
+from pathlib import Path
+
+import numpy as np
+
+import gold_alert
+import passbook_query
+import passbook_store
+
+
+RULES_PATH = Path("alert_rules.csv")
+RULE_COLUMNS = ("Rule_ID", "Condition")
+SIGMA_WINDOW = 60
+SIGMA_MIN_DAYS = 10
+SIGMA_LOOKBACK_DAYS = 100
+BLOCK_ELEMENTS = 4_000_000
+BASE_FIELDS = tuple(name for name in passbook_store.COLUMNS if name != "captured_at")
+DERIVED_FIELDS = (
+    "pm_1g_premium_pct",
+    "pm_5g_premium_pct",
+    "taobao_1g_premium_pct",
+    "ma50_distance_pct",
+    "ma200_distance_pct",
+    "daily_move_sigma",
+    "taobao_age_days",
+)
+FIELDS = BASE_FIELDS + DERIVED_FIELDS
+FIELD_INDEX = {name: index for index, name in enumerate(FIELDS)}
+SIGNS = {
+    "<": (True, False, False),
+    "<=": (True, True, False),
+    ">": (False, False, True),
+    ">=": (False, True, True),
+    "==": (False, True, False),
+    "!=": (True, False, True),
+    "crosses_above": (False, False, True),
+    "crosses_below": (True, False, False),
+}
+CROSS_DIRECTIONS = {"crosses_above": 1.0, "crosses_below": -1.0}
+CLAUSE_PATTERN = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|crosses_above\b|crosses_below\b)\s*(\S+)\s*$")
+AND_PATTERN = re.compile(r"\s+and\s+", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    rule_id: str
+    condition: str
+    recipients: tuple[tuple[str, str], ...] = ()
+    label: str = ""
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledRules:
+    rules: tuple[AlertRule, ...]
+    clause_table: np.ndarray
+    lhs: np.ndarray
+    rhs_field: np.ndarray
+    rhs_value: np.ndarray
+    allowed: np.ndarray
+    direction: np.ndarray
+
+
+def parse_condition(condition: str) -> list[tuple[str, str, str | float]]:
+    clauses = []
+    for text in AND_PATTERN.split(condition.strip()):
+        match = CLAUSE_PATTERN.match(text)
+        if match is None:
+            raise ValueError(f"Cannot parse condition clause: {text.strip() or condition}")
+        field, operator, operand = match.groups()
+        if field not in FIELD_INDEX:
+            raise ValueError(f"Unknown field: {field}")
+        try:
+            value: str | float = float(operand)
+        except ValueError:
+            if operand not in FIELD_INDEX:
+                raise ValueError(f"Unknown field: {operand}") from None
+            value = operand
+        clauses.append((field, operator, value))
+    return clauses
+
+
+def compile_rules(rules: list[AlertRule]) -> CompiledRules:
+    unique: dict[tuple[str, str, str | float], int] = {}
+    indexes = [[unique.setdefault(clause, len(unique)) for clause in parse_condition(rule.condition)] for rule in rules]
+    clauses = list(unique)
+    width = max((len(row) for row in indexes), default=0)
+    return CompiledRules(
+        tuple(rules),
+        np.array([row + [len(clauses)] * (width - len(row)) for row in indexes], dtype="int64").reshape(-1, width),
+        np.array([FIELD_INDEX[field] for field, _, _ in clauses], dtype="int64"),
+        np.array([FIELD_INDEX[value] if isinstance(value, str) else -1 for _, _, value in clauses], dtype="int64"),
+        np.array([value if isinstance(value, float) else np.nan for _, _, value in clauses], dtype="float64"),
+        np.array([SIGNS[operator] for _, operator, _ in clauses], dtype=bool).reshape(-1, 3),
+        np.array([CROSS_DIRECTIONS.get(operator, 0.0) for _, operator, _ in clauses], dtype="float64"),
+    )
+
+
+def rolling_sigma(values: np.ndarray, days: np.ndarray, window: int = SIGMA_WINDOW) -> np.ndarray:
+    valid = np.flatnonzero(~np.isnan(values))
+    valid_days = days[valid]
+    last_of_day = valid[np.append(valid_days[1:] != valid_days[:-1], True)]
+    daily = values[last_of_day]
+    sums = np.concatenate(([0.0], np.cumsum(daily)))
+    squares = np.concatenate(([0.0], np.cumsum(daily * daily)))
+    end = np.searchsorted(days[last_of_day], days, side="left")
+    start = np.maximum(end - window, 0)
+    count = end - start
+    total = sums[end] - sums[start]
+    variance = (squares[end] - squares[start] - total * total / np.maximum(count, 1)) / np.maximum(count - 1, 1)
+    sigma = np.sqrt(np.maximum(variance, 0.0))
+    return np.where((count >= SIGMA_MIN_DAYS) & (sigma > 0), sigma, np.nan)
+
+
+def field_matrix(columns: dict[str, np.ndarray]) -> np.ndarray:
+    rows = len(columns["captured_at"])
+    base = {name: np.asarray(columns.get(name, np.full(rows, np.nan)), dtype="float64") for name in BASE_FIELDS}
+    spot = base["spot_aud"]
+    days = passbook_query.bucket_labels(columns["captured_at"], "D")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derived = {
+            "pm_1g_premium_pct": gold_alert.premium_pct(base["pm_1g"], 1, spot),
+            "pm_5g_premium_pct": gold_alert.premium_pct(base["pm_5g"], 5, spot),
+            "taobao_1g_premium_pct": gold_alert.premium_pct(base["taobao_1g_cny"], 1, base["spot_cny"]),
+            "ma50_distance_pct": (spot / base["ma50_aud"] - 1) * 100,
+            "ma200_distance_pct": (spot / base["ma200_aud"] - 1) * 100,
+            "daily_move_sigma": np.abs(base["daily_change_pct"]) / rolling_sigma(base["daily_change_pct"], days),
+            "taobao_age_days": days.astype("float64") - base["taobao_checked_day"],
+        }
+    return np.vstack([base[name] for name in BASE_FIELDS] + [derived[name] for name in DERIVED_FIELDS])
+
+
+def evaluate(compiled: CompiledRules, columns: dict[str, np.ndarray]) -> np.ndarray:
+    values = field_matrix(columns)
+    rows = values.shape[1]
+    result = np.zeros((len(compiled.rules), rows), dtype=bool)
+    if not len(compiled.rules) or not rows:
+        return result
+    fields = np.flatnonzero(compiled.rhs_field >= 0)
+    constants = np.flatnonzero(compiled.rhs_field < 0)
+    crosses = np.flatnonzero(compiled.direction != 0)
+    block = max(BLOCK_ELEMENTS // compiled.clause_table.size, 1)
+    for low in range(0, rows, block):
+        high = min(low + block, rows)
+        window = values[:, max(low - 1, 0):high]
+        difference = window[compiled.lhs]
+        difference[fields] -= window[compiled.rhs_field[fields]]
+        difference[constants] -= compiled.rhs_value[constants, None]
+        matches = (
+            (difference < 0) & compiled.allowed[:, :1]
+            | (difference == 0) & compiled.allowed[:, 1:2]
+            | (difference > 0) & compiled.allowed[:, 2:]
+        )
+        previous = difference[crosses, :-1] * compiled.direction[crosses, None] <= 0
+        matches[crosses] &= np.concatenate((np.zeros((len(crosses), 1), dtype=bool), previous), axis=1)
+        matches = np.vstack((matches, np.ones((1, matches.shape[1]), dtype=bool)))[:, -(high - low):]
+        combined = matches[compiled.clause_table[:, 0]]
+        for column in range(1, compiled.clause_table.shape[1]):
+            combined &= matches[compiled.clause_table[:, column]]
+        result[:, low:high] = combined
+    return result
+
+
+def snapshot_columns(
+    snapshot: gold_alert.MarketSnapshot,
+    history: dict[str, np.ndarray] | None = None,
+    lookback_days: int = SIGMA_LOOKBACK_DAYS,
+) -> dict[str, np.ndarray]:
+    history = history if history is not None else passbook_store.open_store()
+    now = passbook_store.timestamp_ns(snapshot.captured_at)
+    cutoff = int(np.searchsorted(history["captured_at"], now - lookback_days * passbook_query.DAY_NS))
+    first = max(min(cutoff, len(history["captured_at"]) - 1), 0)
+    times = np.asarray(history["captured_at"][first:], dtype="int64")
+    columns = {"captured_at": np.append(times, now)}
+    current = passbook_store.snapshot_row(snapshot)
+    for name in BASE_FIELDS:
+        past = np.asarray(history[name][first:], dtype="float64") if name in history else np.full(len(times), np.nan)
+        columns[name] = np.append(past, current[name])
+    return columns
+
+
+def load_rules(path: Path | None = None) -> list[AlertRule]:
+    path = path or RULES_PATH
+    if not path.exists():
+        return []
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        if not set(RULE_COLUMNS).issubset(reader.fieldnames or []):
+            raise RuntimeError(f"{path} must contain columns: {', '.join(RULE_COLUMNS)}")
+        rules = []
+        seen = set()
+        for line, row in enumerate(reader, start=2):
+            rule_id = (row["Rule_ID"] or "").strip()
+            condition = (row["Condition"] or "").strip()
+            if not rule_id or rule_id in seen:
+                raise RuntimeError(f"{path} line {line}: Rule_ID must be present and unique")
+            try:
+                parse_condition(condition)
+                recipients = tuple(gold_alert.parse_recipients(row.get("Recipients") or ""))
+            except (ValueError, RuntimeError) as error:
+                raise RuntimeError(f"{path} line {line}: {error}") from None
+            seen.add(rule_id)
+            rules.append(AlertRule(rule_id, condition, recipients, (row.get("Label") or "").strip() or rule_id))
+    return rules
+
+
+def fired_rules(
+    compiled: CompiledRules,
+    snapshot: gold_alert.MarketSnapshot,
+    history: dict[str, np.ndarray] | None = None,
+) -> list[AlertRule]:
+    matches = evaluate(compiled, snapshot_columns(snapshot, history))
+    if not matches.size:
+        return []
+    fired = matches[:, -1] & ~matches[:, -2] if matches.shape[1] > 1 else matches[:, -1]
+    return [compiled.rules[index] for index in np.flatnonzero(fired)]
+
+
+def build_rule_message(
+    snapshot: gold_alert.MarketSnapshot,
+    rules: list[AlertRule],
+    sender: str,
+    recipient: str,
+    mode: str = "Bilingual",
+) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    labels = ", ".join(rule.label for rule in rules)
+    if mode == "Mandarin":
+        message["Subject"] = f"黄金提醒：{labels}（A${snapshot.spot_aud:,.2f}/克）"
+    else:
+        message["Subject"] = f"Gold alert: {labels} (${snapshot.spot_aud:,.2f}/g)"
+    lines = [f"{rule.label}: {rule.condition}" for rule in rules]
+    lines += [
+        "",
+        f"Spot: A${snapshot.spot_aud:,.2f}/g | ¥{snapshot.spot_cny:,.2f}/g ({snapshot.daily_change_pct:+.2f}%)",
+        f"50-day average: A${snapshot.ma50_aud:,.2f}/g | 200-day average: A${snapshot.ma200_aud:,.2f}/g",
+        f"Checked: {snapshot.captured_at:%A %d %b %Y %H:%M} AWST",
+    ]
+    message.set_content("\n".join(lines) + "\n")
+    return message
+
+
+def enqueue_rule_alerts(
+    snapshot: gold_alert.MarketSnapshot,
+    sender: str,
+    path: Path | None = None,
+    outbox: Path | None = None,
+    default_recipient: tuple[str, str] | None = None,
+    delivered: set[str] | None = None,
+) -> int:
+    rules = load_rules(path)
+    if not rules:
+        return 0
+    by_recipient: dict[tuple[str, str], list[AlertRule]] = {}
+    for rule in fired_rules(compile_rules(rules), snapshot):
+        for recipient in rule.recipients or (default_recipient or (sender, "Bilingual"),):
+            by_recipient.setdefault(recipient, []).append(rule)
+    outbox = outbox or gold_alert.OUTBOX_DIR
+    delivered = delivered if delivered is not None else gold_alert.load_delivered_keys()
+    queued = 0
+    for (recipient, mode), matched in by_recipient.items():
+        key = gold_alert.idempotency_key(snapshot, recipient, "Rules:" + ",".join(rule.rule_id for rule in matched))
+        if key in delivered or (outbox / f"{key}.eml").exists():
+            continue
+        gold_alert.queue_message(build_rule_message(snapshot, matched, sender, recipient, mode), key, outbox)
+        queued += 1
+    return queued
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay the alert rules over the passbook history.")
+    parser.add_argument("--rules", type=Path, default=RULES_PATH)
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    if not rules:
+        raise SystemExit(f"No rules found in {args.rules}")
+    columns = passbook_store.open_store()
+    matches = evaluate(compile_rules(rules), columns)
+    edges = matches & ~np.concatenate((np.zeros((len(rules), 1), dtype=bool), matches[:, :-1]), axis=1)
+    days = np.asarray(columns["captured_at"], dtype="int64").view("datetime64[ns]").astype("datetime64[D]")
+    print(f"{'Rule':<24} {'Alerts':>7} {'Rows':>7}  Last alert")
+    for rule, edge, match in zip(rules, edges, matches):
+        fired = np.flatnonzero(edge)
+        last = str(days[fired[-1]]) if len(fired) else "never"
+        print(f"{rule.rule_id:<24} {len(fired):>7} {int(match.sum()):>7}  {last}")
+
+
+if __name__ == "__main__":
+    main()
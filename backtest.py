@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import gold_alert
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+DIP_GRID = tuple(step / 100 for step in range(1, 16))
+MA_WINDOW_GRID = (20, 50, 100, 150, 200)
+HOLDING_DAYS_GRID = (5, 21, 63, 126, 252)
+DEFAULT_YEARS = 20
+HISTORY_COLUMNS = ["Date", "Spot_AUD_g"]
+
+
+@dataclass(frozen=True)
+class BacktestRow:
+    ma_window: int
+    dip_pct: float
+    holding_days: int
+    signal_days: int
+    signal_frequency_pct: float
+    forward_return_pct: float | None
+    baseline_return_pct: float | None
+    hit_rate_pct: float | None
+    average_cost: float | None
+    dca_average_cost: float
+    cost_vs_dca_pct: float | None
+
+
+@dataclass(frozen=True, eq=False)
+class BacktestGrid:
+    windows: np.ndarray
+    dips: np.ndarray
+    holding_days: np.ndarray
+    eligible_days: np.ndarray
+    signal_days: np.ndarray
+    forward_return: np.ndarray
+    baseline_return: np.ndarray
+    hit_rate: np.ndarray
+    average_cost: np.ndarray
+    dca_average_cost: np.ndarray
+
+    def rows(self) -> list[BacktestRow]:
+        def optional(value: float) -> float | None:
+            return None if np.isnan(value) else float(value)
+
+        rows = []
+        for w, d, h in np.ndindex(self.forward_return.shape):
+            average_cost = optional(self.average_cost[w, d])
+            dca_cost = float(self.dca_average_cost[w])
+            rows.append(BacktestRow(
+                ma_window=int(self.windows[w]),
+                dip_pct=float(self.dips[d]),
+                holding_days=int(self.holding_days[h]),
+                signal_days=int(self.signal_days[w, d]),
+                signal_frequency_pct=float(self.signal_days[w, d] / self.eligible_days[w] * 100),
+                forward_return_pct=optional(self.forward_return[w, d, h] * 100),
+                baseline_return_pct=optional(self.baseline_return[w, h] * 100),
+                hit_rate_pct=optional(self.hit_rate[w, d, h] * 100),
+                average_cost=average_cost,
+                dca_average_cost=dca_cost,
+                cost_vs_dca_pct=(average_cost / dca_cost - 1) * 100 if average_cost is not None else None,
+            ))
+        return rows
+
+
+def rolling_means(prices: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    cumulative = np.concatenate(([0.0], np.cumsum(prices)))
+    means = np.full((len(windows), len(prices)), np.nan)
+    for row, window in enumerate(windows):
+        means[row, window - 1:] = (cumulative[window:] - cumulative[:-window]) / window
+    return means
+
+
+def forward_returns(prices: np.ndarray, holding_days: np.ndarray) -> np.ndarray:
+    returns = np.full((len(holding_days), len(prices)), np.nan)
+    for row, days in enumerate(holding_days):
+        if days < len(prices):
+            returns[row, :-days] = prices[days:] / prices[:-days] - 1
+    return returns
+
+
+def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), np.nan), where=denominator > 0)
+
+
+def run_grid(
+    prices: np.ndarray | list[float],
+    dips: Iterable[float] = DIP_GRID,
+    windows: Iterable[int] = MA_WINDOW_GRID,
+    holding_days: Iterable[int] = HOLDING_DAYS_GRID,
+) -> BacktestGrid:
+    prices = np.asarray(prices, dtype="float64")
+    dips = np.asarray(sorted(set(dips)), dtype="float64")
+    windows = np.asarray(sorted(set(windows)), dtype="int64")
+    holding_days = np.asarray(sorted(set(holding_days)), dtype="int64")
+    if prices.ndim != 1 or not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+        raise ValueError("Prices must be a one-dimensional series of positive numbers")
+    if not len(dips) or not len(windows) or not len(holding_days):
+        raise ValueError("Dip, window and holding-period grids must not be empty")
+    if np.any(dips < 0) or np.any(dips >= 1) or windows[0] < 1 or holding_days[0] < 1:
+        raise ValueError("Dips must be in [0, 1); windows and holding periods must be positive")
+    if windows[-1] > len(prices):
+        raise ValueError(f"{len(prices)} prices cannot fill a {windows[-1]}-day moving average")
+
+    means = rolling_means(prices, windows)
+    eligible = ~np.isnan(means)
+    signals = (prices <= means[:, None, :] * (1 - dips[None, :, None])).astype("float64")
+    forward = forward_returns(prices, holding_days)
+    has_forward = (~np.isnan(forward)).astype("float64").T
+    gains = np.nan_to_num(forward).T
+    winners = (forward > 0).astype("float64").T
+    inverse_prices = 1 / prices
+
+    signal_days = signals.sum(axis=2)
+    signal_forward_days = signals @ has_forward
+    eligible_float = eligible.astype("float64")
+    return BacktestGrid(
+        windows=windows,
+        dips=dips,
+        holding_days=holding_days,
+        eligible_days=eligible.sum(axis=1),
+        signal_days=signal_days.astype("int64"),
+        forward_return=ratio(signals @ gains, signal_forward_days),
+        baseline_return=ratio(eligible_float @ gains, eligible_float @ has_forward),
+        hit_rate=ratio(signals @ winners, signal_forward_days),
+        average_cost=ratio(signal_days, signals @ inverse_prices),
+        dca_average_cost=eligible.sum(axis=1) / (eligible_float @ inverse_prices),
+    )
+
+
+def spot_aud_series(gold: pd.Series, aud_usd: pd.Series) -> tuple[list[str], np.ndarray]:
+    import pandas as pd
+
+    def daily(close: pd.Series) -> pd.Series:
+        close = close.dropna()
+        index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        close = close.set_axis(index.normalize())
+        return close[~close.index.duplicated(keep="last")]
+
+    frame = pd.concat({"gold": daily(gold), "aud_usd": daily(aud_usd)}, axis=1).sort_index()
+    frame["aud_usd"] = frame["aud_usd"].ffill()
+    frame = frame.dropna()
+    spot = frame["gold"] / gold_alert.OUNCE_TO_GRAMS / frame["aud_usd"]
+    return frame.index.strftime("%Y-%m-%d").tolist(), spot.to_numpy(dtype="float64")
+
+
+def load_history(years: int = DEFAULT_YEARS) -> tuple[list[str], np.ndarray]:
+    dates, prices = spot_aud_series(
+        gold_alert.fetch_history("GC=F", "max")["Close"],
+        gold_alert.fetch_history("AUDUSD=X", "max")["Close"],
+    )
+    if not dates:
+        raise RuntimeError("No overlapping gold and AUD/USD history returned")
+    first = f"{int(dates[-1][:4]) - years}{dates[-1][4:]}"
+    start = next(index for index, date in enumerate(dates) if date >= first)
+    return dates[start:], prices[start:]
+
+
+def load_history_csv(path: Path) -> tuple[list[str], np.ndarray]:
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.DictReader(handle)
+        if not set(HISTORY_COLUMNS).issubset(reader.fieldnames or []):
+            raise RuntimeError(f"{path} must contain columns: {', '.join(HISTORY_COLUMNS)}")
+        daily: dict[str, float] = {}
+        for row in reader:
+            price = gold_alert.csv_number(row["Spot_AUD_g"] or "")
+            if price is not None and price > 0:
+                daily[(row["Date"] or "")[:10]] = price
+    dates = sorted(daily)
+    return dates, np.array([daily[date] for date in dates], dtype="float64")
+
+
+def save_history_csv(path: Path, dates: list[str], prices: np.ndarray) -> None:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(HISTORY_COLUMNS)
+        writer.writerows((date, f"{price:.4f}") for date, price in zip(dates, prices))
+
+
+def write_results(path: Path, rows: list[BacktestRow]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(BacktestRow.__dataclass_fields__), lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(asdict(row) for row in rows)
+
+
+def percent(value: float | None) -> str:
+    return f"{value:+.2f}%" if value is not None else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest the dip-buy signal over a grid of parameters.")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    parser.add_argument("--history", type=Path, help="read Date,Spot_AUD_g history instead of downloading it")
+    parser.add_argument("--save-history", type=Path, help="write the history used to this CSV for offline reruns")
+    parser.add_argument("--dips", type=float, nargs="+", default=list(DIP_GRID))
+    parser.add_argument("--windows", type=int, nargs="+", default=list(MA_WINDOW_GRID))
+    parser.add_argument("--holding-days", type=int, nargs="+", default=list(HOLDING_DAYS_GRID))
+    parser.add_argument("--output", type=Path, help="write every grid row to this CSV")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    dates, prices = load_history_csv(args.history) if args.history else load_history(args.years)
+    if args.save_history:
+        save_history_csv(args.save_history, dates, prices)
+    started = time.perf_counter()
+    rows = run_grid(prices, args.dips, args.windows, args.holding_days).rows()
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {len(rows)} combinations over {len(prices)} days ({dates[0]} to {dates[-1]}) in {elapsed:.2f}s")
+
+    if args.output:
+        write_results(args.output, rows)
+        print(f"Wrote {args.output}")
+    ranked = sorted(
+        (row for row in rows if row.cost_vs_dca_pct is not None),
+        key=lambda row: (row.cost_vs_dca_pct, -(row.forward_return_pct or 0)),
+    )
+    current = [
+        row for row in rows
+        if row.ma_window == 50 and np.isclose(row.dip_pct, gold_alert.DIP_PERCENTAGE)
+    ]
+    print(f"{'MA':>4} {'Dip':>5} {'Hold':>5} {'Signal days':>12} {'Fwd return':>11} {'Baseline':>9} "
+          f"{'Hit rate':>9} {'Cost vs DCA':>12}")
+    for row in ranked[:args.top] + current:
+        marker = " *" if row in current else ""
+        print(
+            f"{row.ma_window:>4} {row.dip_pct:>5.1%} {row.holding_days:>5} "
+            f"{row.signal_days:>6} ({row.signal_frequency_pct:>4.1f}%) {percent(row.forward_return_pct):>11} "
+            f"{percent(row.baseline_return_pct):>9} "
+            f"{(f'{row.hit_rate_pct:.0f}%' if row.hit_rate_pct is not None else 'n/a'):>9} "
+            f"{percent(row.cost_vs_dca_pct):>12}{marker}"
+        )
+    if current:
+        print("* current gold_alert rule")
+
+
+if __name__ == "__main__":
+    main()
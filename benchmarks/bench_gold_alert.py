@@ -0,0 +1,520 @@
+import argparse
+import contextlib
+import csv
+import http.server
+import io
+import json
+import os
+import platform
+import shutil
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import alert_rules
+import backtest
+import gold_alert
+import passbook_store
+import portfolio
+import tenants
+
+
+ROOT = Path(__file__).resolve().parent.parent
+PERTH_MINT_PAGES = ROOT / "tests" / "fixtures" / "perth_mint"
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+DEFAULT_OUTPUT = Path(__file__).with_name("results.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_RECIPIENTS = 50
+MIN_ROUNDS = 5
+WARMUP_ROUNDS = 1
+MIN_ROUND_SECONDS = 0.01
+CALIBRATION_ROUNDS = 7
+SYMBOL_LEVELS = {"GC=F": 3300.0, "AUDUSD=X": 0.66, "CNY=X": 7.15}
+TAOBAO_SHARE_PAGE = (
+    '<html><body><a href="https://item.taobao.com/item.htm?id=992105119294&amp;price=909&amp;sourceType=item">'
+    "领丰金 足金9999 1g</a></body></html>"
+)
+
+
+def recorded_history(symbol: str, periods: int = 260) -> pd.DataFrame:
+    rng = np.random.default_rng(zlib.crc32(symbol.encode("utf-8")))
+    index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=periods)
+    closes = SYMBOL_LEVELS[symbol] * np.exp(np.cumsum(rng.normal(0, 0.01, periods)))
+    return pd.DataFrame({
+        "Open": closes, "High": closes * 1.004, "Low": closes * 0.996, "Close": closes, "Volume": 1_000,
+    }, index=index)
+
+
+class RecordedTicker:
+    frames = {symbol: recorded_history(symbol) for symbol in SYMBOL_LEVELS}
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+    def history(self, period: str | None = None, start: str | None = None, auto_adjust: bool = False) -> pd.DataFrame:
+        frame = self.frames[self.symbol]
+        if start is not None:
+            return frame.loc[frame.index >= pd.Timestamp(start, tz=frame.index.tz)].copy()
+        return frame.copy()
+
+
+def large_perth_mint_page(cards: int = 3_000) -> str:
+    page = (PERTH_MINT_PAGES / "json_ld_offer.html").read_text(encoding="utf-8")
+    filler = '<div class="card"><a href="/shop/item">Kangaroo bar</a><span class="label">Gold</span></div>\n'
+    return page.replace("<body>", "<body>" + filler * cards)
+
+
+def write_passbook(path: Path, rows: int) -> None:
+    started = datetime(2020, 1, 1, 10)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(gold_alert.PASSBOOK_COLUMNS)
+        for number in range(rows):
+            spot = 180 + (number % 400) / 10
+            writer.writerow([
+                (started + timedelta(minutes=5 * number)).strftime("%Y-%m-%d %H:%M"),
+                spot, round(spot * 4.73, 2), round(spot * 0.98, 2), round(spot * 0.95, 2),
+                round(spot * 1.2, 2), "N/A" if number % 3 else 909.0, "N/A" if number % 3 else 4545.0,
+            ])
+
+
+def write_holdings(path: Path, rows: int) -> None:
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["Date", "Item", "Grams", "Total_Paid_AUD", "Source", "Notes"])
+        for number in range(rows):
+            grams = (number % 5) + 1
+            writer.writerow([
+                (datetime(2020, 1, 1) + timedelta(days=number % 2_000)).strftime("%Y-%m-%d"),
+                f"Gold bar {number}", grams, f"{grams * 231.5:.2f}", "Taobao", "Stored in China",
+            ])
+
+
+def write_taobao_prices(path: Path, rows: int) -> None:
+    variants = ("1g_bar", "5g_bar", "5g_bean")
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["Date", "Variant", "Price_CNY"])
+        for number in range(rows):
+            day = (datetime(2020, 1, 1) + timedelta(days=number // 3)).strftime("%Y-%m-%d")
+            writer.writerow([day, variants[number % 3], 900 + number % 50])
+
+
+def benchmark_snapshot() -> gold_alert.MarketSnapshot:
+    items = list(gold_alert.DEFAULT_WATCHLIST)
+    return gold_alert.MarketSnapshot(
+        captured_at=datetime(2026, 7, 14, 10, 17, tzinfo=gold_alert.PERTH_TIMEZONE),
+        spot_aud=186.67, spot_cny=884.59, daily_change_pct=-0.42, ma50_aud=199.28, ma200_aud=205.32,
+        pm_1g=226.31, pm_5g=1035.10, taobao_1g_cny=903.0, taobao_5g_cny=4500.0, taobao_5g_bean_cny=4510.0,
+        taobao_share_1g_cny=909.0, taobao_app_checked_on="15 Jul 2026", portfolio_grams=5.0,
+        portfolio_cost_aud=1190.0,
+        quotes=gold_alert.price_quotes(
+            items, {"pm_1g": 226.31, "pm_5g": 1035.10, "taobao_share_1g": 909.0}, 186.67, 884.59,
+        ),
+    )
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self) -> None:
+        self.reply("220 gold-bench ESMTP sink")
+        while line := self.rfile.readline():
+            verb = line[:4].decode("ascii", "replace").upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-gold-bench\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb == "AUTH":
+                self.reply("235 2.7.0 Authentication accepted")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while (data := self.rfile.readline()) and data != b".\r\n":
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 2.0.0 Queued")
+            elif verb == "QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            elif verb in {"HELO", "MAIL", "RCPT", "RSET", "NOOP"}:
+                self.reply("250 2.0.0 OK")
+            else:
+                self.reply("502 5.5.2 Command not recognised")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class PageHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        body = self.server.pages.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class PageServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: dict[str, str]):
+        super().__init__(("127.0.0.1", 0), PageHandler)
+        self.pages = {path: page.encode("utf-8") for path, page in pages.items()}
+
+
+@contextlib.contextmanager
+def serving(server: socketserver.BaseServer):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def measure(function: Callable[[], object], rounds: int, setup: Callable[[], object] | None = None) -> dict[str, float]:
+    rounds = max(rounds, MIN_ROUNDS)
+    for _ in range(WARMUP_ROUNDS):
+        if setup is not None:
+            setup()
+        function()
+    calls = 1
+    while setup is None:
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        if time.perf_counter() - started >= MIN_ROUND_SECONDS:
+            break
+        calls *= 2
+    timings = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append((time.perf_counter() - started) / calls)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "rounds": rounds, "calls": calls}
+
+
+def calibration_work() -> None:
+    sorted(zlib.crc32(str(number).encode("ascii")) for number in range(20_000))
+    np.sort(np.random.default_rng(0).random(200_000))
+
+
+def calibrate() -> float:
+    return measure(calibration_work, CALIBRATION_ROUNDS)["min_s"]
+
+
+def bench_parsers(rounds: int) -> dict[str, dict[str, float]]:
+    pages = {path.stem: path.read_text(encoding="utf-8") for path in sorted(PERTH_MINT_PAGES.glob("*.html"))}
+    pages["large_storefront"] = large_perth_mint_page()
+    results = {}
+    for name, page in pages.items():
+        results[f"parse_perth_mint_price[{name}]"] = measure(lambda: gold_alert.parse_perth_mint_price(page), rounds)
+    large = pages["large_storefront"]
+    results["parse_perth_mint_price_soup[large_storefront]"] = measure(
+        lambda: gold_alert.parse_perth_mint_price_soup(large), max(rounds // 5, 1),
+    )
+    results["parse_taobao_share_price"] = measure(lambda: gold_alert.parse_taobao_share_price(TAOBAO_SHARE_PAGE), rounds)
+    return results
+
+
+def benchmark_rules(count: int = 1_000) -> list[alert_rules.AlertRule]:
+    templates = (
+        "spot_aud < {level}",
+        "pm_1g_premium_pct < {premium} and spot_aud > {level}",
+        "ma50_aud crosses_above ma200_aud and daily_move_sigma > {sigma}",
+        "ma50_distance_pct <= -{sigma} and spot_cny != {level}",
+    )
+    return [
+        alert_rules.AlertRule(f"rule{number}", templates[number % len(templates)].format(
+            level=200 + number % 100, premium=number % 20, sigma=1 + number % 4,
+        ))
+        for number in range(count)
+    ]
+
+
+def value_portfolio(book: portfolio.LotBook) -> list[list[portfolio.AllocationRow]]:
+    valuation = portfolio.value_lots(book, 231.5, datetime(2026, 7, 14))
+    return [portfolio.allocation(book, valuation, grouping) for grouping in portfolio.GROUPINGS]
+
+
+def bench_ledgers(directory: Path, sizes: tuple[int, ...], rounds: int) -> dict[str, dict[str, float]]:
+    results = {}
+    for size in sizes:
+        size_rounds = max(1, rounds if size <= 100_000 else rounds // 5)
+        holdings = directory / f"holdings_{size}.csv"
+        write_holdings(holdings, size)
+        results[f"load_portfolio[{size}]"] = measure(lambda: gold_alert.load_portfolio(holdings), size_rounds)
+        book = portfolio.load_ledger(holdings)
+        results[f"value_portfolio[{size}]"] = measure(lambda: value_portfolio(book), size_rounds)
+
+        prices = directory / f"taobao_{size}.csv"
+        write_taobao_prices(prices, size)
+        results[f"load_taobao_app_prices[{size}]"] = measure(
+            lambda: gold_alert.load_taobao_app_prices(prices), size_rounds,
+        )
+
+        template = directory / f"passbook_{size}.template.csv"
+        passbook = directory / f"passbook_{size}.csv"
+        write_passbook(template, size)
+        snapshot = benchmark_snapshot()
+        results[f"append_passbook[{size}]"] = measure(
+            lambda: gold_alert.append_passbook(snapshot, passbook), size_rounds,
+            setup=lambda: shutil.copyfile(template, passbook),
+        )
+        store = directory / f"passbook_{size}.store"
+        passbook_store.PassbookStore(store).import_csv(template)
+        results[f"mean_spot_csv[{size}]"] = measure(
+            lambda: backtest.load_history_csv(template)[1].mean(), size_rounds,
+        )
+        results[f"mean_spot_store[{size}]"] = measure(
+            lambda: passbook_store.open_store(store, ("spot_aud",))["spot_aud"].mean(), size_rounds,
+        )
+        compiled = alert_rules.compile_rules(benchmark_rules())
+        results[f"evaluate_rules[1000 rules, {size}]"] = measure(
+            lambda: alert_rules.evaluate(compiled, passbook_store.open_store(store)), max(size_rounds // 5, 1),
+        )
+    return results
+
+
+def bench_reports(rounds: int, recipients: int) -> dict[str, dict[str, float]]:
+    snapshot = benchmark_snapshot()
+
+    def cold(function: Callable[[], object]) -> Callable[[], object]:
+        def run() -> object:
+            gold_alert.clear_render_cache()
+            return function()
+        return run
+
+    results = {
+        "build_chinese_summary": measure(cold(lambda: gold_alert.build_chinese_summary(snapshot, "Open")), rounds),
+        "build_plain_report": measure(cold(lambda: gold_alert.build_plain_report(snapshot, "Open")), rounds),
+        "build_html_report": measure(cold(lambda: gold_alert.build_html_report(snapshot, "Open")), rounds),
+        "build_mandarin_html_report": measure(
+            cold(lambda: gold_alert.build_mandarin_html_report(snapshot, "Open")), rounds,
+        ),
+    }
+    results[f"build_message[{recipients} recipients]"] = measure(cold(lambda: [
+        gold_alert.build_message(snapshot, "Open", "owner@example.com", f"reader{number}@example.com",
+                                 "Mandarin" if number % 2 else "Bilingual")
+        for number in range(recipients)
+    ]), rounds)
+    return results
+
+
+def bench_users(directory: Path, rounds: int, users: int) -> dict[str, dict[str, float]]:
+    root = directory / "users"
+    for number in range(users):
+        user = root / f"user{number}"
+        user.mkdir(parents=True)
+        profile = {"email": f"user{number}@example.com", "mode": "Mandarin" if number % 2 else "Bilingual"}
+        (user / tenants.PROFILE_NAME).write_text(json.dumps(profile), encoding="utf-8")
+        write_holdings(user / tenants.HOLDINGS_NAME, 100)
+    outbox = directory / "user_outbox"
+    snapshot = benchmark_snapshot()
+    with patch.object(gold_alert, "DELIVERY_LEDGER_PATH", directory / "user_ledger.jsonl"):
+        return {f"enqueue_user_reports[{users} users]": measure(
+            lambda: tenants.enqueue_user_reports(snapshot, "Open", "owner@example.com", root, outbox), rounds,
+            setup=lambda: shutil.rmtree(outbox, ignore_errors=True),
+        )}
+
+
+def bench_startup(rounds: int) -> dict[str, dict[str, float]]:
+    def start(module: str) -> Callable[[], object]:
+        command = [sys.executable, "-c", f"import {module}"]
+        return lambda: subprocess.run(command, cwd=ROOT, check=True)
+
+    return {
+        f"startup[{module}]": measure(start(module), rounds)
+        for module in ("gold_alert", "record_purchase")
+    }
+
+
+def bench_main(directory: Path, rounds: int, recipients: int) -> dict[str, dict[str, float]]:
+    workspace = directory / "main"
+    pages = {"/pm-1g": (PERTH_MINT_PAGES / "json_ld_offer.html").read_text(encoding="utf-8"),
+             "/pm-5g": large_perth_mint_page(), "/taobao-1g": TAOBAO_SHARE_PAGE}
+
+    with serving(SMTPSink()) as sink, serving(PageServer(pages)) as shop, contextlib.ExitStack() as stack:
+        base_url = f"http://127.0.0.1:{shop.server_address[1]}"
+        environment = {
+            "GMAIL_ADDRESS": "owner@example.com",
+            "GMAIL_APP_PASSWORD": "benchmark",
+            "REPORT_RECIPIENTS": ",".join(
+                f"reader{number}@example.com{':Mandarin' if number % 2 else ''}" for number in range(recipients - 1)
+            ),
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(sink.server_address[1]),
+        }
+        stack.enter_context(patch.dict(os.environ, environment, clear=False))
+        for name in ("SECONDARY_GMAIL_ADDRESS", "TAOBAO_1G_URL", "TAOBAO_5G_URL", "REPORT_RECIPIENTS_FILE"):
+            os.environ.pop(name, None)
+        stack.enter_context(patch("yfinance.Ticker", RecordedTicker))
+        stack.enter_context(patch.object(sys, "argv", ["gold_alert.py"]))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        previous = Path.cwd()
+        stack.callback(os.chdir, previous)
+
+        def reset_workspace(warm: bool) -> None:
+            os.chdir(previous)
+            if not warm:
+                shutil.rmtree(workspace, ignore_errors=True)
+            workspace.mkdir(parents=True, exist_ok=True)
+            os.chdir(workspace)
+            write_passbook(workspace / "gold_passbook.csv", 1_000)
+            write_holdings(workspace / "my_holdings.csv", 100)
+            write_taobao_prices(workspace / "taobao_app_prices.csv", 30)
+            (workspace / "watchlist.csv").write_text(
+                "Product_ID,Retailer,Grams,Purity,Currency,URL,Label\n"
+                f"pm_1g,perth_mint,1,0.9999,AUD,{base_url}/pm-1g,1g minted bar\n"
+                f"pm_5g,perth_mint,5,0.9999,AUD,{base_url}/pm-5g,5g minted bar\n"
+                f"taobao_share_1g,taobao,1,0.9999,CNY,{base_url}/taobao-1g,Lingfeng 1g public share price\n",
+                encoding="utf-8",
+            )
+            gold_alert._http_cache = None
+            gold_alert._source_health = None
+            gold_alert._host_buckets.clear()
+            gold_alert.clear_render_cache()
+
+        results = {
+            f"main[cold, {recipients} recipients]": measure(gold_alert.main, rounds, lambda: reset_workspace(False)),
+            f"main[warm, {recipients} recipients]": measure(gold_alert.main, rounds, lambda: reset_workspace(True)),
+        }
+    expected = recipients * (max(rounds, MIN_ROUNDS) + WARMUP_ROUNDS) * 2
+    if sink.messages != expected:
+        raise RuntimeError(f"SMTP sink received {sink.messages} messages; expected {expected}")
+    return results
+
+
+def run_benchmarks(sizes: tuple[int, ...], rounds: int, recipients: int) -> dict[str, object]:
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        results.update(bench_parsers(rounds))
+        results.update(bench_ledgers(Path(directory), sizes, rounds))
+        results.update(bench_reports(rounds, recipients))
+        results.update(bench_users(Path(directory), max(rounds // 2, 1), recipients))
+        results.update(bench_startup(max(rounds // 2, 1)))
+        results.update(bench_main(Path(directory), max(rounds // 5, 1), recipients))
+    return {
+        "generated_at": datetime.now(gold_alert.PERTH_TIMEZONE).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration_s": (calibration + calibrate()) / 2,
+        "results": results,
+    }
+
+
+def compare_results(
+    current: dict[str, object],
+    baseline: dict[str, object],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[str]:
+    regressions = []
+    speed = 1.0
+    if current.get("calibration_s") and baseline.get("calibration_s"):
+        speed = current["calibration_s"] / baseline["calibration_s"]
+    for name, timing in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference or reference["median_s"] <= 0 or timing.get("rounds", MIN_ROUNDS) < MIN_ROUNDS:
+            continue
+        statistic = "min_s" if "min_s" in timing and "min_s" in reference else "median_s"
+        expected = reference[statistic] * speed
+        ratio = timing[statistic] / expected
+        timing["baseline_median_s"] = reference["median_s"]
+        timing["ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: best {timing[statistic] * 1000:.3f} ms vs {expected * 1000:.3f} ms expected on this machine "
+                f"({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def merge_best(current: dict[str, object], again: dict[str, object]) -> dict[str, object]:
+    results = {
+        name: min((timing, again["results"].get(name, timing)), key=lambda candidate: candidate["min_s"])
+        for name, timing in current["results"].items()
+    }
+    return {**current, "calibration_s": min(current["calibration_s"], again["calibration_s"]), "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline gold_alert benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="ledger row counts to benchmark, e.g. 1000 10000 100000 1000000")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--recipients", type=int, default=DEFAULT_RECIPIENTS)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown versus baseline before failing, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    current = run_benchmarks(tuple(args.sizes), args.rounds, args.recipients)
+    regressions = []
+    if args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if compare_results(current, baseline, args.threshold):
+            print("Re-running the suite to confirm the slowdowns")
+            current = merge_best(current, run_benchmarks(tuple(args.sizes), args.rounds, args.recipients))
+        regressions = compare_results(current, baseline, args.threshold)
+    args.output.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+
+    for name, timing in current["results"].items():
+        ratio = f"  {timing['ratio']:.2f}x" if "ratio" in timing else ""
+        print(f"{name:<60} {timing['median_s'] * 1000:>10.3f} ms{ratio}")
+    print(f"Wrote {args.output}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import argparse
+import bisect
+import csv
+import hashlib
+import json
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import gold_alert
+
+
+DASHBOARD_DIR = Path("dashboard_data")
+MANIFEST_NAME = "manifest.json"
+HOLDINGS_NAME = "holdings.json"
+MANIFEST_VERSION = 1
+INTRADAY_BUCKET_MINUTES = 15
+TAIL_BYTES = 64
+ROLLUP_COLUMNS = (
+    "t", "open", "high", "low", "close", "spot_cny", "ma50", "ma200", "premium_pct", "taobao_1g_cny", "taobao_5g_cny",
+)
+PASSBOOK_FIELDS = {
+    "spot_cny": "Spot_CNY_g",
+    "ma50": "MA50_AUD",
+    "ma200": "MA200_AUD",
+    "taobao_1g_cny": "Taobao_1g_CNY",
+    "taobao_5g_cny": "Taobao_5g_CNY",
+}
+
+Chunk = dict[str, list]
+
+
+def intraday_bucket(moment: datetime) -> tuple[str, str]:
+    floored = moment - timedelta(minutes=moment.minute % INTRADAY_BUCKET_MINUTES)
+    return floored.strftime("%Y-%m-%d %H:%M"), moment.strftime("%Y-%m")
+
+
+def daily_bucket(moment: datetime) -> tuple[str, str]:
+    return moment.strftime("%Y-%m-%d"), moment.strftime("%Y")
+
+
+def weekly_bucket(moment: datetime) -> tuple[str, str]:
+    return (moment - timedelta(days=moment.weekday())).strftime("%Y-%m-%d"), "all"
+
+
+RESOLUTIONS: dict[str, Callable[[datetime], tuple[str, str]]] = {
+    "intraday": intraday_bucket,
+    "daily": daily_bucket,
+    "weekly": weekly_bucket,
+}
+
+
+def passbook_points(lines: list[str], header: list[str]) -> list[tuple[datetime, float, dict[str, float | None]]]:
+    columns = {name: index for index, name in enumerate(header)}
+
+    def number(row: list[str], name: str) -> float | None:
+        index = columns.get(name)
+        return gold_alert.csv_number(row[index]) if index is not None and index < len(row) else None
+
+    points = []
+    for row in csv.reader(lines):
+        if not row or "Date" not in columns:
+            continue
+        try:
+            moment = datetime.strptime(row[columns["Date"]].strip()[:16], "%Y-%m-%d %H:%M")
+        except (IndexError, ValueError):
+            continue
+        spot = number(row, "Spot_AUD_g")
+        if spot is None or spot <= 0:
+            continue
+        extras = {field: number(row, column) for field, column in PASSBOOK_FIELDS.items()}
+        pm_1g = number(row, "Est_Shop_AUD")
+        extras["premium_pct"] = round(gold_alert.premium_pct(pm_1g, 1, spot), 2) if pm_1g is not None else None
+        points.append((moment, spot, extras))
+    return points
+
+
+def merge_point(chunk: Chunk, label: str, spot: float, extras: dict[str, float | None]) -> None:
+    times = chunk["t"]
+    index = bisect.bisect_left(times, label)
+    if index < len(times) and times[index] == label:
+        chunk["high"][index] = max(chunk["high"][index], spot)
+        chunk["low"][index] = min(chunk["low"][index], spot)
+        chunk["close"][index] = spot
+        for field, value in extras.items():
+            if value is not None:
+                chunk[field][index] = value
+        return
+    for field, value in (("t", label), ("open", spot), ("high", spot), ("low", spot), ("close", spot), *extras.items()):
+        chunk[field].insert(index, value)
+
+
+def write_json(path: Path, payload: object) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps(payload, separators=(",", ":"), allow_nan=False) + "\n", encoding="utf-8")
+    temporary.replace(path)
+
+
+def load_manifest(directory: Path) -> dict:
+    try:
+        manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) and manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def tail_digest(handle, offset: int) -> str:
+    start = max(0, offset - TAIL_BYTES)
+    handle.seek(start)
+    return hashlib.sha256(handle.read(offset - start)).hexdigest()
+
+
+def holdings_summary(path: Path | None = None) -> dict:
+    import portfolio
+
+    book = portfolio.load_ledger(path)
+    break_even = book.break_even_spot
+    return {
+        "grams": round(book.total_open_grams, 4),
+        "cost_aud": round(book.total_open_cost, 2),
+        "realized_aud": round(book.realized_aud, 2),
+        "break_even_aud": round(break_even, 2) if break_even is not None else None,
+        "lot_columns": ["date", "grams", "cost_aud", "open_grams"],
+        "lots": [
+            [day if day != "NaT" else "", grams, round(cost, 2), round(open_grams, 4)]
+            for day, grams, cost, open_grams in zip(
+                book.dates.astype(str).tolist(), book.grams.tolist(), book.cost.tolist(), book.open_grams.tolist(),
+            )
+        ],
+    }
+
+
+def update_dashboard(
+    passbook: Path | None = None,
+    directory: Path | None = None,
+    holdings: Path | None = None,
+    rebuild: bool = False,
+) -> int:
+    passbook = passbook or gold_alert.PASSBOOK_PATH
+    directory = directory or DASHBOARD_DIR
+    manifest = {} if rebuild else load_manifest(directory)
+    if not passbook.exists():
+        return 0
+
+    with passbook.open("rb") as handle:
+        header = next(csv.reader([handle.readline().decode("utf-8-sig")]), [])
+        body_start = handle.tell()
+        size = handle.seek(0, 2)
+        source = manifest.get("source", {})
+        offset = source.get("bytes", 0)
+        if (
+            source.get("header") != header
+            or not body_start <= offset <= size
+            or tail_digest(handle, offset) != source.get("tail")
+        ):
+            for resolution in manifest.get("resolutions", {}).values():
+                for chunk in resolution["chunks"]:
+                    (directory / chunk["path"]).unlink(missing_ok=True)
+            manifest = {}
+            offset = body_start
+        handle.seek(offset)
+        data = handle.read(size - offset)
+        complete = data[:data.rfind(b"\n") + 1]
+        offset += len(complete)
+        tail = tail_digest(handle, offset)
+    points = passbook_points(complete.decode("utf-8").splitlines(), header)
+
+    resolutions = manifest.get("resolutions", {})
+    chunks: dict[tuple[str, str], Chunk] = {}
+    listed = {
+        (name, chunk["key"]): chunk["path"]
+        for name, resolution in resolutions.items()
+        for chunk in resolution["chunks"]
+    }
+    for moment, spot, extras in points:
+        for name, bucket in RESOLUTIONS.items():
+            label, key = bucket(moment)
+            if (name, key) not in chunks:
+                path = listed.get((name, key))
+                chunks[name, key] = (
+                    json.loads((directory / path).read_text(encoding="utf-8")) if path
+                    else {column: [] for column in ROLLUP_COLUMNS}
+                )
+            merge_point(chunks[name, key], label, spot, extras)
+
+    for (name, key), chunk in chunks.items():
+        path = f"{name}/{key}.json"
+        write_json(directory / path, chunk)
+        entries = {entry["key"]: entry for entry in resolutions.setdefault(name, {"chunks": []})["chunks"]}
+        entries[key] = {
+            "key": key, "path": path, "first": chunk["t"][0], "last": chunk["t"][-1], "points": len(chunk["t"]),
+        }
+        resolutions[name]["chunks"] = [entries[chunk_key] for chunk_key in sorted(entries)]
+    resolutions.setdefault("intraday", {"chunks": []})["bucket_minutes"] = INTRADAY_BUCKET_MINUTES
+
+    latest = manifest.get("latest")
+    if points:
+        moment, spot, extras = points[-1]
+        latest = {"t": moment.strftime("%Y-%m-%d %H:%M"), "spot_aud": spot, **extras}
+    write_json(directory / HOLDINGS_NAME, holdings_summary(holdings))
+    write_json(directory / MANIFEST_NAME, {
+        "version": MANIFEST_VERSION,
+        "columns": list(ROLLUP_COLUMNS),
+        "latest": latest,
+        "holdings": HOLDINGS_NAME,
+        "resolutions": resolutions,
+        "source": {
+            "header": header,
+            "bytes": offset,
+            "points": manifest.get("source", {}).get("points", 0) + len(points),
+            "tail": tail,
+        },
+    })
+    return len(points)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the dashboard chart data from the passbook.")
+    parser.add_argument("--passbook", type=Path, default=gold_alert.PASSBOOK_PATH)
+    parser.add_argument("--output", type=Path, default=DASHBOARD_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="discard the existing rollups and rebuild them")
+    args = parser.parse_args()
+    added = update_dashboard(args.passbook, args.output, rebuild=args.rebuild)
+    print(f"Added {added} passbook row(s) to {args.output / MANIFEST_NAME}")
+
+
+if __name__ == "__main__":
+    main()
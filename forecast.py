@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import backtest
+import gold_alert
+from gold_alert import ForecastRange
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+FEATURE_STORE_PATH = gold_alert.STATE_DIR / "features.npz"
+MODEL_PATH = gold_alert.STATE_DIR / "forecast_model.json"
+FEATURE_NAMES = (
+    "return_1d", "return_5d", "return_21d", "volatility_21d", "volatility_63d", "ma50_distance", "ma200_distance",
+)
+LOOKBACK_DAYS = 200
+HORIZONS = {"1 day": 1, "1 week": 5, "1 month": 21}
+RIDGE_PENALTY = 10.0
+INTERVAL_QUANTILES = (0.1, 0.9)
+CALIBRATION_SHARE = 0.25
+MIN_TRAIN_DAYS = 756
+FOLD_DAYS = 126
+COVERAGE_TOLERANCE = 0.1
+MODEL_MAX_AGE_DAYS = 45
+PRICE_TOLERANCE = 1e-9
+
+
+def trailing_sum(values: np.ndarray, window: int) -> np.ndarray:
+    totals = np.full(len(values), np.nan)
+    if window <= len(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        totals[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return totals
+
+
+def compute_features(prices: np.ndarray, start: int = 0) -> np.ndarray:
+    offset = max(start - LOOKBACK_DAYS - 1, 0)
+    log_prices = np.log(prices[offset:])
+    count = len(log_prices)
+    returns = np.concatenate(([np.nan], np.diff(log_prices)))
+    columns = []
+    for days in (1, 5, 21):
+        column = np.full(count, np.nan)
+        column[days:] = log_prices[days:] - log_prices[:-days]
+        columns.append(column)
+    for window in (21, 63):
+        filled = np.nan_to_num(returns)
+        total = trailing_sum(filled, window)
+        squares = trailing_sum(filled ** 2, window)
+        variance = np.maximum(squares - total ** 2 / window, 0) / (window - 1)
+        variance[:window] = np.nan
+        columns.append(np.sqrt(variance * 252))
+    for window in (50, 200):
+        columns.append(prices[offset:] / (trailing_sum(prices[offset:], window) / window) - 1)
+    return np.column_stack(columns)[start - offset:]
+
+
+class FeatureStore:
+    def __init__(
+        self,
+        dates: Iterable[str] = (),
+        prices: Iterable[float] = (),
+        features: np.ndarray | None = None,
+    ):
+        self.dates = np.asarray(list(dates), dtype="U10")
+        self.prices = np.asarray(list(prices), dtype="float64")
+        self.features = features if features is not None else np.empty((0, len(FEATURE_NAMES)))
+
+    @classmethod
+    def load(cls, path: Path | None = None) -> FeatureStore:
+        try:
+            with np.load(path or FEATURE_STORE_PATH, allow_pickle=False) as stored:
+                if tuple(stored["columns"].tolist()) != FEATURE_NAMES:
+                    return cls()
+                return cls(stored["dates"], stored["prices"], stored["features"])
+        except (OSError, ValueError, KeyError):
+            return cls()
+
+    def save(self, path: Path | None = None) -> None:
+        path = path or FEATURE_STORE_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(".tmp")
+        with temporary.open("wb") as handle:
+            np.savez(
+                handle, columns=np.asarray(FEATURE_NAMES), dates=self.dates, prices=self.prices,
+                features=self.features,
+            )
+        temporary.replace(path)
+
+    def update(self, dates: Iterable[str], prices: Iterable[float]) -> int:
+        merged = dict(zip(self.dates.tolist(), self.prices.tolist()))
+        merged.update(zip(dates, (float(price) for price in prices)))
+        new_dates = np.asarray(sorted(merged), dtype="U10")
+        new_prices = np.asarray([merged[date] for date in new_dates.tolist()], dtype="float64")
+
+        common = min(len(self.dates), len(new_dates))
+        unchanged = (self.dates[:common] == new_dates[:common]) & np.isclose(
+            self.prices[:common], new_prices[:common], rtol=PRICE_TOLERANCE, atol=0,
+        )
+        first = common if unchanged.all() else int(np.argmin(unchanged))
+        new_prices[:first] = self.prices[:first]
+        self.features = np.vstack([self.features[:first], compute_features(new_prices, first)])
+        self.dates, self.prices = new_dates, new_prices
+        return len(new_dates) - first
+
+    def targets(self, days: int) -> np.ndarray:
+        log_prices = np.log(self.prices)
+        targets = np.full(len(log_prices), np.nan)
+        targets[:-days] = log_prices[days:] - log_prices[:-days]
+        return targets
+
+
+def fit_ridge(features: np.ndarray, targets: np.ndarray, penalty: float = RIDGE_PENALTY) -> dict[str, object]:
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    standard = (features - mean) / scale
+    intercept = float(targets.mean())
+    gram = standard.T @ standard + penalty * np.eye(standard.shape[1])
+    coefficients = np.linalg.solve(gram, standard.T @ (targets - intercept))
+    return {
+        "mean": mean.tolist(),
+        "scale": scale.tolist(),
+        "coefficients": coefficients.tolist(),
+        "intercept": intercept,
+    }
+
+
+def predict(model: dict[str, object], features: np.ndarray) -> np.ndarray:
+    standard = (features - np.asarray(model["mean"])) / np.asarray(model["scale"])
+    return standard @ np.asarray(model["coefficients"]) + model["intercept"]
+
+
+def momentum_forecast(features: np.ndarray, days: int) -> np.ndarray:
+    return features[:, FEATURE_NAMES.index("return_21d")] / 21 * days
+
+
+def fit_calibrated(features: np.ndarray, targets: np.ndarray, days: int) -> dict[str, object]:
+    split = int(len(targets) * (1 - CALIBRATION_SHARE))
+    fit_rows = slice(0, max(split - days, 1))
+    model = fit_ridge(features[fit_rows], targets[fit_rows])
+    residuals = targets[split:] - predict(model, features[split:])
+    low, high = np.quantile(residuals, INTERVAL_QUANTILES)
+    return {**model, "residual_low": float(low), "residual_high": float(high)}
+
+
+def usable_rows(features: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    return np.isfinite(features).all(axis=1) & np.isfinite(targets)
+
+
+def walk_forward_folds(rows: int, days: int) -> list[tuple[int, int, int]]:
+    folds = []
+    for test_start in range(MIN_TRAIN_DAYS + days, rows, FOLD_DAYS):
+        folds.append((test_start - days, test_start, min(test_start + FOLD_DAYS, rows)))
+    return folds
+
+
+def evaluate_fold(task: tuple[np.ndarray, np.ndarray, int, tuple[int, int, int]]) -> dict[str, float]:
+    features, targets, days, (train_end, test_start, test_end) = task
+    usable = usable_rows(features, targets)
+    train = np.flatnonzero(usable[:train_end])
+    test = test_start + np.flatnonzero(usable[test_start:test_end])
+    if len(train) < MIN_TRAIN_DAYS // 2 or not len(test):
+        return {"rows": 0}
+    model = fit_calibrated(features[train], targets[train], days)
+    actual = targets[test]
+    expected = predict(model, features[test])
+    low, high = expected + model["residual_low"], expected + model["residual_high"]
+    return {
+        "rows": len(test),
+        "model_abs_error": float(np.abs(actual - expected).sum()),
+        "no_change_abs_error": float(np.abs(actual).sum()),
+        "momentum_abs_error": float(np.abs(actual - momentum_forecast(features[test], days)).sum()),
+        "direction_hits": float((np.sign(expected) == np.sign(actual)).sum()),
+        "covered": float(((actual >= low) & (actual <= high)).sum()),
+        "width": float((high - low).sum()),
+    }
+
+
+def summarize_folds(results: list[dict[str, float]]) -> dict[str, float]:
+    rows = sum(result["rows"] for result in results)
+    if not rows:
+        return {"folds": 0, "rows": 0}
+
+    def mean(key: str) -> float:
+        return sum(result.get(key, 0.0) for result in results) / rows
+
+    return {
+        "folds": sum(1 for result in results if result["rows"]),
+        "rows": rows,
+        "model_mae_pct": mean("model_abs_error") * 100,
+        "no_change_mae_pct": mean("no_change_abs_error") * 100,
+        "momentum_mae_pct": mean("momentum_abs_error") * 100,
+        "direction_hit_rate_pct": mean("direction_hits") * 100,
+        "interval_coverage_pct": mean("covered") * 100,
+        "interval_width_pct": mean("width") * 100,
+    }
+
+
+def train(store: FeatureStore, workers: int | None = None) -> dict[str, object]:
+    tasks = []
+    for name, days in HORIZONS.items():
+        targets = store.targets(days)
+        tasks += [(name, (store.features, targets, days, fold)) for fold in walk_forward_folds(len(targets), days)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        results = list(pool.map(evaluate_fold, [task for _, task in tasks]))
+
+    by_horizon: dict[str, list[dict[str, float]]] = {name: [] for name in HORIZONS}
+    for (name, _), result in zip(tasks, results):
+        by_horizon[name].append(result)
+
+    horizons = {}
+    for name, days in HORIZONS.items():
+        targets = store.targets(days)
+        usable = usable_rows(store.features, targets)
+        if usable.sum() < MIN_TRAIN_DAYS:
+            raise RuntimeError(f"Only {usable.sum()} usable rows for the {name} horizon; {MIN_TRAIN_DAYS} are required")
+        horizons[name] = {
+            "days": days,
+            **fit_calibrated(store.features[usable], targets[usable], days),
+            "evaluation": summarize_folds(by_horizon[name]),
+        }
+    return {
+        "trained_at": datetime.now(gold_alert.PERTH_TIMEZONE).isoformat(timespec="seconds"),
+        "last_date": str(store.dates[-1]),
+        "features": list(FEATURE_NAMES),
+        "interval": list(INTERVAL_QUANTILES),
+        "horizons": horizons,
+    }
+
+
+def save_model(model: dict[str, object], path: Path | None = None) -> None:
+    path = path or MODEL_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps(model, indent=2) + "\n", encoding="utf-8")
+    temporary.replace(path)
+
+
+def load_model(path: Path | None = None) -> dict[str, object] | None:
+    try:
+        model = json.loads((path or MODEL_PATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return model if model.get("features") == list(FEATURE_NAMES) else None
+
+
+def confident(model: dict[str, object], horizon: dict[str, object], latest_date: str) -> bool:
+    evaluation = horizon.get("evaluation", {})
+    nominal = INTERVAL_QUANTILES[1] - INTERVAL_QUANTILES[0]
+    age = (datetime.fromisoformat(latest_date) - datetime.fromisoformat(model["last_date"])).days
+    return (
+        evaluation.get("rows", 0) > 0
+        and abs(evaluation["interval_coverage_pct"] / 100 - nominal) <= COVERAGE_TOLERANCE
+        and evaluation["model_mae_pct"] <= min(evaluation["no_change_mae_pct"], evaluation["momentum_mae_pct"])
+        and age <= MODEL_MAX_AGE_DAYS
+    )
+
+
+def score_latest(store: FeatureStore, model: dict[str, object]) -> tuple[ForecastRange, ...]:
+    if not len(store.dates) or not np.isfinite(store.features[-1]).all():
+        return ()
+    latest = store.features[-1:]
+    spot = float(store.prices[-1])
+    ranges = []
+    for name, horizon in model["horizons"].items():
+        expected = float(predict(horizon, latest)[0])
+        ranges.append(ForecastRange(
+            horizon=name,
+            expected_aud=spot * math.exp(expected),
+            low_aud=spot * math.exp(expected + horizon["residual_low"]),
+            high_aud=spot * math.exp(expected + horizon["residual_high"]),
+            coverage_pct=(INTERVAL_QUANTILES[1] - INTERVAL_QUANTILES[0]) * 100,
+            low_confidence=not confident(model, horizon, str(store.dates[-1])),
+        ))
+    return tuple(ranges)
+
+
+def daily_forecast(
+    gold: pd.Series,
+    aud_usd: pd.Series,
+    store_path: Path | None = None,
+    model_path: Path | None = None,
+) -> tuple[ForecastRange, ...]:
+    model = load_model(model_path)
+    if model is None:
+        return ()
+    store = FeatureStore.load(store_path)
+    dates, prices = backtest.spot_aud_series(gold, aud_usd)
+    if store.update(dates, prices):
+        store.save(store_path)
+    return score_latest(store, model)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train and evaluate the walk-forward gold forecast.")
+    parser.add_argument("--years", type=int, default=backtest.DEFAULT_YEARS)
+    parser.add_argument("--history", type=Path, help="read Date,Spot_AUD_g history instead of downloading it")
+    parser.add_argument("--workers", type=int, default=None, help="processes used to evaluate folds in parallel")
+    args = parser.parse_args()
+
+    dates, prices = backtest.load_history_csv(args.history) if args.history else backtest.load_history(args.years)
+    store = FeatureStore.load()
+    print(f"Computed features for {store.update(dates, prices)} new or revised day(s)")
+    store.save()
+    model = train(store, args.workers)
+    save_model(model)
+    coverage = INTERVAL_QUANTILES[1] - INTERVAL_QUANTILES[0]
+    for name, horizon in model["horizons"].items():
+        evaluation = horizon["evaluation"]
+        if not evaluation["rows"]:
+            print(f"{name}: not enough history for walk-forward folds")
+            continue
+        print(
+            f"{name}: {evaluation['folds']} folds, MAE {evaluation['model_mae_pct']:.2f}% "
+            f"(no-change {evaluation['no_change_mae_pct']:.2f}%, momentum {evaluation['momentum_mae_pct']:.2f}%), "
+            f"direction {evaluation['direction_hit_rate_pct']:.0f}%, "
+            f"{coverage:.0%} range coverage {evaluation['interval_coverage_pct']:.0f}%"
+        )
+    print(f"Saved {MODEL_PATH}; daily runs only score the latest feature row")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,41 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
 import html
+import io
 import json
+import math
 import os
+import queue
 import re
+import signal
 import smtplib
-from dataclasses import dataclass
-from datetime import datetime
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from email import policy
 from email.message import EmailMessage
+from email.parser import BytesParser
+from functools import lru_cache, wraps
 from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 from zoneinfo import ZoneInfo
 
-import pandas as pd
-import requests
-import yfinance as yf
-from bs4 import BeautifulSoup
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import requests
 
 
 DIP_PERCENTAGE = 0.05
@@ -21,10 +44,66 @@ PERTH_TIMEZONE = ZoneInfo("Australia/Perth")
 PASSBOOK_PATH = Path("gold_passbook.csv")
 HOLDINGS_PATH = Path("my_holdings.csv")
 TAOBAO_APP_PRICES_PATH = Path("taobao_app_prices.csv")
+WATCHLIST_PATH = Path("watchlist.csv")
+RUN_METRICS_PATH = Path("gold_run_metrics.json")
+PASSBOOK_COLUMNS = [
+    "Date", "Spot_AUD_g", "Spot_CNY_g", "MA50_AUD", "MA200_AUD",
+    "Est_Shop_AUD", "Taobao_1g_CNY", "Taobao_5g_CNY",
+]
+STATE_DIR = Path(".gold_state")
+HISTORY_CACHE_DIR = STATE_DIR / "history"
+HTTP_CACHE_PATH = STATE_DIR / "http_cache.json"
+SOURCE_HEALTH_PATH = STATE_DIR / "source_health.json"
+MA_STATE_PATH = STATE_DIR / "moving_averages.json"
+OUTBOX_DIR = STATE_DIR / "outbox"
+DELIVERY_LEDGER_PATH = STATE_DIR / "delivery_ledger.jsonl"
+DAEMON_STATE_PATH = STATE_DIR / "daemon.json"
 PM_1G_URL = "https://www.perthmint.com/shop/bullion/minted-bars/kangaroo-1g-minted-gold-bar/"
 PM_5G_URL = "https://www.perthmint.com/shop/bullion/minted-bars/kangaroo-5g-minted-gold-bar/"
 DEFAULT_TAOBAO_1G_URL = "https://e.tb.cn/h.8ZEbY3FydVeQvrb?tk=5wG9gJeMRuD"
 RECORD_PURCHASE_URL = "https://github.com/ganjm/gold-price-tracker/actions/workflows/record_purchase.yml"
+FETCH_DEADLINE_SECONDS = 45.0
+WATCHLIST_MAX_DEADLINE_SECONDS = 300.0
+HISTORY_TIMEOUT_SECONDS = 30.0
+PERTH_MINT_TIMEOUT_SECONDS = 15.0
+TAOBAO_TIMEOUT_SECONDS = 20.0
+HTTP_POOL_SIZE = 8
+WATCHLIST_WORKERS = 8
+HOST_RATE_PER_SECOND = 2.0
+HOST_BURST = 4
+FINE_PURITY = 0.9999
+HEALTH_LATENCY_SAMPLES = 50
+HEALTH_MIN_SAMPLES = 5
+HEALTH_TIMEOUT_MULTIPLIER = 2.0
+MIN_FETCH_TIMEOUT_SECONDS = 3.0
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_COOLDOWN_SECONDS = 12 * 3600
+RETAILER_CURRENCIES = {"perth_mint": "AUD", "taobao": "CNY"}
+LINGFENG_PRODUCT_IDS = {"taobao_share_1g", "taobao_5g"}
+RENDER_CACHE_SIZE = 16
+REPORT_MODES = ("Bilingual", "Mandarin")
+SMTP_HOST = "smtp.gmail.com"
+SMTP_SSL_PORT = 465
+SMTP_TIMEOUT_SECONDS = 30
+SMTP_CONNECTIONS = 4
+SMTP_ATTEMPTS = 3
+SMTP_BACKOFF_SECONDS = 2.0
+SIGNAL_ZH = {"BUY ZONE": "买入区间", "WATCH": "关注", "WAIT": "等待"}
+REASON_ZH = {
+    "BUY ZONE": "现货价比50日均价低至少{dip}%。",
+    "WATCH": "现货价低于50日均价，但尚未达到{dip}%的目标跌幅。",
+    "WAIT": "现货价等于或高于50日均价。",
+}
+MA_WINDOWS = (50, 200)
+MA_CHECK_BARS = 10
+DAEMON_REPORT_TIMES = ("10:00", "15:00")
+DAEMON_CATCH_UP_SECONDS = 3600
+DAEMON_POLL_SECONDS = 60.0
+DAEMON_RETRY_SECONDS = 60.0
+DAEMON_MAX_RETRY_SECONDS = 900.0
+HISTORY_OVERLAP_DAYS = 5
+HISTORY_MAX_AGE_DAYS = 5
+HISTORY_PERIOD_DAYS = {"5d": 7, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827, "10y": 3653}
 
 WA_HOLIDAYS_2026 = {
     "2026-01-01": "New Year's Day",
@@ -42,6 +121,65 @@ WA_HOLIDAYS_2026 = {
     "2026-12-28": "Boxing Day Holiday",
 }
 
+HTML_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.S)
+HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
+JSON_LD_PATTERN = re.compile(
+    r"<(?i:script)\b[^>]*(?<![\w-])type\s*=\s*(?:\"application/ld\+json\"|'application/ld\+json'|application/ld\+json(?=[\s>]))"
+    r"[^>]*>(?P<body>.*?)</(?i:script)\s*>",
+    re.S,
+)
+PRICE_SPAN_PATTERN = re.compile(
+    r"<(?i:span)\b[^>]*(?<![\w-])class\s*=\s*(?:\"(?:[^\"]*\s)?price(?:\s[^\"]*)?\"|'(?:[^']*\s)?price(?:\s[^']*)?'|price(?=[\s>]))"
+    r"[^>]*>(?P<body>.*?)</(?i:span)\s*>",
+    re.S,
+)
+NESTED_SPAN_PATTERN = re.compile(r"<(?i:span)\b")
+
+_http_session: requests.Session | None = None
+_http_cache: dict[str, dict[str, object]] | None = None
+_http_lock = threading.Lock()
+_source_health: dict[str, SourceHealth] | None = None
+_history_memory: dict[Path, tuple[tuple[int, ...], pd.DataFrame]] = {}
+
+
+@dataclass(frozen=True)
+class WatchlistItem:
+    product_id: str
+    retailer: str
+    grams: float
+    purity: float
+    currency: str
+    url: str
+    label: str
+    label_zh: str = ""
+
+
+@dataclass(frozen=True)
+class ProductQuote:
+    item: WatchlistItem
+    price: float | None
+    premium_pct: float | None
+
+
+DEFAULT_WATCHLIST = (
+    WatchlistItem("pm_1g", "perth_mint", 1, FINE_PURITY, "AUD", PM_1G_URL, "1g minted bar", "1克金条"),
+    WatchlistItem("pm_5g", "perth_mint", 5, FINE_PURITY, "AUD", PM_5G_URL, "5g minted bar", "5克金条"),
+    WatchlistItem(
+        "taobao_share_1g", "taobao", 1, FINE_PURITY, "CNY", DEFAULT_TAOBAO_1G_URL,
+        "Lingfeng 1g public share price", "领丰金1克公开分享价",
+    ),
+)
+
+
+@dataclass(frozen=True)
+class ForecastRange:
+    horizon: str
+    expected_aud: float
+    low_aud: float
+    high_aud: float
+    coverage_pct: float
+    low_confidence: bool = False
+
 
 @dataclass(frozen=True)
 class MarketSnapshot:
@@ -60,6 +198,383 @@ class MarketSnapshot:
     taobao_app_checked_on: str = ""
     portfolio_grams: float = 0.0
     portfolio_cost_aud: float = 0.0
+    portfolio_available: bool = True
+    quotes: tuple[ProductQuote, ...] = ()
+    source_timings: tuple[tuple[str, float, str], ...] = ()
+    forecasts: tuple[ForecastRange, ...] = ()
+    dip_percentage: float = DIP_PERCENTAGE
+
+
+@dataclass(frozen=True)
+class ReportView:
+    signal: str
+    reason: str
+    signal_colour: str
+    signal_zh: str
+    reason_zh: str
+    ma50_distance: float
+    ma200_distance: float
+    market_value: float
+    profit: float
+    return_pct: float
+    taobao_1g_text: str
+    taobao_5g_text: str
+    taobao_5g_bean_text: str
+    taobao_checked: str
+    mint_quotes: tuple[tuple[ProductQuote, str], ...]
+    taobao_quotes: tuple[tuple[ProductQuote, str], ...]
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    recipient: str
+    delivered: bool
+    attempts: int
+    seconds: float
+    error: str = ""
+
+
+class TokenBucket:
+    def __init__(self, rate: float = HOST_RATE_PER_SECOND, capacity: int = HOST_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+_host_buckets: dict[str, TokenBucket] = {}
+
+
+class SourceHealth:
+    def __init__(
+        self,
+        latencies: list[float] | None = None,
+        successes: int = 0,
+        failures: int = 0,
+        consecutive_failures: int = 0,
+        opened_at: float | None = None,
+        last_success: float | None = None,
+        last_error: str = "",
+    ):
+        self.latencies = list(latencies or [])[-HEALTH_LATENCY_SAMPLES:]
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = consecutive_failures
+        self.opened_at = opened_at
+        self.last_success = last_success
+        self.last_error = last_error
+        self.probing = False
+
+    def percentile(self, percent: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(math.ceil(percent / 100 * len(ordered)) - 1, 0))]
+
+    def timeout(self, limit: float) -> float:
+        if len(self.latencies) < HEALTH_MIN_SAMPLES:
+            return limit
+        return min(limit, max(MIN_FETCH_TIMEOUT_SECONDS, self.percentile(95) * HEALTH_TIMEOUT_MULTIPLIER))
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if now - self.opened_at < CIRCUIT_COOLDOWN_SECONDS else "half_open"
+
+    def allow(self, now: float) -> bool:
+        state = self.state(now)
+        if state == "closed":
+            return True
+        if state == "open" or self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def record(self, now: float, latency: float | None, error: str = "") -> None:
+        if latency is not None:
+            self.latencies = (self.latencies + [round(latency, 4)])[-HEALTH_LATENCY_SAMPLES:]
+        if error:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.probing or self.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self.opened_at = now
+        else:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.last_success = now
+        self.probing = False
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "latencies": self.latencies,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_at": self.opened_at,
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+        }
+
+
+class StageSpan:
+    def __init__(self, metrics: "RunMetrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.size: int | None = None
+        self.retries = 0
+        self.outcome = "ok"
+
+    def add(self, size: int | None = None, retries: int = 0) -> None:
+        if size is not None:
+            self.size = (self.size or 0) + size
+        self.retries += retries
+
+    def finish(self, outcome: str) -> None:
+        self.outcome = outcome
+
+    def __enter__(self) -> "StageSpan":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback) -> bool:
+        if error is not None:
+            self.outcome = kind.__name__
+        self.metrics.record(self, time.perf_counter() - self.started)
+        return False
+
+
+class NullSpan:
+    def add(self, size: int | None = None, retries: int = 0) -> None:
+        pass
+
+    def finish(self, outcome: str) -> None:
+        pass
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, kind, error, traceback) -> bool:
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started_at = datetime.now(PERTH_TIMEZONE)
+        self.started = time.perf_counter()
+        self.stages: dict[str, dict[str, object]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, span: StageSpan, seconds: float) -> None:
+        with self.lock:
+            stage = self.stages.setdefault(span.name, {
+                "count": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": None, "retries": 0, "outcomes": {},
+            })
+            stage["count"] += 1
+            stage["seconds"] += seconds
+            stage["max_seconds"] = max(stage["max_seconds"], seconds)
+            if span.size is not None:
+                stage["bytes"] = (stage["bytes"] or 0) + span.size
+            stage["retries"] += span.retries
+            stage["outcomes"][span.outcome] = stage["outcomes"].get(span.outcome, 0) + 1
+
+    def source_timings(self) -> tuple[tuple[str, float, str], ...]:
+        with self.lock:
+            return tuple(
+                (name.removeprefix("fetch "), stage["seconds"], ", ".join(sorted(stage["outcomes"])))
+                for name, stage in self.stages.items() if name.startswith("fetch ")
+            )
+
+    def to_dict(self) -> dict[str, object]:
+        with self.lock:
+            stages = {
+                name: {
+                    **{key: value for key, value in stage.items() if value is not None},
+                    "seconds": round(stage["seconds"], 6),
+                    "max_seconds": round(stage["max_seconds"], 6),
+                    "outcomes": dict(stage["outcomes"]),
+                }
+                for name, stage in self.stages.items()
+            }
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "stages": stages,
+        }
+
+
+_run_metrics: RunMetrics | None = None
+
+
+def start_run_metrics() -> RunMetrics:
+    global _run_metrics
+    _run_metrics = RunMetrics()
+    return _run_metrics
+
+
+def finish_run_metrics(path: Path | None = None) -> Path | None:
+    global _run_metrics
+    metrics, _run_metrics = _run_metrics, None
+    if metrics is None:
+        return None
+    path = path or RUN_METRICS_PATH
+    temporary = path.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps(metrics.to_dict(), indent=2) + "\n", encoding="utf-8")
+    temporary.replace(path)
+    return path
+
+
+def stage(name: str) -> StageSpan | NullSpan:
+    metrics = _run_metrics
+    return NULL_SPAN if metrics is None else StageSpan(metrics, name)
+
+
+def timed(name: str):
+    def decorate(function):
+        @wraps(function)
+        def run(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+
+        return run
+
+    return decorate
+
+
+class RollingMeans:
+    def __init__(self, windows: Iterable[int]):
+        self.windows = tuple(sorted(set(windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError("Moving-average windows must be positive")
+        self.capacity = self.windows[-1]
+        self.values = [0.0] * self.capacity
+        self.head = 0
+        self.count = 0
+        self.last_key: str | None = None
+        self.checksum: str | None = None
+        self.sums = dict.fromkeys(self.windows, 0.0)
+
+    def _latest(self, offset: int) -> float:
+        return self.values[(self.head - offset) % self.capacity]
+
+    def push(self, key: str, value: float) -> None:
+        if self.last_key is not None and key < self.last_key:
+            return
+        if key == self.last_key:
+            previous = self._latest(1)
+            self.values[(self.head - 1) % self.capacity] = value
+            for window in self.windows:
+                self.sums[window] += value - previous
+            return
+        for window in self.windows:
+            if self.count >= window:
+                self.sums[window] -= self._latest(window)
+            self.sums[window] += value
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.last_key = key
+
+    def replay(self, items: Iterable[tuple[str, float]]) -> "RollingMeans":
+        for key, value in items:
+            self.push(key, float(value))
+        return self
+
+    def mean(self, window: int) -> float | None:
+        if window not in self.sums or self.count < window:
+            return None
+        return self.sums[window] / window
+
+    def history(self) -> list[float]:
+        return [self._latest(offset) for offset in range(self.count, 0, -1)]
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "windows": list(self.windows), "last_key": self.last_key, "checksum": self.checksum,
+            "values": self.history(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object], windows: Iterable[int]) -> "RollingMeans":
+        engine = cls(windows)
+        values = [float(value) for value in data["values"]][-engine.capacity:]
+        engine.values[:len(values)] = values
+        engine.head = len(values) % engine.capacity
+        engine.count = len(values)
+        engine.last_key = data["last_key"] if values else None
+        engine.checksum = data.get("checksum")
+        for window in engine.windows:
+            engine.sums[window] = math.fsum(values[-window:]) if len(values) >= window else math.fsum(values)
+        return engine
+
+
+def load_moving_averages(path: Path | None = None, windows: Iterable[int] = MA_WINDOWS) -> RollingMeans | None:
+    try:
+        return RollingMeans.from_dict(json.loads((path or MA_STATE_PATH).read_text(encoding="utf-8")), windows)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_moving_averages(engine: RollingMeans, path: Path | None = None) -> None:
+    path = path or MA_STATE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(engine.to_dict()), encoding="utf-8")
+
+
+def bars_checksum(keys: Iterable[str], values: Iterable[float]) -> str:
+    text = "|".join(f"{key}={float(value):.6f}" for key, value in zip(keys, values))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def update_moving_averages(closes: pd.Series, path: Path | None = None) -> RollingMeans:
+    keys = closes.index.strftime("%Y-%m-%d")
+    engine = load_moving_averages(path)
+    start = 0
+    if engine is not None and engine.last_key is not None and engine.last_key >= keys[0]:
+        start = int(keys.searchsorted(engine.last_key))
+        settled = slice(max(start - MA_CHECK_BARS, 0), start)
+        if engine.checksum != bars_checksum(keys[settled], closes.iloc[settled]):
+            start = 0
+    if not start or (engine.count < engine.capacity and len(closes) > engine.count):
+        engine, start = RollingMeans(MA_WINDOWS), 0
+    engine.replay(zip(keys[start:], closes.iloc[start:]))
+    settled = slice(max(len(keys) - 1 - MA_CHECK_BARS, 0), len(keys) - 1)
+    engine.checksum = bars_checksum(keys[settled], closes.iloc[settled])
+    save_moving_averages(engine, path)
+    return engine
+
+
+def replay_passbook(path: Path | None = None, windows: Iterable[int] = MA_WINDOWS) -> RollingMeans:
+    engine = RollingMeans(windows)
+    path = path or PASSBOOK_PATH
+    if not path.exists():
+        return engine
+    with path.open(newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            try:
+                engine.push(row["Date"][:10], float(row["Spot_AUD_g"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return engine
 
 
 def get_trading_status(now: datetime | None = None) -> tuple[str, bool]:
@@ -76,106 +591,482 @@ def get_trading_status(now: datetime | None = None) -> tuple[str, bool]:
     return "Closed — trading hours are 9am–5pm", False
 
 
-def fetch_history(symbol: str, period: str) -> pd.DataFrame:
-    history = yf.Ticker(symbol).history(period=period, auto_adjust=False)
-    if history.empty or "Close" not in history:
-        raise RuntimeError(f"No market data returned for {symbol}")
-    close = history["Close"].dropna()
-    if close.empty:
-        raise RuntimeError(f"No closing prices returned for {symbol}")
-    return history.loc[close.index]
+def history_cache_paths(symbol: str) -> tuple[Path, Path]:
+    key = re.sub(r"[^A-Za-z0-9]+", "_", symbol).strip("_")
+    return HISTORY_CACHE_DIR / f"{key}.csv", HISTORY_CACHE_DIR / f"{key}.json"
 
 
-def parse_perth_mint_price(page: str) -> float | None:
-    soup = BeautifulSoup(page, "html.parser")
-    for script in soup.find_all("script", type="application/ld+json"):
-        try:
-            payload = json.loads(script.string or script.get_text())
-        except (json.JSONDecodeError, TypeError):
-            continue
+def history_cache_stamp(data_path: Path, meta_path: Path) -> tuple[int, ...]:
+    data, meta = data_path.stat(), meta_path.stat()
+    return data.st_mtime_ns, data.st_size, meta.st_mtime_ns, meta.st_size
 
-        products = payload if isinstance(payload, list) else [payload]
-        for product in products:
-            if not isinstance(product, dict) or product.get("@type") != "Product":
-                continue
-            offers = product.get("offers", [])
-            offers = offers if isinstance(offers, list) else [offers]
-            for offer in offers:
-                if not isinstance(offer, dict):
-                    continue
-                try:
-                    price = float(str(offer.get("price", "")).replace(",", ""))
-                except ValueError:
-                    continue
-                if price > 0 and offer.get("priceCurrency", "AUD") == "AUD":
-                    return price
 
-    price_tag = soup.find("span", class_="price")
-    if not price_tag:
+def load_cached_history(symbol: str) -> pd.DataFrame | None:
+    data_path, meta_path = history_cache_paths(symbol)
+    try:
+        stamp = history_cache_stamp(data_path, meta_path)
+    except OSError:
         return None
+    remembered = _history_memory.get(data_path)
+    if remembered is not None and remembered[0] == stamp:
+        return remembered[1]
+    import pandas as pd
+
     try:
-        return float(price_tag.get_text(strip=True).replace("$", "").replace(",", ""))
-    except ValueError:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        payload = data_path.read_bytes()
+        if meta.get("symbol") != symbol or meta.get("sha256") != hashlib.sha256(payload).hexdigest():
+            return None
+        cached = pd.read_csv(io.BytesIO(payload), index_col=0, float_precision="round_trip")
+        index = pd.to_datetime(cached.index, utc=True)
+        cached.index = index.tz_convert(meta["timezone"]) if meta.get("timezone") else index.tz_localize(None)
+    except (OSError, ValueError, KeyError):
         return None
+    if (
+        len(cached) != meta.get("rows")
+        or "Close" not in cached
+        or not cached.index.is_monotonic_increasing
+        or cached.index.has_duplicates
+    ):
+        return None
+    _history_memory[data_path] = (stamp, cached)
+    return cached
+
+
+def store_cached_history(symbol: str, history: pd.DataFrame) -> None:
+    data_path, meta_path = history_cache_paths(symbol)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = history.to_csv(lineterminator="\n").encode("utf-8")
+    meta = {
+        "symbol": symbol,
+        "timezone": str(history.index.tz) if history.index.tz is not None else None,
+        "rows": len(history),
+        "last_bar": history.index[-1].isoformat(),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+    }
+    temporary = data_path.with_suffix(".csv.tmp")
+    temporary.write_bytes(payload)
+    temporary.replace(data_path)
+    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    _history_memory[data_path] = (history_cache_stamp(data_path, meta_path), history)
+
+
+def fetch_history(symbol: str, period: str, refresh: bool = False) -> pd.DataFrame:
+    import pandas as pd
+    import yfinance as yf
+
+    with stage(f"fetch history {symbol}") as span:
+        ticker = yf.Ticker(symbol)
+        window_days = HISTORY_PERIOD_DAYS.get(period)
+        cached = None if refresh or window_days is None else load_cached_history(symbol)
+        if cached is not None and not cached.empty:
+            window = pd.Timedelta(days=window_days)
+            latest = pd.Timestamp.now(tz=cached.index.tz)
+            covers_window = cached.index[0] <= cached.index[-1] - window + pd.Timedelta(days=7)
+            if not covers_window or cached.index[-1] < latest - window:
+                cached = None
+        if cached is not None and not cached.empty:
+            start = cached.index[-1] - pd.Timedelta(days=HISTORY_OVERLAP_DAYS)
+            failure = None
+            try:
+                delta = ticker.history(start=start.strftime("%Y-%m-%d"), auto_adjust=False)
+            except Exception as error:
+                delta = pd.DataFrame()
+                failure = error
+            if not delta.empty and "Close" in delta:
+                if cached.index.tz is not None and delta.index.tz is not None:
+                    delta.index = delta.index.tz_convert(cached.index.tz)
+                history = pd.concat([cached, delta.reindex(columns=cached.columns)])
+                history = history[~history.index.duplicated(keep="last")].sort_index()
+                span.finish("delta")
+            elif cached.index[-1] < latest - pd.Timedelta(days=HISTORY_MAX_AGE_DAYS):
+                raise RuntimeError(
+                    f"No recent market data for {symbol}: cached history ends {cached.index[-1]:%Y-%m-%d}"
+                ) from failure
+            else:
+                history = cached
+                span.finish("cached")
+            history = history.loc[history.index >= history.index[-1] - pd.Timedelta(days=window_days)]
+        else:
+            history = ticker.history(period=period, auto_adjust=False)
+            span.finish("full")
+        if history.empty or "Close" not in history:
+            raise RuntimeError(f"No market data returned for {symbol}")
+        close = history["Close"].dropna()
+        if close.empty:
+            raise RuntimeError(f"No closing prices returned for {symbol}")
+        history = history.loc[close.index]
+        if window_days is not None:
+            store_cached_history(symbol, history)
+        return history
+
+
+def json_ld_offer_price(text: str) -> float | None:
+    try:
+        payload = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    products = payload if isinstance(payload, list) else [payload]
+    for product in products:
+        if not isinstance(product, dict) or product.get("@type") != "Product":
+            continue
+        offers = product.get("offers", [])
+        offers = offers if isinstance(offers, list) else [offers]
+        for offer in offers:
+            if not isinstance(offer, dict):
+                continue
+            try:
+                price = float(str(offer.get("price", "")).replace(",", ""))
+            except ValueError:
+                continue
+            if price > 0 and offer.get("priceCurrency", "AUD") == "AUD":
+                return price
+    return None
 
 
-def fetch_perth_mint_price(url: str) -> float | None:
+def display_price(text: str) -> float | None:
     try:
-        response = requests.get(
-            url,
-            headers={"User-Agent": "Mozilla/5.0 (compatible; PerthGoldTracker/1.0)"},
-            timeout=15,
-        )
-        response.raise_for_status()
-        return parse_perth_mint_price(response.text)
-    except requests.RequestException:
+        return float(text.replace("$", "").replace(",", ""))
+    except ValueError:
         return None
 
 
+def parse_perth_mint_price_fast(page: str) -> float | None:
+    page = HTML_COMMENT_PATTERN.sub("", page)
+    for match in JSON_LD_PATTERN.finditer(page):
+        price = json_ld_offer_price(match.group("body"))
+        if price is not None:
+            return price
+
+    match = PRICE_SPAN_PATTERN.search(page)
+    if not match or NESTED_SPAN_PATTERN.search(match.group("body")):
+        return None
+    return display_price(html.unescape(HTML_TAG_PATTERN.sub("", match.group("body"))).strip())
+
+
+def parse_perth_mint_price_soup(page: str) -> float | None:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, "html.parser")
+    for script in soup.find_all("script", type="application/ld+json"):
+        price = json_ld_offer_price(script.string or script.get_text())
+        if price is not None:
+            return price
+
+    price_tag = soup.find("span", class_="price")
+    if not price_tag:
+        return None
+    return display_price(price_tag.get_text(strip=True))
+
+
+def parse_perth_mint_price(page: str) -> float | None:
+    price = parse_perth_mint_price_fast(page)
+    return price if price is not None else parse_perth_mint_price_soup(page)
+
+
+def get_http_session() -> requests.Session:
+    global _http_session
+    import requests
+
+    with _http_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = requests.utils.DEFAULT_ACCEPT_ENCODING
+            _http_session = session
+        return _http_session
+
+
+def load_http_cache(path: Path | None = None) -> dict[str, dict[str, object]]:
+    global _http_cache
+    with _http_lock:
+        if _http_cache is None:
+            try:
+                _http_cache = json.loads((path or HTTP_CACHE_PATH).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                _http_cache = {}
+        return _http_cache
+
+
+def save_http_cache(path: Path | None = None) -> None:
+    path = path or HTTP_CACHE_PATH
+    with _http_lock:
+        if _http_cache is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(_http_cache, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_source_health(path: Path | None = None) -> dict[str, SourceHealth]:
+    global _source_health
+    with _http_lock:
+        if _source_health is None:
+            try:
+                stored = json.loads((path or SOURCE_HEALTH_PATH).read_text(encoding="utf-8"))
+                _source_health = {host: SourceHealth(**fields) for host, fields in stored.items()}
+            except (OSError, ValueError, TypeError, AttributeError):
+                _source_health = {}
+        return _source_health
+
+
+def save_source_health(path: Path | None = None) -> None:
+    path = path or SOURCE_HEALTH_PATH
+    with _http_lock:
+        if _source_health is None:
+            return
+        stored = {host: health.to_dict() for host, health in _source_health.items()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(stored, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def source_health(host: str) -> SourceHealth:
+    health = load_source_health()
+    with _http_lock:
+        return health.setdefault(host, SourceHealth())
+
+
+def response_bytes(response: requests.Response) -> int:
+    length = str(response.headers.get("Content-Length", "")).strip()
+    return int(length) if length.isdigit() else len(response.content)
+
+
+def fetch_page_price(
+    url: str,
+    parser: Callable[[str], float | None],
+    headers: dict[str, str],
+    timeout: float,
+) -> float | None:
+    import requests
+
+    cache = load_http_cache()
+    entry = cache.get(url, {})
+    conditional = {}
+    if entry.get("price") is not None:
+        if entry.get("etag"):
+            conditional["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            conditional["If-Modified-Since"] = entry["last_modified"]
+    host = urlsplit(url).hostname or ""
+    health = source_health(host)
+    with _http_lock:
+        allowed = health.allow(time.time())
+        timeout = health.timeout(timeout)
+    with stage(f"fetch {host}") as span:
+        if not allowed:
+            span.finish("circuit_open")
+            return None
+        started = time.monotonic()
+        try:
+            response = get_http_session().get(url, headers={**headers, **conditional}, timeout=timeout)
+            span.add(size=response_bytes(response))
+            if response.status_code == 304 and conditional:
+                span.finish("not_modified")
+                with _http_lock:
+                    health.record(time.time(), time.monotonic() - started)
+                return float(entry["price"])
+            response.raise_for_status()
+        except requests.RequestException as error:
+            span.finish(type(error).__name__)
+            with _http_lock:
+                health.record(time.time(), None, type(error).__name__)
+            return None
+
+        latency = time.monotonic() - started
+        price = parser(response.text)
+        if price is None:
+            span.finish("no_price")
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    with _http_lock:
+        health.record(time.time(), latency, "" if price is not None else "no_price")
+        if price is not None and (etag or last_modified):
+            cache[url] = {"etag": etag, "last_modified": last_modified, "price": price}
+        else:
+            cache.pop(url, None)
+    return price
+
+
+def fetch_perth_mint_price(url: str, timeout: float = PERTH_MINT_TIMEOUT_SECONDS) -> float | None:
+    return fetch_page_price(
+        url,
+        parse_perth_mint_price,
+        {"User-Agent": "Mozilla/5.0 (compatible; PerthGoldTracker/1.0)"},
+        timeout,
+    )
+
+
 def parse_taobao_share_price(page: str) -> float | None:
     decoded = html.unescape(page)
     match = re.search(r"[?&]price=(\d+(?:\.\d+)?)", decoded)
     return float(match.group(1)) if match else None
 
 
-def fetch_taobao_visible_price(url: str) -> float | None:
+def fetch_taobao_visible_price(url: str, timeout: float = TAOBAO_TIMEOUT_SECONDS) -> float | None:
     if not url:
         return None
 
+    return fetch_page_price(
+        url,
+        parse_taobao_share_price,
+        {
+            "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
+            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.7",
+        },
+        timeout,
+    )
+
+
+def load_watchlist(path: Path | None = None) -> list[WatchlistItem]:
+    path = path or WATCHLIST_PATH
+    if not path.exists():
+        return list(DEFAULT_WATCHLIST)
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        required = {"Product_ID", "Retailer", "Grams", "Purity", "Currency", "URL"}
+        if not required.issubset(reader.fieldnames or []):
+            raise RuntimeError(f"{path} must contain columns: {', '.join(sorted(required))}")
+        items = []
+        seen = set()
+        for line, row in enumerate(reader, start=2):
+            product_id = row["Product_ID"].strip()
+            retailer = row["Retailer"].strip().lower()
+            currency = row["Currency"].strip().upper()
+            try:
+                grams = float(row["Grams"])
+                purity = float(row["Purity"] or 1)
+            except ValueError:
+                raise RuntimeError(f"{path} line {line}: Grams and Purity must be numbers") from None
+            if not product_id or product_id in seen:
+                raise RuntimeError(f"{path} line {line}: Product_ID must be present and unique")
+            if RETAILER_CURRENCIES.get(retailer) != currency:
+                raise RuntimeError(f"{path} line {line}: unsupported retailer/currency {retailer}/{currency}")
+            if grams <= 0 or not 0 < purity <= 1:
+                raise RuntimeError(f"{path} line {line}: Grams must be positive and Purity between 0 and 1")
+            seen.add(product_id)
+            items.append(WatchlistItem(
+                product_id, retailer, grams, purity, currency, row["URL"].strip(),
+                (row.get("Label") or "").strip() or product_id, (row.get("Label_ZH") or "").strip(),
+            ))
+    return items
+
+
+def host_bucket(url: str) -> TokenBucket:
+    host = urlsplit(url).hostname or ""
+    with _http_lock:
+        return _host_buckets.setdefault(host, TokenBucket())
+
+
+def watchlist_deadline(items: list[WatchlistItem]) -> float:
+    per_host: dict[str, int] = {}
+    for item in items:
+        if item.url:
+            host = urlsplit(item.url).hostname or ""
+            per_host[host] = per_host.get(host, 0) + 1
+    queued = max(max(per_host.values(), default=0) - HOST_BURST, 0) / HOST_RATE_PER_SECOND
+    needed = queued + max(PERTH_MINT_TIMEOUT_SECONDS, TAOBAO_TIMEOUT_SECONDS)
+    return min(max(FETCH_DEADLINE_SECONDS, needed), WATCHLIST_MAX_DEADLINE_SECONDS)
+
+
+def fetch_retail_price(item: WatchlistItem, timeout: float) -> float | None:
+    if item.retailer == "perth_mint":
+        return fetch_perth_mint_price(item.url, timeout)
+    return fetch_taobao_visible_price(item.url, timeout)
+
+
+@timed("fetch_watchlist")
+def fetch_watchlist(
+    items: list[WatchlistItem],
+    deadline: float | None = None,
+    workers: int = WATCHLIST_WORKERS,
+) -> dict[str, float | None]:
+    deadline = deadline if deadline is not None else watchlist_deadline(items)
+    started = time.monotonic()
+    timeouts = {"perth_mint": PERTH_MINT_TIMEOUT_SECONDS, "taobao": TAOBAO_TIMEOUT_SECONDS}
+
+    def fetch(item: WatchlistItem) -> float | None:
+        remaining = started + deadline - time.monotonic()
+        if not item.url or remaining <= 0 or not host_bucket(item.url).acquire(started + deadline):
+            return None
+        return fetch_retail_price(item, min(timeouts[item.retailer], max(started + deadline - time.monotonic(), 0.1)))
+
+    pool = ThreadPoolExecutor(max_workers=max(min(workers, len(items)), 1), thread_name_prefix="gold-retail")
+    futures = {item.product_id: pool.submit(fetch, item) for item in items}
+    prices: dict[str, float | None] = {}
     try:
-        response = requests.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
-                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.7",
-            },
-            timeout=20,
-        )
-        response.raise_for_status()
-        return parse_taobao_share_price(response.text)
-    except requests.RequestException:
+        for product_id, future in futures.items():
+            try:
+                prices[product_id] = future.result(timeout=max(started + deadline - time.monotonic(), 0))
+            except Exception:
+                prices[product_id] = None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return prices
+
+
+def premium_pct(price: float, grams: float, spot: float, purity: float = FINE_PURITY) -> float:
+    return (price / (grams * purity) / spot - 1) * 100
+
+
+def price_quotes(
+    items: Iterable[WatchlistItem],
+    prices: dict[str, float | None],
+    spot_aud: float,
+    spot_cny: float,
+) -> tuple[ProductQuote, ...]:
+    import numpy as np
+
+    items = list(items)
+    price = np.array([prices.get(item.product_id, np.nan) for item in items], dtype="float64")
+    grams = np.array([item.grams for item in items], dtype="float64")
+    purity = np.array([item.purity for item in items], dtype="float64")
+    spot = np.array([spot_aud if item.currency == "AUD" else spot_cny for item in items], dtype="float64")
+    premiums = premium_pct(price, grams, spot, purity)
+    return tuple(
+        ProductQuote(item, None, None) if np.isnan(value) else ProductQuote(item, float(value), float(markup))
+        for item, value, markup in zip(items, price, premiums)
+    )
+
+
+def csv_number(value: str) -> float | None:
+    try:
+        number = float(value)
+    except ValueError:
         return None
+    return number if math.isfinite(number) else None
+
+
+def read_csv_columns(path: Path, names: Iterable[str]) -> tuple[list[str], list[list[str]]]:
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, [])
+        rows = list(reader)
+    columns = []
+    for name in names:
+        if name not in header:
+            columns.append([""] * len(rows))
+            continue
+        index = header.index(name)
+        columns.append([row[index] if index < len(row) else "" for row in rows])
+    return header, columns
 
 
 def load_portfolio(path: Path = HOLDINGS_PATH) -> tuple[float, float]:
-    if not path.exists():
-        return 0.0, 0.0
-    holdings = pd.read_csv(path)
-    if "Grams" not in holdings.columns:
-        raise RuntimeError(f"{path} must contain a Grams column")
-    if "Total_Paid_AUD" not in holdings.columns and "Price_Paid_AUD" not in holdings.columns:
-        raise RuntimeError(f"{path} must contain Total_Paid_AUD or Price_Paid_AUD")
+    import portfolio
+
+    book = portfolio.load_ledger(path)
+    return book.total_open_grams, book.total_open_cost
 
-    grams = pd.to_numeric(holdings["Grams"], errors="coerce")
-    total_paid = pd.Series(float("nan"), index=holdings.index, dtype="float64")
-    if "Total_Paid_AUD" in holdings.columns:
-        total_paid = pd.to_numeric(holdings["Total_Paid_AUD"], errors="coerce")
-    if "Price_Paid_AUD" in holdings.columns:
-        unit_price = pd.to_numeric(holdings["Price_Paid_AUD"], errors="coerce")
-        total_paid = total_paid.fillna(grams * unit_price)
 
-    valid = grams.notna() & total_paid.notna() & (grams > 0) & (total_paid >= 0)
-    return float(grams[valid].sum()), float(total_paid[valid].sum())
+def portfolio_fields(path: Path = HOLDINGS_PATH) -> dict[str, object]:
+    try:
+        grams, cost = load_portfolio(path)
+    except RuntimeError as error:
+        print(f"Warning: holdings left out of the report: {error}")
+        return {"portfolio_grams": 0.0, "portfolio_cost_aud": 0.0, "portfolio_available": False}
+    return {"portfolio_grams": grams, "portfolio_cost_aud": cost, "portfolio_available": True}
 
 
 def load_taobao_app_prices(
@@ -183,110 +1074,196 @@ def load_taobao_app_prices(
 ) -> tuple[float | None, float | None, float | None, str]:
     if not path.exists():
         return None, None, None, ""
-    prices = pd.read_csv(path)
-    required = {"Date", "Variant", "Price_CNY"}
-    if not required.issubset(prices.columns):
+    required = ("Date", "Variant", "Price_CNY")
+    columns, values = read_csv_columns(path, required)
+    if not set(required).issubset(columns):
         raise RuntimeError(f"{path} must contain columns: {', '.join(sorted(required))}")
 
-    prices["Date"] = pd.to_datetime(prices["Date"], errors="coerce")
-    prices["Price_CNY"] = pd.to_numeric(prices["Price_CNY"], errors="coerce")
-    prices["Variant"] = prices["Variant"].astype(str).str.strip().str.lower()
-    valid = prices["Date"].notna() & prices["Price_CNY"].notna() & (prices["Price_CNY"] > 0)
-    prices = prices.loc[valid]
-    if prices.empty:
+    latest_text = None
+    latest_date = None
+    latest: dict[str, float] = {}
+    for date_text, variant, price_text in zip(*values):
+        price = csv_number(price_text)
+        if price is None or price <= 0:
+            continue
+        if date_text != latest_text:
+            try:
+                checked = datetime.fromisoformat(date_text.strip()).replace(tzinfo=None)
+            except ValueError:
+                continue
+            if latest_date is not None and checked < latest_date:
+                continue
+            if checked != latest_date:
+                latest_date, latest = checked, {}
+            latest_text = date_text
+        latest[variant.strip().lower()] = price
+    if latest_date is None:
         return None, None, None, ""
 
-    latest_date = prices["Date"].max()
-    latest = prices.loc[prices["Date"] == latest_date].set_index("Variant")["Price_CNY"]
-
-    def get_price(variant: str) -> float | None:
-        value = latest.get(variant)
-        return float(value) if value is not None else None
-
     return (
-        get_price("1g_bar"),
-        get_price("5g_bar"),
-        get_price("5g_bean"),
+        latest.get("1g_bar"),
+        latest.get("5g_bar"),
+        latest.get("5g_bean"),
         latest_date.strftime("%d %b %Y"),
     )
 
 
-def collect_snapshot(now: datetime | None = None) -> MarketSnapshot:
+def fetch_sources(
+    jobs: dict[str, tuple[Callable[[], object], float]],
+    deadline: float = FETCH_DEADLINE_SECONDS,
+) -> dict[str, object]:
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(len(jobs), 1), thread_name_prefix="gold-fetch")
+    futures = {name: pool.submit(job) for name, (job, _) in jobs.items()}
+    results: dict[str, object] = {}
+    try:
+        for name, future in futures.items():
+            limit = min(jobs[name][1], deadline)
+            try:
+                results[name] = future.result(timeout=max(started + limit - time.monotonic(), 0))
+            except FutureTimeoutError:
+                results[name] = TimeoutError(f"{name} did not respond within {limit:g}s")
+            except Exception as error:
+                results[name] = error
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def required_result(results: dict[str, object], name: str):
+    result = results[name]
+    if isinstance(result, TimeoutError):
+        raise RuntimeError(str(result)) from result
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def optional_result(results: dict[str, object], name: str):
+    result = results.get(name)
+    return None if isinstance(result, Exception) else result
+
+
+def latest_forecasts(gold: pd.Series, aud_usd: pd.Series) -> tuple[ForecastRange, ...]:
+    try:
+        import forecast
+
+        with stage("forecast"):
+            return forecast.daily_forecast(gold, aud_usd)
+    except Exception:
+        return ()
+
+
+@timed("collect_snapshot")
+def collect_snapshot(now: datetime | None = None, refresh_history: bool = False) -> MarketSnapshot:
     captured_at = now or datetime.now(PERTH_TIMEZONE)
-    gold = fetch_history("GC=F", "1y")["Close"].dropna()
-    if len(gold) < 200:
-        raise RuntimeError(f"Only {len(gold)} gold observations returned; 200 are required")
+    taobao_1g_url = os.environ.get("TAOBAO_1G_URL", "").strip()
+    taobao_5g_url = os.environ.get("TAOBAO_5G_URL", "").strip()
+    app_1g_cny, app_5g_cny, app_5g_bean_cny, app_checked_on = load_taobao_app_prices()
 
-    aud_usd = float(fetch_history("AUDUSD=X", "5d")["Close"].dropna().iloc[-1])
-    usd_cny = float(fetch_history("CNY=X", "5d")["Close"].dropna().iloc[-1])
+    watchlist = load_watchlist()
+    if taobao_1g_url:
+        watchlist = [
+            WatchlistItem(**{**item.__dict__, "url": taobao_1g_url}) if item.product_id == "taobao_share_1g" else item
+            for item in watchlist
+        ]
+    if app_5g_cny is None and taobao_5g_url:
+        watchlist.append(WatchlistItem(
+            "taobao_5g", "taobao", 5, FINE_PURITY, "CNY", taobao_5g_url, "Lingfeng 5g share price", "领丰金5克分享价",
+        ))
+    deadline = watchlist_deadline(watchlist)
+    jobs: dict[str, tuple[Callable[[], object], float]] = {
+        "gold": (lambda: fetch_history("GC=F", "1y", refresh_history), HISTORY_TIMEOUT_SECONDS),
+        "aud_usd": (lambda: fetch_history("AUDUSD=X", "5d", refresh_history), HISTORY_TIMEOUT_SECONDS),
+        "usd_cny": (lambda: fetch_history("CNY=X", "5d", refresh_history), HISTORY_TIMEOUT_SECONDS),
+        "watchlist": (lambda: fetch_watchlist(watchlist, deadline), deadline),
+    }
+    results = fetch_sources(jobs, deadline)
+
+    gold = required_result(results, "gold")["Close"].dropna()
+    averages = update_moving_averages(gold)
+    if averages.mean(200) is None:
+        raise RuntimeError(f"Only {averages.count} gold observations returned; 200 are required")
+
+    aud_usd_closes = required_result(results, "aud_usd")["Close"].dropna()
+    aud_usd = float(aud_usd_closes.iloc[-1])
+    usd_cny = float(required_result(results, "usd_cny")["Close"].dropna().iloc[-1])
     if aud_usd <= 0 or usd_cny <= 0:
         raise RuntimeError("Invalid foreign-exchange rate returned")
 
     gold_usd_per_gram = gold / OUNCE_TO_GRAMS
-    gold_aud_per_gram = gold_usd_per_gram / aud_usd
-    spot_aud = float(gold_aud_per_gram.iloc[-1])
+    spot_aud = float(gold_usd_per_gram.iloc[-1] / aud_usd)
     spot_cny = float(gold_usd_per_gram.iloc[-1] * usd_cny)
     daily_change_pct = float(gold.iloc[-1] / gold.iloc[-2] - 1) * 100
-    taobao_1g_url = os.environ.get("TAOBAO_1G_URL", "").strip() or DEFAULT_TAOBAO_1G_URL
-    taobao_5g_url = os.environ.get("TAOBAO_5G_URL", "").strip()
-    taobao_share_1g_cny = fetch_taobao_visible_price(taobao_1g_url)
-    app_1g_cny, app_5g_cny, app_5g_bean_cny, app_checked_on = load_taobao_app_prices()
+    quotes = price_quotes(watchlist, optional_result(results, "watchlist") or {}, spot_aud, spot_cny)
+    prices = {quote.item.product_id: quote.price for quote in quotes}
+    taobao_share_1g_cny = prices.get("taobao_share_1g")
     taobao_1g_cny = app_1g_cny if app_1g_cny is not None else taobao_share_1g_cny
-    taobao_5g_cny = app_5g_cny if app_5g_cny is not None else fetch_taobao_visible_price(taobao_5g_url)
+    taobao_5g_cny = app_5g_cny if app_5g_cny is not None else prices.get("taobao_5g")
     if taobao_5g_cny is None and taobao_1g_cny is not None:
         taobao_5g_cny = taobao_1g_cny * 5
-    portfolio_grams, portfolio_cost_aud = load_portfolio()
 
     return MarketSnapshot(
         captured_at=captured_at.astimezone(PERTH_TIMEZONE),
         spot_aud=spot_aud,
         spot_cny=spot_cny,
         daily_change_pct=daily_change_pct,
-        ma50_aud=float(gold_aud_per_gram.tail(50).mean()),
-        ma200_aud=float(gold_aud_per_gram.tail(200).mean()),
-        pm_1g=fetch_perth_mint_price(PM_1G_URL),
-        pm_5g=fetch_perth_mint_price(PM_5G_URL),
+        ma50_aud=averages.mean(50) / OUNCE_TO_GRAMS / aud_usd,
+        ma200_aud=averages.mean(200) / OUNCE_TO_GRAMS / aud_usd,
+        pm_1g=prices.get("pm_1g"),
+        pm_5g=prices.get("pm_5g"),
         taobao_1g_cny=taobao_1g_cny,
         taobao_5g_cny=taobao_5g_cny,
         taobao_5g_bean_cny=app_5g_bean_cny,
         taobao_share_1g_cny=taobao_share_1g_cny,
         taobao_app_checked_on=app_checked_on,
-        portfolio_grams=portfolio_grams,
-        portfolio_cost_aud=portfolio_cost_aud,
+        quotes=quotes,
+        forecasts=latest_forecasts(gold, aud_usd_closes),
+        **portfolio_fields(),
     )
 
 
 def get_signal(snapshot: MarketSnapshot) -> tuple[str, str, str]:
-    dip_target = snapshot.ma50_aud * (1 - DIP_PERCENTAGE)
+    dip_target = snapshot.ma50_aud * (1 - snapshot.dip_percentage)
+    dip = f"{snapshot.dip_percentage * 100:g}"
     if snapshot.spot_aud <= dip_target:
-        return "BUY ZONE", "Spot is at least 5% below its 50-day average.", "#166534"
+        return "BUY ZONE", f"Spot is at least {dip}% below its 50-day average.", "#166534"
     if snapshot.spot_aud < snapshot.ma50_aud:
-        return "WATCH", "Spot is below its 50-day average, but not yet at the 5% target.", "#a16207"
+        return "WATCH", f"Spot is below its 50-day average, but not yet at the {dip}% target.", "#a16207"
     return "WAIT", "Spot is at or above its 50-day average.", "#475569"
 
 
-def premium(price: float | None, grams: int, spot_aud: float) -> float | None:
-    if price is None:
-        return None
-    return (price / grams / spot_aud - 1) * 100
-
-
-def price_text(price: float | None, grams: int, spot_aud: float) -> str:
-    if price is None:
-        return "Unavailable"
-    markup = premium(price, grams, spot_aud)
-    return f"${price:,.2f} AUD ({markup:+.1f}% premium)"
-
-
 def taobao_price_text(price_cny: float | None, grams: int, snapshot: MarketSnapshot) -> str:
     if price_cny is None:
         return "Unavailable"
     cny_per_aud = snapshot.spot_cny / snapshot.spot_aud
     price_aud = price_cny / cny_per_aud
-    markup = (price_cny / grams / snapshot.spot_cny - 1) * 100
+    markup = premium_pct(price_cny, grams, snapshot.spot_cny)
     return f"¥{price_cny:,.2f} / A${price_aud:,.2f} ({markup:+.1f}% premium)"
 
 
+def retail_quotes(snapshot: MarketSnapshot, retailer: str) -> list[ProductQuote]:
+    quotes = snapshot.quotes or price_quotes(
+        [item for item in DEFAULT_WATCHLIST if item.retailer == "perth_mint"],
+        {"pm_1g": snapshot.pm_1g, "pm_5g": snapshot.pm_5g},
+        snapshot.spot_aud,
+        snapshot.spot_cny,
+    )
+    return [
+        quote for quote in quotes
+        if quote.item.retailer == retailer and quote.item.product_id not in LINGFENG_PRODUCT_IDS
+    ]
+
+
+def quote_text(quote: ProductQuote, snapshot: MarketSnapshot) -> str:
+    if quote.price is None:
+        return "Unavailable"
+    if quote.item.currency == "AUD":
+        return f"${quote.price:,.2f} AUD ({quote.premium_pct:+.1f}% premium)"
+    price_aud = quote.price * snapshot.spot_aud / snapshot.spot_cny
+    return f"¥{quote.price:,.2f} / A${price_aud:,.2f} ({quote.premium_pct:+.1f}% premium)"
+
+
 def taobao_checked_label(snapshot: MarketSnapshot) -> str:
     if not snapshot.taobao_app_checked_on:
         return "Not verified"
@@ -299,94 +1276,169 @@ def taobao_checked_label(snapshot: MarketSnapshot) -> str:
     return f"{snapshot.taobao_app_checked_on}{stale}"
 
 
+def portfolio_metrics(snapshot: MarketSnapshot) -> tuple[float, float, float]:
+    market_value = snapshot.portfolio_grams * snapshot.spot_aud
+    profit = market_value - snapshot.portfolio_cost_aud
+    return_pct = (profit / snapshot.portfolio_cost_aud * 100) if snapshot.portfolio_cost_aud else 0.0
+    return market_value, profit, return_pct
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def report_view(snapshot: MarketSnapshot) -> ReportView:
+    signal, reason, signal_colour = get_signal(snapshot)
+    market_value, profit, return_pct = portfolio_metrics(snapshot)
+    return ReportView(
+        signal=signal,
+        reason=reason,
+        signal_colour=signal_colour,
+        signal_zh=SIGNAL_ZH[signal],
+        reason_zh=REASON_ZH[signal].format(dip=f"{snapshot.dip_percentage * 100:g}"),
+        ma50_distance=(snapshot.spot_aud / snapshot.ma50_aud - 1) * 100,
+        ma200_distance=(snapshot.spot_aud / snapshot.ma200_aud - 1) * 100,
+        market_value=market_value,
+        profit=profit,
+        return_pct=return_pct,
+        taobao_1g_text=taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot),
+        taobao_5g_text=taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot),
+        taobao_5g_bean_text=taobao_price_text(snapshot.taobao_5g_bean_cny, 5, snapshot),
+        taobao_checked=taobao_checked_label(snapshot),
+        mint_quotes=tuple((quote, quote_text(quote, snapshot)) for quote in retail_quotes(snapshot, "perth_mint")),
+        taobao_quotes=tuple((quote, quote_text(quote, snapshot)) for quote in retail_quotes(snapshot, "taobao")),
+    )
+
+
+def clear_render_cache() -> None:
+    for cached in (
+        report_view, build_chinese_summary, build_plain_report, build_html_report, build_mandarin_html_report,
+    ):
+        cached.cache_clear()
+
+
 def taobao_plain_lines(snapshot: MarketSnapshot) -> str:
+    view = report_view(snapshot)
+    other_listings = [f"{quote.item.label}: {text} — {quote.item.url}" for quote, text in view.taobao_quotes]
     if snapshot.taobao_app_checked_on:
         return "\n".join([
-            f"Lingfeng 1g bar: {taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot)}",
-            f"Lingfeng 5g gold bar: {taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot)}",
-            f"Lingfeng 5g gold bean: {taobao_price_text(snapshot.taobao_5g_bean_cny, 5, snapshot)}",
-            f"Prices checked: {taobao_checked_label(snapshot)}",
+            f"Lingfeng 1g bar: {view.taobao_1g_text}",
+            f"Lingfeng 5g gold bar: {view.taobao_5g_text}",
+            f"Lingfeng 5g gold bean: {view.taobao_5g_bean_text}",
+            f"Prices checked: {view.taobao_checked}",
             f"Product: {DEFAULT_TAOBAO_1G_URL}",
+            *other_listings,
         ])
     return "\n".join([
-        f"Lingfeng 1g public share price: {taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot)}",
-        f"Lingfeng 5g (5× 1g estimate): {taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot)}",
+        f"Lingfeng 1g public share price: {view.taobao_1g_text}",
+        f"Lingfeng 5g (5× 1g estimate): {view.taobao_5g_text}",
         "Variant prices were not recently verified.",
         f"Product: {DEFAULT_TAOBAO_1G_URL}",
+        *other_listings,
     ])
 
 
-def portfolio_metrics(snapshot: MarketSnapshot) -> tuple[float, float, float]:
-    market_value = snapshot.portfolio_grams * snapshot.spot_aud
-    profit = market_value - snapshot.portfolio_cost_aud
-    return_pct = (profit / snapshot.portfolio_cost_aud * 100) if snapshot.portfolio_cost_aud else 0.0
-    return market_value, profit, return_pct
+def perth_mint_plain_lines(snapshot: MarketSnapshot) -> str:
+    return "\n".join(f"{quote.item.label}: {text} — {quote.item.url}" for quote, text in report_view(snapshot).mint_quotes)
 
 
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+@timed("render chinese_summary")
 def build_chinese_summary(snapshot: MarketSnapshot, store_status: str) -> str:
-    signal, _, _ = get_signal(snapshot)
-    signal_zh = {"BUY ZONE": "买入区间", "WATCH": "关注", "WAIT": "等待"}[signal]
-    reason_zh = {
-        "BUY ZONE": "现货价比50日均价低至少5%。",
-        "WATCH": "现货价低于50日均价，但尚未达到5%的目标跌幅。",
-        "WAIT": "现货价等于或高于50日均价。",
-    }[signal]
-    market_value, profit, return_pct = portfolio_metrics(snapshot)
+    view = report_view(snapshot)
+    mint_lines = "\n".join(
+        [f"{quote.item.label_zh or quote.item.label}：{text}" for quote, text in view.mint_quotes]
+        + [f"珀斯铸币局{quote.item.label_zh or quote.item.label}链接：{quote.item.url}" for quote, _ in view.mint_quotes]
+    )
+    taobao_lines = "".join(
+        f"\n淘宝{quote.item.label_zh or quote.item.label}：{text} {quote.item.url}" for quote, text in view.taobao_quotes
+    )
+    holdings_line = ""
+    if snapshot.portfolio_available:
+        holdings_line = (
+            f"\n持仓：{snapshot.portfolio_grams:g}克 | 成本 A${snapshot.portfolio_cost_aud:,.2f} | "
+            f"市值 A${view.market_value:,.2f} | 浮动盈亏 A${view.profit:+,.2f}（{view.return_pct:+.1f}%）"
+        )
     return f"""黄金更新（珀斯时间 {snapshot.captured_at:%Y-%m-%d %H:%M}）
-信号：{signal_zh} — {reason_zh}
+信号：{view.signal_zh} — {view.reason_zh}
 现货：A${snapshot.spot_aud:,.2f}/克 | ¥{snapshot.spot_cny:,.2f}/克
 日变动：{snapshot.daily_change_pct:+.2f}%
 50日均价：A${snapshot.ma50_aud:,.2f}/克
 200日均价：A${snapshot.ma200_aud:,.2f}/克
 珀斯铸币局：{store_status}
-1克金条：{price_text(snapshot.pm_1g, 1, snapshot.spot_aud)}
-5克金条：{price_text(snapshot.pm_5g, 5, snapshot.spot_aud)}
-珀斯铸币局1克链接：{PM_1G_URL}
-珀斯铸币局5克链接：{PM_5G_URL}
-淘宝领丰金1克金条：{taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot)}
-淘宝领丰金5克金条：{taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot)}
-淘宝领丰金5克金豆：{taobao_price_text(snapshot.taobao_5g_bean_cny, 5, snapshot)}
-淘宝价格核对日期：{taobao_checked_label(snapshot)}
-淘宝商品链接：{DEFAULT_TAOBAO_1G_URL}
-持仓：{snapshot.portfolio_grams:g}克 | 成本 A${snapshot.portfolio_cost_aud:,.2f} | 市值 A${market_value:,.2f} | 浮动盈亏 A${profit:+,.2f}（{return_pct:+.1f}%）
+{mint_lines}
+淘宝领丰金1克金条：{view.taobao_1g_text}
+淘宝领丰金5克金条：{view.taobao_5g_text}
+淘宝领丰金5克金豆：{view.taobao_5g_bean_text}
+淘宝价格核对日期：{view.taobao_checked}
+淘宝商品链接：{DEFAULT_TAOBAO_1G_URL}{taobao_lines}{holdings_line}
 记录新的黄金购买：{RECORD_PURCHASE_URL}
 仅供市场跟踪，不构成投资建议。"""
 
 
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+@timed("render plain_report")
 def build_plain_report(snapshot: MarketSnapshot, store_status: str, bilingual: bool = True) -> str:
-    signal, reason, _ = get_signal(snapshot)
-    ma50_distance = (snapshot.spot_aud / snapshot.ma50_aud - 1) * 100
-    ma200_distance = (snapshot.spot_aud / snapshot.ma200_aud - 1) * 100
-    market_value, profit, return_pct = portfolio_metrics(snapshot)
+    view = report_view(snapshot)
+    holdings_lines = ""
+    if snapshot.portfolio_available:
+        holdings_lines = f"""Gold: {snapshot.portfolio_grams:g}g
+Cost basis: ${snapshot.portfolio_cost_aud:,.2f} AUD
+Spot value: ${view.market_value:,.2f} AUD
+Unrealized P/L: ${view.profit:+,.2f} AUD ({view.return_pct:+.1f}%)
+"""
     return f"""PERTH GOLD UPDATE
 {snapshot.captured_at:%A, %d %B %Y at %I:%M %p} AWST
 
-SIGNAL: {signal}
-{reason}
+SIGNAL: {view.signal}
+{view.reason}
 
 MARKET
 Spot: ${snapshot.spot_aud:,.2f} AUD/g | ¥{snapshot.spot_cny:,.2f} CNY/g
 Daily move: {snapshot.daily_change_pct:+.2f}%
-50-day average: ${snapshot.ma50_aud:,.2f} AUD/g ({ma50_distance:+.2f}%)
-200-day average: ${snapshot.ma200_aud:,.2f} AUD/g ({ma200_distance:+.2f}%)
-
+50-day average: ${snapshot.ma50_aud:,.2f} AUD/g ({view.ma50_distance:+.2f}%)
+200-day average: ${snapshot.ma200_aud:,.2f} AUD/g ({view.ma200_distance:+.2f}%)
+{forecast_plain_lines(snapshot)}
 PERTH MINT
 Store: {store_status}
-1g bar: {price_text(snapshot.pm_1g, 1, snapshot.spot_aud)} — {PM_1G_URL}
-5g bar: {price_text(snapshot.pm_5g, 5, snapshot.spot_aud)} — {PM_5G_URL}
+{perth_mint_plain_lines(snapshot)}
 
 TAOBAO PRICES
 {taobao_plain_lines(snapshot)}
 
 YOUR HOLDINGS
-Gold: {snapshot.portfolio_grams:g}g
-Cost basis: ${snapshot.portfolio_cost_aud:,.2f} AUD
-Spot value: ${market_value:,.2f} AUD
-Unrealized P/L: ${profit:+,.2f} AUD ({return_pct:+.1f}%)
-Record a purchase: {RECORD_PURCHASE_URL}
+{holdings_lines}Record a purchase: {RECORD_PURCHASE_URL}
 
 This is a market-tracking alert, not financial advice. Retail prices may change before purchase.
-""" + (f"\n中文摘要\n{build_chinese_summary(snapshot, store_status)}\n" if bilingual else "")
+""" + source_timing_plain_lines(snapshot) + (
+        f"\n中文摘要\n{build_chinese_summary(snapshot, store_status)}\n" if bilingual else ""
+    )
+
+
+def forecast_text(forecast: ForecastRange) -> str:
+    caution = " — low confidence" if forecast.low_confidence else ""
+    return (
+        f"${forecast.expected_aud:,.2f} AUD/g "
+        f"(${forecast.low_aud:,.2f}–${forecast.high_aud:,.2f}){caution}"
+    )
+
+
+def forecast_plain_lines(snapshot: MarketSnapshot) -> str:
+    if not snapshot.forecasts:
+        return ""
+    coverage = snapshot.forecasts[0].coverage_pct
+    return f"\nOUTLOOK ({coverage:.0f}% range, walk-forward model)\n" + "\n".join(
+        f"{forecast.horizon}: {forecast_text(forecast)}" for forecast in snapshot.forecasts
+    ) + "\n"
+
+
+def source_timing_text(name: str, seconds: float, outcome: str) -> str:
+    return f"{name}: {seconds:.2f}s ({outcome})"
+
+
+def source_timing_plain_lines(snapshot: MarketSnapshot) -> str:
+    if not snapshot.source_timings:
+        return ""
+    return "\nSOURCE TIMING\n" + "\n".join(
+        source_timing_text(*timing) for timing in snapshot.source_timings
+    ) + "\n"
 
 
 def metric_row(label: str, value: str, href: str | None = None) -> str:
@@ -403,11 +1455,13 @@ def metric_row(label: str, value: str, href: str | None = None) -> str:
     )
 
 
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+@timed("render html_report")
 def build_html_report(snapshot: MarketSnapshot, store_status: str, bilingual: bool = True) -> str:
-    signal, reason, signal_colour = get_signal(snapshot)
-    ma50_distance = (snapshot.spot_aud / snapshot.ma50_aud - 1) * 100
-    ma200_distance = (snapshot.spot_aud / snapshot.ma200_aud - 1) * 100
-    market_value, profit, return_pct = portfolio_metrics(snapshot)
+    view = report_view(snapshot)
+    signal, reason, signal_colour = view.signal, view.reason, view.signal_colour
+    ma50_distance, ma200_distance = view.ma50_distance, view.ma200_distance
+    market_value, profit, return_pct = view.market_value, view.profit, view.return_pct
     market_rows = "".join([
         metric_row("Spot (AUD)", f"${snapshot.spot_aud:,.2f} / g"),
         metric_row("Spot (CNY)", f"¥{snapshot.spot_cny:,.2f} / g"),
@@ -415,30 +1469,54 @@ def build_html_report(snapshot: MarketSnapshot, store_status: str, bilingual: bo
         metric_row("vs 50-day average", f"{ma50_distance:+.2f}%"),
         metric_row("vs 200-day average", f"{ma200_distance:+.2f}%"),
     ])
-    mint_rows = "".join([
-        metric_row("Store", store_status),
-        metric_row("1g minted bar", price_text(snapshot.pm_1g, 1, snapshot.spot_aud), PM_1G_URL),
-        metric_row("5g minted bar", price_text(snapshot.pm_5g, 5, snapshot.spot_aud), PM_5G_URL),
-    ])
+    outlook_section = ""
+    if snapshot.forecasts:
+        outlook_rows = "".join(
+            metric_row(f"{forecast.horizon} ({forecast.coverage_pct:.0f}% range)", forecast_text(forecast))
+            for forecast in snapshot.forecasts
+        )
+        outlook_section = (
+            '\n  <h2 style="font-size:16px;margin:26px 0 8px;">Outlook</h2>\n'
+            f'  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{outlook_rows}</table>'
+        )
+    mint_rows = metric_row("Store", store_status) + "".join(
+        metric_row(quote.item.label, text, quote.item.url) for quote, text in view.mint_quotes
+    )
     if snapshot.taobao_app_checked_on:
         taobao_rows = "".join([
-            metric_row("Lingfeng 1g bar", taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot), DEFAULT_TAOBAO_1G_URL),
-            metric_row("Lingfeng 5g gold bar", taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot), DEFAULT_TAOBAO_1G_URL),
-            metric_row("Lingfeng 5g gold bean", taobao_price_text(snapshot.taobao_5g_bean_cny, 5, snapshot), DEFAULT_TAOBAO_1G_URL),
-            metric_row("Prices checked", taobao_checked_label(snapshot)),
+            metric_row("Lingfeng 1g bar", view.taobao_1g_text, DEFAULT_TAOBAO_1G_URL),
+            metric_row("Lingfeng 5g gold bar", view.taobao_5g_text, DEFAULT_TAOBAO_1G_URL),
+            metric_row("Lingfeng 5g gold bean", view.taobao_5g_bean_text, DEFAULT_TAOBAO_1G_URL),
+            metric_row("Prices checked", view.taobao_checked),
         ])
     else:
         taobao_rows = "".join([
-            metric_row("Lingfeng 1g public share price", taobao_price_text(snapshot.taobao_1g_cny, 1, snapshot)),
-            metric_row("Lingfeng 5g (5× estimate)", taobao_price_text(snapshot.taobao_5g_cny, 5, snapshot)),
+            metric_row("Lingfeng 1g public share price", view.taobao_1g_text),
+            metric_row("Lingfeng 5g (5× estimate)", view.taobao_5g_text),
             metric_row("SKU verification", "Variant prices not recently verified"),
         ])
-    portfolio_rows = "".join([
-        metric_row("Gold held", f"{snapshot.portfolio_grams:g}g"),
-        metric_row("Cost basis", f"${snapshot.portfolio_cost_aud:,.2f} AUD"),
-        metric_row("Spot value", f"${market_value:,.2f} AUD"),
-        metric_row("Unrealized P/L", f"${profit:+,.2f} AUD ({return_pct:+.1f}%)"),
-    ])
+    taobao_rows += "".join(
+        metric_row(quote.item.label, text, quote.item.url) for quote, text in view.taobao_quotes
+    )
+    portfolio_section = ""
+    if snapshot.portfolio_available:
+        portfolio_rows = "".join([
+            metric_row("Gold held", f"{snapshot.portfolio_grams:g}g"),
+            metric_row("Cost basis", f"${snapshot.portfolio_cost_aud:,.2f} AUD"),
+            metric_row("Spot value", f"${market_value:,.2f} AUD"),
+            metric_row("Unrealized P/L", f"${profit:+,.2f} AUD ({return_pct:+.1f}%)"),
+        ])
+        portfolio_section = (
+            '\n  <h2 style="font-size:16px;margin:26px 0 8px;">Your holdings</h2>'
+            f'\n  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{portfolio_rows}</table>'
+        )
+    timing_footer = ""
+    if snapshot.source_timings:
+        timing_footer = (
+            '\n  <div style="margin-top:8px;color:#94a3b8;font-size:11px;line-height:1.5;">Source timing: '
+            + html.escape("; ".join(source_timing_text(*timing) for timing in snapshot.source_timings))
+            + "</div>"
+        )
     chinese_card = ""
     if bilingual:
         chinese_card = (
@@ -464,25 +1542,25 @@ def build_html_report(snapshot: MarketSnapshot, store_status: str, bilingual: bo
     <div style="font-size:15px;margin-top:6px;line-height:1.45;">{html.escape(reason)}</div>
   </div>
   <h2 style="font-size:16px;margin:26px 0 8px;">Market snapshot</h2>
-  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{market_rows}</table>
+  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{market_rows}</table>{outlook_section}
   <h2 style="font-size:16px;margin:26px 0 8px;">Perth Mint</h2>
   <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{mint_rows}</table>
   <h2 style="font-size:16px;margin:26px 0 8px;">Taobao prices</h2>
-  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{taobao_rows}</table>
-  <h2 style="font-size:16px;margin:26px 0 8px;">Your holdings</h2>
-  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{portfolio_rows}</table>
+  <table role="presentation" width="100%" cellspacing="0" cellpadding="0">{taobao_rows}</table>{portfolio_section}
   <div style="margin-top:14px;"><a href="{html.escape(RECORD_PURCHASE_URL, quote=True)}" style="display:inline-block;background:#2563eb;color:#ffffff;text-decoration:none;padding:10px 16px;border-radius:8px;font-size:14px;font-weight:700;">Record a purchase</a></div>
   {chinese_card}
   <div style="margin-top:24px;padding-top:16px;border-top:1px solid #e2e8f0;color:#64748b;font-size:11px;line-height:1.5;">
     Market-tracking alert only; not financial advice. Retail prices may change before purchase.
-  </div>
+  </div>{timing_footer}
 </td></tr></table>
 </td></tr></table>
 </body></html>"""
 
 
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+@timed("render mandarin_html_report")
 def build_mandarin_html_report(snapshot: MarketSnapshot, store_status: str) -> str:
-    signal = {"BUY ZONE": "买入区间", "WATCH": "关注", "WAIT": "等待"}[get_signal(snapshot)[0]]
+    signal = report_view(snapshot).signal_zh
     content = html.escape(build_chinese_summary(snapshot, store_status)).replace("\n", "<br>")
     return f"""<!doctype html><html><body style="margin:0;background:#f1f5f9;font-family:Arial,sans-serif;color:#0f172a;">
 <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="padding:20px 8px;"><tr><td align="center">
@@ -501,22 +1579,44 @@ def build_message(
     recipient: str,
     mode: str = "Bilingual",
 ) -> EmailMessage:
-    signal, _, _ = get_signal(snapshot)
+    view = report_view(snapshot)
     message = EmailMessage()
     message["From"] = sender
     message["To"] = recipient
     if mode == "Mandarin":
-        signal_zh = {"BUY ZONE": "买入区间", "WATCH": "关注", "WAIT": "等待"}[signal]
-        message["Subject"] = f"黄金{signal_zh}：A${snapshot.spot_aud:,.2f}/克（{snapshot.daily_change_pct:+.2f}%）"
+        message["Subject"] = f"黄金{view.signal_zh}：A${snapshot.spot_aud:,.2f}/克（{snapshot.daily_change_pct:+.2f}%）"
         message.set_content(build_chinese_summary(snapshot, store_status))
         message.add_alternative(build_mandarin_html_report(snapshot, store_status), subtype="html")
     else:
-        message["Subject"] = f"Gold {signal}: ${snapshot.spot_aud:,.2f}/g ({snapshot.daily_change_pct:+.2f}%)"
+        message["Subject"] = f"Gold {view.signal}: ${snapshot.spot_aud:,.2f}/g ({snapshot.daily_change_pct:+.2f}%)"
         message.set_content(build_plain_report(snapshot, store_status, bilingual=True))
         message.add_alternative(build_html_report(snapshot, store_status, bilingual=True), subtype="html")
     return message
 
 
+def parse_recipients(text: str) -> list[tuple[str, str]]:
+    recipients = []
+    for entry in re.split(r"[,;\n]+", text):
+        address, _, mode = entry.strip().partition(":")
+        if not address.strip():
+            continue
+        mode = mode.strip().capitalize() or "Bilingual"
+        if mode not in REPORT_MODES:
+            raise RuntimeError(f"Unsupported report mode for {address.strip()}: {mode}")
+        recipients.append((address.strip(), mode))
+    return recipients
+
+
+def load_recipients_file(path: Path) -> list[tuple[str, str]]:
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        if "Email" not in (reader.fieldnames or []):
+            raise RuntimeError(f"{path} must contain an Email column")
+        return parse_recipients("\n".join(
+            f"{row['Email'].strip()}:{(row.get('Mode') or '').strip()}" for row in reader if (row["Email"] or "").strip()
+        ))
+
+
 def get_email_settings() -> tuple[str, str, list[tuple[str, str]]]:
     sender = os.environ.get("GMAIL_ADDRESS", "").strip()
     password = os.environ.get("GMAIL_APP_PASSWORD", "").replace(" ", "")
@@ -524,48 +1624,512 @@ def get_email_settings() -> tuple[str, str, list[tuple[str, str]]]:
     recipients = [(sender, "Bilingual")]
     if secondary and secondary != sender:
         recipients.append((secondary, "Mandarin"))
+    recipients += parse_recipients(os.environ.get("REPORT_RECIPIENTS", ""))
+    recipients_file = os.environ.get("REPORT_RECIPIENTS_FILE", "").strip()
+    if recipients_file:
+        recipients += load_recipients_file(Path(recipients_file))
     missing = [name for name, value in {"GMAIL_ADDRESS": sender, "GMAIL_APP_PASSWORD": password}.items() if not value]
     if missing:
         raise RuntimeError(f"Missing required GitHub Actions secrets: {', '.join(missing)}")
-    return sender, password, recipients
+    seen = set()
+    unique = []
+    for address, mode in recipients:
+        if address.lower() not in seen:
+            seen.add(address.lower())
+            unique.append((address, mode))
+    return sender, password, unique
+
+
+def open_smtp() -> smtplib.SMTP:
+    host = os.environ.get("SMTP_HOST", "").strip() or SMTP_HOST
+    port = int(os.environ.get("SMTP_PORT", "").strip() or SMTP_SSL_PORT)
+    if port == SMTP_SSL_PORT:
+        return smtplib.SMTP_SSL(host, port, timeout=SMTP_TIMEOUT_SECONDS)
+    smtp = smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT_SECONDS)
+    smtp.ehlo()
+    if smtp.has_extn("starttls"):
+        smtp.starttls()
+        smtp.ehlo()
+    return smtp
+
+
+def close_smtp(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+def deliver_messages(
+    messages: list[EmailMessage],
+    sender: str,
+    password: str,
+    connections: int = SMTP_CONNECTIONS,
+    smtp_factory: Callable[[], smtplib.SMTP] | None = None,
+    on_result: Callable[[int, DeliveryResult], None] | None = None,
+) -> list[DeliveryResult]:
+    smtp_factory = smtp_factory or open_smtp
+    pending: queue.SimpleQueue[int] = queue.SimpleQueue()
+    for index in range(len(messages)):
+        pending.put(index)
+    results: list[DeliveryResult | None] = [None] * len(messages)
+
+    def send_pending() -> None:
+        smtp = None
+        try:
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                with stage("smtp send") as span:
+                    message = messages[index]
+                    started = time.monotonic()
+                    error = ""
+                    for attempt in range(1, SMTP_ATTEMPTS + 1):
+                        try:
+                            if smtp is None:
+                                connection = smtp_factory()
+                                try:
+                                    if password:
+                                        connection.login(sender, password)
+                                except Exception:
+                                    close_smtp(connection)
+                                    raise
+                                smtp = connection
+                            smtp.send_message(message)
+                            results[index] = DeliveryResult(message["To"], True, attempt, time.monotonic() - started)
+                            break
+                        except smtplib.SMTPRecipientsRefused as refused:
+                            codes = [code for code, _ in refused.recipients.values()]
+                            error = "; ".join(f"{code} {reply!r}" for code, reply in refused.recipients.values())
+                            if not all(400 <= code < 500 for code in codes):
+                                break
+                        except smtplib.SMTPResponseException as response:
+                            error = f"{response.smtp_code} {response.smtp_error!r}"
+                            if not 400 <= response.smtp_code < 500:
+                                break
+                            if response.smtp_code == 421 and smtp is not None:
+                                close_smtp(smtp)
+                                smtp = None
+                        except OSError as failure:
+                            error = str(failure) or type(failure).__name__
+                            if smtp is not None:
+                                close_smtp(smtp)
+                                smtp = None
+                        except Exception as failure:
+                            error = f"{type(failure).__name__}: {failure}"
+                            if smtp is not None:
+                                close_smtp(smtp)
+                                smtp = None
+                            break
+                        if attempt < SMTP_ATTEMPTS:
+                            time.sleep(SMTP_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                    if results[index] is None:
+                        results[index] = DeliveryResult(
+                            message["To"], False, attempt, time.monotonic() - started, error,
+                        )
+                    span.add(retries=results[index].attempts - 1)
+                    span.finish("delivered" if results[index].delivered else "failed")
+                if on_result is not None:
+                    on_result(index, results[index])
+        finally:
+            if smtp is not None:
+                close_smtp(smtp)
+
+    workers = max(min(connections, len(messages)), 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gold-smtp") as pool:
+        for future in [pool.submit(send_pending) for _ in range(workers)]:
+            future.result()
+    return results
+
+
+def delivery_summary(results: list[DeliveryResult], elapsed: float) -> str:
+    delivered = [result for result in results if result.delivered]
+    latencies = sorted(result.seconds for result in results) or [0.0]
+    rate = len(delivered) / elapsed if elapsed > 0 else float(len(delivered))
+    return (
+        f"Delivered {len(delivered)}/{len(results)} email(s) in {elapsed:.2f}s ({rate:.1f}/s); "
+        f"per-recipient latency p50 {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s; "
+        f"retries {sum(result.attempts - 1 for result in results)}"
+    )
+
+
+def idempotency_key(snapshot: MarketSnapshot, recipient: str, mode: str) -> str:
+    identity = f"{snapshot.captured_at.isoformat()}|{recipient.strip().lower()}|{mode}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def load_delivered_keys(path: Path | None = None) -> set[str]:
+    path = path or DELIVERY_LEDGER_PATH
+    if not path.exists():
+        return set()
+    keys = set()
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                keys.add(json.loads(line)["key"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return keys
+
+
+def record_delivery(key: str, result: DeliveryResult, path: Path | None = None) -> None:
+    path = path or DELIVERY_LEDGER_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "key": key,
+        "recipient": result.recipient,
+        "delivered_at": datetime.now(PERTH_TIMEZONE).isoformat(timespec="seconds"),
+        "attempts": result.attempts,
+    }
+    with path.open("a", encoding="utf-8") as handle:
+        lock_file(handle)
+        handle.write(json.dumps(entry) + "\n")
+
+
+def queue_message(message: EmailMessage, key: str, outbox: Path | None = None) -> None:
+    path = (outbox or OUTBOX_DIR) / f"{key}.eml"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    message["Message-ID"] = f"<{key}@gold-price-tracker>"
+    temporary = path.with_suffix(".tmp")
+    temporary.write_bytes(message.as_bytes(policy=policy.SMTP))
+    temporary.replace(path)
+
+
+@timed("enqueue_reports")
+def enqueue_reports(
+    snapshot: MarketSnapshot,
+    store_status: str,
+    sender: str,
+    recipients: list[tuple[str, str]],
+    outbox: Path | None = None,
+) -> int:
+    outbox = outbox or OUTBOX_DIR
+    outbox.mkdir(parents=True, exist_ok=True)
+    delivered = load_delivered_keys()
+    queued = 0
+    for recipient, mode in recipients:
+        key = idempotency_key(snapshot, recipient, mode)
+        if key in delivered or (outbox / f"{key}.eml").exists():
+            continue
+        queue_message(build_message(snapshot, store_status, sender, recipient, mode), key, outbox)
+        queued += 1
+    return queued
+
+
+def drain_outbox(sender: str, password: str, outbox: Path | None = None) -> list[DeliveryResult]:
+    outbox = outbox or OUTBOX_DIR
+    if not outbox.exists():
+        return []
+    delivered = load_delivered_keys()
+    pending = []
+    for path in sorted(outbox.glob("*.eml")):
+        if path.stem in delivered:
+            path.unlink(missing_ok=True)
+        else:
+            pending.append(path)
+    if not pending:
+        return []
+
+    def settle(index: int, result: DeliveryResult) -> None:
+        if result.delivered:
+            record_delivery(pending[index].stem, result)
+            pending[index].unlink(missing_ok=True)
+
+    messages = [BytesParser(policy=policy.default).parsebytes(path.read_bytes()) for path in pending]
+    return deliver_messages(messages, sender, password, on_result=settle)
+
+
+@timed("deliver_outbox")
+def deliver_outbox(sender: str, password: str) -> int:
+    started = time.monotonic()
+    results = drain_outbox(sender, password)
+    if not results:
+        return 0
+    print(delivery_summary(results, time.monotonic() - started))
+    failed = [result for result in results if not result.delivered]
+    if failed:
+        details = ", ".join(f"{result.recipient} ({result.error})" for result in failed[:5])
+        raise RuntimeError(
+            f"{len(failed)} of {len(results)} email report(s) failed and remain in {OUTBOX_DIR}: {details}; "
+            "rerun with --drain-outbox to retry them"
+        )
+    return len(results)
 
 
 def send_reports(snapshot: MarketSnapshot, store_status: str) -> int:
     sender, password, recipients = get_email_settings()
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=30) as smtp:
-        smtp.login(sender, password)
-        for recipient, mode in recipients:
-            smtp.send_message(build_message(snapshot, store_status, sender, recipient, mode))
-    return len(recipients)
+    enqueue_reports(snapshot, store_status, sender, recipients)
+    return deliver_outbox(sender, password)
+
+
+def passbook_row(snapshot: MarketSnapshot) -> list[str]:
+    def rounded(value: float | None) -> str:
+        return str(round(value, 2)) if value is not None else "N/A"
+
+    return [
+        snapshot.captured_at.strftime("%Y-%m-%d %H:%M"),
+        rounded(snapshot.spot_aud),
+        rounded(snapshot.spot_cny),
+        rounded(snapshot.ma50_aud),
+        rounded(snapshot.ma200_aud),
+        rounded(snapshot.pm_1g),
+        rounded(snapshot.taobao_1g_cny),
+        rounded(snapshot.taobao_5g_cny),
+    ]
 
 
-def append_passbook(snapshot: MarketSnapshot) -> None:
-    columns = [
-        "Date", "Spot_AUD_g", "Spot_CNY_g", "MA50_AUD", "MA200_AUD",
-        "Est_Shop_AUD", "Taobao_1g_CNY", "Taobao_5g_CNY",
-    ]
-    row = pd.DataFrame([{
-        "Date": snapshot.captured_at.strftime("%Y-%m-%d %H:%M"),
-        "Spot_AUD_g": round(snapshot.spot_aud, 2),
-        "Spot_CNY_g": round(snapshot.spot_cny, 2),
-        "MA50_AUD": round(snapshot.ma50_aud, 2),
-        "MA200_AUD": round(snapshot.ma200_aud, 2),
-        "Est_Shop_AUD": round(snapshot.pm_1g, 2) if snapshot.pm_1g is not None else "N/A",
-        "Taobao_1g_CNY": round(snapshot.taobao_1g_cny, 2) if snapshot.taobao_1g_cny is not None else "N/A",
-        "Taobao_5g_CNY": round(snapshot.taobao_5g_cny, 2) if snapshot.taobao_5g_cny is not None else "N/A",
-    }], columns=columns)
-    if PASSBOOK_PATH.exists():
-        existing = pd.read_csv(PASSBOOK_PATH).reindex(columns=columns)
-        row = pd.concat([existing, row], ignore_index=True)
-    row.to_csv(PASSBOOK_PATH, index=False)
+def csv_line(values: list[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue().encode("utf-8")
 
 
-def main() -> None:
-    snapshot = collect_snapshot()
+def lock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+
+
+@timed("append_passbook")
+def append_passbook(snapshot: MarketSnapshot, path: Path | None = None) -> None:
+    path = path or PASSBOOK_PATH
+    header = csv_line(PASSBOOK_COLUMNS)
+    with path.open("a+b") as handle:
+        lock_file(handle)
+        size = handle.seek(0, os.SEEK_END)
+        prefix = b""
+        if size == 0:
+            prefix = header
+        else:
+            handle.seek(0)
+            if handle.readline().rstrip(b"\r\n").removeprefix(b"\xef\xbb\xbf") != header.rstrip(b"\n"):
+                raise RuntimeError(
+                    f"{path} does not use the current passbook columns; "
+                    "run python gold_alert.py --compact-passbook first"
+                )
+            handle.seek(size - 1)
+            if handle.read(1) != b"\n":
+                prefix = b"\n"
+        handle.write(prefix + csv_line(passbook_row(snapshot)))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def compact_passbook(path: Path | None = None) -> int:
+    path = path or PASSBOOK_PATH
+    if not path.exists():
+        return 0
+    import pandas as pd
+
+    passbook = pd.read_csv(path).reindex(columns=PASSBOOK_COLUMNS)
+    temporary = path.with_suffix(".csv.tmp")
+    passbook.to_csv(temporary, index=False, lineterminator="\n")
+    temporary.replace(path)
+    return len(passbook)
+
+
+def mirror_passbook(snapshot: MarketSnapshot) -> None:
+    try:
+        import passbook_query
+        import passbook_store
+
+        with stage("mirror_passbook"):
+            passbook_store.mirror_snapshot(snapshot)
+        with stage("refresh_rollups"):
+            passbook_query.PassbookQuery().refresh()
+    except Exception as error:
+        print(f"Typed passbook store was not updated: {error}")
+
+
+def queue_rule_alerts(snapshot: MarketSnapshot, sender: str) -> int:
+    try:
+        import alert_rules
+
+        with stage("alert_rules"):
+            return alert_rules.enqueue_rule_alerts(snapshot, sender)
+    except Exception as error:
+        print(f"Alert rules were not evaluated: {error}")
+        return 0
+
+
+def queue_user_reports(snapshot: MarketSnapshot, store_status: str, sender: str) -> int:
+    try:
+        import tenants
+
+        with stage("user_reports"):
+            return tenants.enqueue_user_reports(snapshot, store_status, sender)
+    except Exception as error:
+        print(f"User reports were not queued: {error}")
+        return 0
+
+
+def update_dashboard() -> None:
+    try:
+        import dashboard
+
+        with stage("dashboard"):
+            dashboard.update_dashboard()
+    except Exception as error:
+        print(f"Dashboard data was not updated: {error}")
+
+
+def run_pipeline(args: argparse.Namespace, metrics: RunMetrics | None) -> None:
+    sender, password, recipients = get_email_settings()
+    if args.drain_outbox:
+        print(f"Sent {deliver_outbox(sender, password)} pending email report(s)")
+        return
+
+    snapshot = collect_snapshot(refresh_history=args.refresh_history)
+    save_http_cache()
+    save_source_health()
+    if args.timing_footer and metrics is not None:
+        snapshot = replace(snapshot, source_timings=metrics.source_timings())
     store_status, _ = get_trading_status(snapshot.captured_at)
-    recipient_count = send_reports(snapshot, store_status)
-    append_passbook(snapshot)
-    print(f"Sent {recipient_count} email report(s) and updated {PASSBOOK_PATH}")
+    queued = enqueue_reports(snapshot, store_status, sender, recipients)
+    queued += queue_rule_alerts(snapshot, sender)
+    queued += queue_user_reports(snapshot, store_status, sender)
+    try:
+        append_passbook(snapshot)
+        mirror_passbook(snapshot)
+        update_dashboard()
+        print(f"Queued {queued} email report(s) and updated {PASSBOOK_PATH}")
+    finally:
+        print(f"Sent {deliver_outbox(sender, password)} email report(s)")
+
+
+def run_once(args: argparse.Namespace) -> None:
+    metrics = start_run_metrics() if args.metrics or args.timing_footer else None
+    try:
+        run_pipeline(args, metrics)
+    finally:
+        if metrics is not None:
+            print(f"Wrote run metrics to {finish_run_metrics()}")
+
+
+def next_cycle_at(after: datetime) -> datetime:
+    local_after = after.astimezone(PERTH_TIMEZONE)
+    for days in range(15):
+        day = local_after.date() + timedelta(days=days)
+        for slot in sorted(DAEMON_REPORT_TIMES):
+            candidate = datetime.combine(day, datetime.strptime(slot, "%H:%M").time(), PERTH_TIMEZONE)
+            if candidate > local_after and get_trading_status(candidate)[1]:
+                return candidate
+    raise RuntimeError(f"No trading-day report time found in the 14 days after {local_after:%Y-%m-%d}")
+
+
+def load_daemon_state(path: Path | None = None) -> datetime | None:
+    try:
+        state = json.loads((path or DAEMON_STATE_PATH).read_text(encoding="utf-8"))
+        return datetime.fromisoformat(state["last_cycle"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_daemon_state(last_cycle: datetime, path: Path | None = None) -> None:
+    path = path or DAEMON_STATE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".json.tmp")
+    temporary.write_text(json.dumps({"last_cycle": last_cycle.isoformat()}), encoding="utf-8")
+    temporary.replace(path)
+
+
+def daemon_wake_time(now: datetime, last_cycle: datetime | None) -> datetime:
+    earliest = now - timedelta(seconds=DAEMON_CATCH_UP_SECONDS)
+    return next_cycle_at(max(last_cycle, earliest) if last_cycle is not None else now)
+
+
+def run_daemon(
+    args: argparse.Namespace,
+    stop: threading.Event,
+    clock: Callable[[], datetime] | None = None,
+) -> int:
+    clock = clock or (lambda: datetime.now(PERTH_TIMEZONE))
+    cycles = 0
+    try:
+        sender, password, _ = get_email_settings()
+        print(f"Sent {deliver_outbox(sender, password)} pending email report(s) on startup")
+    except RuntimeError as error:
+        print(f"Pending reports were not sent on startup: {error}")
+
+    failed_slot, failures = None, 0
+    while not stop.is_set():
+        wake_at = daemon_wake_time(clock(), load_daemon_state())
+        start_at = wake_at
+        if wake_at == failed_slot:
+            backoff = min(DAEMON_RETRY_SECONDS * 2 ** (failures - 1), DAEMON_MAX_RETRY_SECONDS)
+            start_at = max(wake_at, clock() + timedelta(seconds=backoff))
+            print(f"Retrying the {wake_at:%H:%M} cycle at {start_at:%H:%M:%S} AWST")
+        else:
+            failed_slot, failures = None, 0
+            print(f"Next cycle at {wake_at:%A %d %b %Y %H:%M} AWST")
+        while not stop.is_set():
+            remaining = (start_at - clock()).total_seconds()
+            if remaining <= 0 or stop.wait(min(remaining, DAEMON_POLL_SECONDS)):
+                break
+        if stop.is_set():
+            break
+
+        started = time.monotonic()
+        try:
+            run_once(args)
+        except Exception as error:
+            failed_slot, failures = wake_at, failures + 1
+            print(f"Cycle for {wake_at:%H:%M} failed: {error}")
+        else:
+            save_daemon_state(wake_at)
+        cycles += 1
+        print(f"Cycle {cycles} finished in {time.monotonic() - started:.1f}s")
+    save_http_cache()
+    save_source_health()
+    print(f"Daemon stopped after {cycles} cycle(s)")
+    return cycles
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Collect gold prices, email the report, and update the passbook.")
+    parser.add_argument(
+        "--refresh-history", action="store_true",
+        help="ignore the local history cache and download full yfinance windows",
+    )
+    parser.add_argument(
+        "--compact-passbook", action="store_true",
+        help="rewrite the passbook with the current columns and exit",
+    )
+    parser.add_argument(
+        "--drain-outbox", action="store_true",
+        help="send reports still pending in the outbox without collecting a new snapshot",
+    )
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="stay running and report at each trading-day report time, keeping caches and connections warm",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help=f"time each pipeline stage and write the results to {RUN_METRICS_PATH}",
+    )
+    parser.add_argument(
+        "--timing-footer", action="store_true",
+        help="add per-source fetch timings to the emailed report (implies --metrics)",
+    )
+    args = parser.parse_args()
+    if args.compact_passbook:
+        print(f"Compacted {compact_passbook()} row(s) in {PASSBOOK_PATH}")
+        return
+    if not args.daemon:
+        run_once(args)
+        return
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    run_daemon(args, stop)
 
 
 if __name__ == "__main__":
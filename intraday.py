@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+import signal
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import gold_alert
+
+
+TICK_SYMBOLS = {"gold": "GC=F", "aud_usd": "AUDUSD=X", "usd_cny": "CNY=X"}
+TICK_FIELDS = ("gold_usd_oz", "aud_usd", "usd_cny", "spot_aud", "spot_cny")
+TICK_INTERVAL_SECONDS = 20.0
+TICK_TIMEOUT_SECONDS = 15.0
+TICK_BUFFER_SIZE = 1440
+CONFIRM_TICKS = 2
+HYSTERESIS_PCT = 0.5
+ZONE_RANK = {"WAIT": 0, "WATCH": 1, "BUY ZONE": 2}
+
+
+class TickBuffer:
+    def __init__(self, capacity: int = TICK_BUFFER_SIZE):
+        if capacity < 1:
+            raise ValueError("Tick buffer capacity must be positive")
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype="int64")
+        self.values = np.full((capacity, len(TICK_FIELDS)), np.nan)
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def last_ns(self) -> int | None:
+        return int(self.times[(self.head - 1) % self.capacity]) if self.count else None
+
+    def push(self, times: np.ndarray, values: np.ndarray) -> None:
+        times = np.asarray(times, dtype="int64")[-self.capacity:]
+        values = np.asarray(values, dtype="float64")[-self.capacity:]
+        if not len(times):
+            return
+        if self.last_ns is not None and times[0] == self.last_ns:
+            self.head = (self.head - 1) % self.capacity
+            self.count -= 1
+        slots = (self.head + np.arange(len(times))) % self.capacity
+        self.times[slots] = times
+        self.values[slots] = values
+        self.head = int(slots[-1] + 1) % self.capacity
+        self.count = min(self.count + len(times), self.capacity)
+
+    def window(self) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        order = (self.head - self.count + np.arange(self.count)) % self.capacity
+        return self.times[order], {name: self.values[order, column] for column, name in enumerate(TICK_FIELDS)}
+
+
+class SignalTracker:
+    def __init__(self, confirm: int = CONFIRM_TICKS, hysteresis_pct: float = HYSTERESIS_PCT):
+        self.confirm = confirm
+        self.hysteresis_pct = hysteresis_pct
+        self.zone: str | None = None
+        self.pending: str | None = None
+        self.streak = 0
+
+    def classify(self, snapshot: gold_alert.MarketSnapshot) -> str:
+        zone = gold_alert.get_signal(snapshot)[0]
+        if self.zone is None or ZONE_RANK[zone] >= ZONE_RANK[self.zone]:
+            return zone
+        band = snapshot.ma50_aud * self.hysteresis_pct / 100
+        cleared = gold_alert.get_signal(replace(snapshot, spot_aud=snapshot.spot_aud - band))[0]
+        return cleared if ZONE_RANK[cleared] < ZONE_RANK[self.zone] else self.zone
+
+    def observe(self, snapshot: gold_alert.MarketSnapshot) -> str | None:
+        zone = self.classify(snapshot)
+        if self.zone is None:
+            self.zone = zone
+            return None
+        if zone == self.zone:
+            self.pending, self.streak = None, 0
+            return None
+        self.streak = self.streak + 1 if zone == self.pending else 1
+        self.pending = zone
+        if self.streak < self.confirm:
+            return None
+        self.zone, self.pending, self.streak = zone, None, 0
+        return zone
+
+
+class IntradayMonitor:
+    def __init__(
+        self,
+        closes: pd.Series,
+        capacity: int = TICK_BUFFER_SIZE,
+        tracker: SignalTracker | None = None,
+    ):
+        self.buffer = TickBuffer(capacity)
+        self.tracker = tracker or SignalTracker()
+        self.observed_ns: int | None = None
+        self.rebase(closes)
+
+    def rebase(self, closes: pd.Series) -> None:
+        averages = gold_alert.update_moving_averages(closes)
+        if averages.mean(200) is None:
+            raise RuntimeError(f"Only {averages.count} gold observations returned; 200 are required")
+        self.ma50_usd_oz = averages.mean(50)
+        self.ma200_usd_oz = averages.mean(200)
+        self.previous_close = float(closes.iloc[-2])
+        self.base = gold_alert.MarketSnapshot(
+            captured_at=datetime.now(gold_alert.PERTH_TIMEZONE), spot_aud=0.0, spot_cny=0.0, daily_change_pct=0.0,
+            ma50_aud=0.0, ma200_aud=0.0, pm_1g=None, pm_5g=None, **gold_alert.portfolio_fields(),
+        )
+
+    def snapshot(self, time_ns: int, values: np.ndarray) -> gold_alert.MarketSnapshot:
+        gold, aud_usd, _, spot_aud, spot_cny = (float(value) for value in values)
+        return replace(
+            self.base,
+            captured_at=datetime.fromtimestamp(time_ns / 1e9, timezone.utc).astimezone(gold_alert.PERTH_TIMEZONE),
+            spot_aud=spot_aud,
+            spot_cny=spot_cny,
+            daily_change_pct=(gold / self.previous_close - 1) * 100,
+            ma50_aud=self.ma50_usd_oz / gold_alert.OUNCE_TO_GRAMS / aud_usd,
+            ma200_aud=self.ma200_usd_oz / gold_alert.OUNCE_TO_GRAMS / aud_usd,
+        )
+
+    def ingest(self, bars: dict[str, pd.Series]) -> list[gold_alert.MarketSnapshot]:
+        gold = bars["gold"].dropna()
+        times = gold.index.as_unit("ns").asi8
+        rates = []
+        for name in ("aud_usd", "usd_cny"):
+            series = bars[name].dropna()
+            position = np.searchsorted(series.index.as_unit("ns").asi8, times, "right") - 1
+            rates.append(np.where(position >= 0, series.to_numpy()[np.maximum(position, 0)], np.nan))
+        aud_usd, usd_cny = rates
+        fresh = ~np.isnan(aud_usd) & ~np.isnan(usd_cny) & (aud_usd > 0)
+        if self.buffer.last_ns is not None:
+            fresh &= times >= self.buffer.last_ns
+        grams = gold.to_numpy()[fresh] / gold_alert.OUNCE_TO_GRAMS
+        values = np.column_stack((
+            gold.to_numpy()[fresh], aud_usd[fresh], usd_cny[fresh], grams / aud_usd[fresh], grams * usd_cny[fresh],
+        ))
+        times = times[fresh]
+        self.buffer.push(times, values)
+
+        unseen = np.flatnonzero(times > self.observed_ns) if self.observed_ns is not None else np.arange(len(times))
+        if self.tracker.zone is None:
+            unseen = unseen[-1:]
+        alerts = []
+        for index in unseen:
+            self.observed_ns = int(times[index])
+            snapshot = self.snapshot(int(times[index]), values[index])
+            if self.tracker.observe(snapshot) is not None:
+                alerts.append(snapshot)
+        return alerts
+
+
+def fetch_bars(symbol: str) -> pd.Series:
+    import yfinance as yf
+
+    with gold_alert.stage(f"fetch ticks {symbol}"):
+        history = yf.Ticker(symbol).history(period="1d", interval="1m", auto_adjust=False)
+    if history.empty or "Close" not in history:
+        raise RuntimeError(f"No intraday bars returned for {symbol}")
+    return history["Close"]
+
+
+def poll_bars() -> dict[str, pd.Series]:
+    jobs = {name: (partial(fetch_bars, symbol), TICK_TIMEOUT_SECONDS) for name, symbol in TICK_SYMBOLS.items()}
+    results = gold_alert.fetch_sources(jobs, TICK_TIMEOUT_SECONDS)
+    return {name: gold_alert.required_result(results, name) for name in TICK_SYMBOLS}
+
+
+def daily_closes() -> pd.Series:
+    return gold_alert.fetch_history("GC=F", "1y")["Close"].dropna()
+
+
+def build_signal_message(
+    snapshot: gold_alert.MarketSnapshot,
+    sender: str,
+    recipient: str,
+    mode: str = "Bilingual",
+) -> EmailMessage:
+    view = gold_alert.report_view(snapshot)
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    if mode == "Mandarin":
+        message["Subject"] = f"黄金信号变为{view.signal_zh}：A${snapshot.spot_aud:,.2f}/克"
+        lines = [
+            view.reason_zh,
+            "",
+            f"现货：A${snapshot.spot_aud:,.2f}/克 | ¥{snapshot.spot_cny:,.2f}/克（{snapshot.daily_change_pct:+.2f}%）",
+            f"50日均价：A${snapshot.ma50_aud:,.2f}/克 | 200日均价：A${snapshot.ma200_aud:,.2f}/克",
+            f"时间：{snapshot.captured_at:%Y-%m-%d %H:%M}（珀斯时间，1分钟K线）",
+            "零售价格见下一封每日报告。",
+        ]
+    else:
+        message["Subject"] = f"Gold signal now {view.signal}: ${snapshot.spot_aud:,.2f}/g"
+        lines = [
+            view.reason,
+            "",
+            f"Spot: A${snapshot.spot_aud:,.2f}/g | ¥{snapshot.spot_cny:,.2f}/g ({snapshot.daily_change_pct:+.2f}%)",
+            f"50-day average: A${snapshot.ma50_aud:,.2f}/g | 200-day average: A${snapshot.ma200_aud:,.2f}/g",
+            f"Checked: {snapshot.captured_at:%A %d %b %Y %H:%M} AWST from 1-minute bars",
+            "Retail prices follow in the next daily report.",
+        ]
+    message.set_content("\n".join(lines) + "\n")
+    return message
+
+
+def send_alert(snapshot: gold_alert.MarketSnapshot) -> int:
+    sender, password, recipients = gold_alert.get_email_settings()
+    outbox = gold_alert.OUTBOX_DIR
+    outbox.mkdir(parents=True, exist_ok=True)
+    delivered = gold_alert.load_delivered_keys()
+    for recipient, mode in recipients:
+        key = gold_alert.idempotency_key(snapshot, recipient, "Signal:" + mode)
+        if key in delivered or (outbox / f"{key}.eml").exists():
+            continue
+        gold_alert.queue_message(build_signal_message(snapshot, sender, recipient, mode), key, outbox)
+    return gold_alert.deliver_outbox(sender, password)
+
+
+def run_intraday(
+    stop: threading.Event,
+    monitor: IntradayMonitor | None = None,
+    poll: Callable[[], dict[str, pd.Series]] = poll_bars,
+    notify: Callable[[gold_alert.MarketSnapshot], object] = send_alert,
+    interval: float = TICK_INTERVAL_SECONDS,
+) -> int:
+    monitor = monitor or IntradayMonitor(daily_closes())
+    day = datetime.now(gold_alert.PERTH_TIMEZONE).date()
+    alerts = 0
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            today = datetime.now(gold_alert.PERTH_TIMEZONE).date()
+            if today != day:
+                monitor.rebase(daily_closes())
+                day = today
+            for snapshot in monitor.ingest(poll()):
+                print(f"{snapshot.captured_at:%H:%M} {monitor.tracker.zone}: A${snapshot.spot_aud:,.2f}/g")
+                notify(snapshot)
+                alerts += 1
+        except Exception as error:
+            print(f"Tick failed: {error}")
+        stop.wait(max(interval - (time.monotonic() - started), 0))
+    return alerts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Watch 1-minute gold and FX bars and email when the signal changes.")
+    parser.add_argument("--interval", type=float, default=TICK_INTERVAL_SECONDS, help="seconds between polls")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    print(f"Sent {run_intraday(stop, interval=args.interval)} intraday alert(s)")
+
+
+if __name__ == "__main__":
+    main()
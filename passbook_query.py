@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from pathlib import Path
+
+import numpy as np
+
+import gold_alert
+import passbook_store
+
+
+FREQUENCIES = ("D", "W", "M")
+STATISTICS = ("count", "sum", "min", "max", "first", "last")
+AGGREGATIONS = STATISTICS + ("mean",)
+DAY_NS = 86_400 * passbook_store.NANOSECONDS
+LOCAL_OFFSET = gold_alert.PERTH_TIMEZONE.utcoffset(datetime(2026, 1, 1))
+LOCAL_OFFSET_NS = int(LOCAL_OFFSET.total_seconds()) * passbook_store.NANOSECONDS
+VALUE_COLUMNS = tuple(name for name in passbook_store.COLUMNS if name != "captured_at")
+STAT_KEYS = frozenset(f"{name}.{statistic}" for name in VALUE_COLUMNS for statistic in STATISTICS)
+
+
+@dataclass(frozen=True, eq=False)
+class Rollup:
+    rows: int
+    last_ns: int
+    labels: np.ndarray
+    starts: np.ndarray
+    stats: dict[str, np.ndarray]
+
+    def save(self, path: Path) -> None:
+        temporary = path.with_suffix(".tmp.npz")
+        np.savez(
+            temporary, rows=self.rows, last_ns=self.last_ns, labels=self.labels, starts=self.starts, **self.stats,
+        )
+        temporary.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Rollup | None:
+        try:
+            with np.load(path) as archive:
+                stats = {key: archive[key] for key in archive.files if "." in key}
+                rollup = cls(
+                    int(archive["rows"]), int(archive["last_ns"]), archive["labels"], archive["starts"], stats,
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+        return rollup if set(stats) == STAT_KEYS else None
+
+
+def to_ns(moment: datetime | date) -> int:
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, time())
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=gold_alert.PERTH_TIMEZONE)
+    return passbook_store.timestamp_ns(moment)
+
+
+def bucket_labels(times: np.ndarray, freq: str) -> np.ndarray:
+    days = ((np.asarray(times, dtype="int64") + LOCAL_OFFSET_NS) // DAY_NS).astype("datetime64[D]")
+    if freq == "D":
+        return days
+    if freq == "W":
+        return days - (days.astype("int64") + 3) % 7
+    if freq == "M":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Frequency must be one of: {', '.join(FREQUENCIES)}")
+
+
+def compute_rollup(columns: dict[str, np.ndarray], freq: str, start: int = 0) -> Rollup:
+    times = columns["captured_at"]
+    labels = bucket_labels(times[start:], freq)
+    count = len(labels)
+    if not count:
+        return Rollup(start, 0, labels, np.zeros(0, dtype="int64"), {key: np.zeros(0) for key in STAT_KEYS})
+    starts = np.concatenate(([0], np.flatnonzero(labels[1:] != labels[:-1]) + 1))
+    index = np.arange(count)
+    stats = {}
+    for name in VALUE_COLUMNS:
+        values = np.asarray(columns[name][start:], dtype="float64")
+        valid = ~np.isnan(values)
+        first = np.minimum.reduceat(np.where(valid, index, count), starts)
+        last = np.maximum.reduceat(np.where(valid, index, -1), starts)
+        stats[f"{name}.count"] = np.add.reduceat(valid.astype("float64"), starts)
+        stats[f"{name}.sum"] = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        stats[f"{name}.min"] = np.fmin.reduceat(values, starts)
+        stats[f"{name}.max"] = np.fmax.reduceat(values, starts)
+        stats[f"{name}.first"] = np.where(first < count, values[np.minimum(first, count - 1)], np.nan)
+        stats[f"{name}.last"] = np.where(last >= 0, values[last], np.nan)
+    return Rollup(start + count, int(times[-1]), labels[starts], starts + start, stats)
+
+
+def extend_rollup(cached: Rollup, columns: dict[str, np.ndarray], freq: str) -> Rollup:
+    if not len(cached.starts):
+        return compute_rollup(columns, freq)
+    reopened = int(cached.starts[-1])
+    tail = compute_rollup(columns, freq, reopened)
+    keep = len(cached.starts) - 1
+    return Rollup(
+        tail.rows,
+        tail.last_ns,
+        np.concatenate((cached.labels[:keep], tail.labels)),
+        np.concatenate((cached.starts[:keep], tail.starts)),
+        {key: np.concatenate((values[:keep], tail.stats[key])) for key, values in cached.stats.items()},
+    )
+
+
+class PassbookQuery:
+    def __init__(self, directory: Path | None = None) -> None:
+        self.store = passbook_store.PassbookStore(directory)
+        self.load()
+
+    def load(self) -> None:
+        self.columns = self.store.read()
+        times = self.columns["captured_at"]
+        self.ordered = bool(np.all(times[1:] >= times[:-1]))
+        if not self.ordered:
+            order = np.argsort(times, kind="stable")
+            self.columns = {name: np.asarray(values)[order] for name, values in self.columns.items()}
+        self.times = self.columns["captured_at"]
+        self.rollups: dict[str, Rollup] = {}
+        self.unsaved: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def bounds(self, start: datetime | date | None = None, end: datetime | date | None = None) -> tuple[int, int]:
+        low = int(np.searchsorted(self.times, to_ns(start), "left")) if start is not None else 0
+        high = int(np.searchsorted(self.times, to_ns(end), "left")) if end is not None else len(self.times)
+        return low, max(low, high)
+
+    def range(
+        self,
+        start: datetime | date | None = None,
+        end: datetime | date | None = None,
+        names: tuple[str, ...] | None = None,
+    ) -> dict[str, np.ndarray]:
+        low, high = self.bounds(start, end)
+        return {name: self.columns[name][low:high] for name in names or tuple(self.columns)}
+
+    def rollup_path(self, freq: str) -> Path:
+        return self.store.directory / f"rollup_{freq}.npz"
+
+    def rollup(self, freq: str) -> Rollup:
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Frequency must be one of: {', '.join(FREQUENCIES)}")
+        if freq in self.rollups:
+            return self.rollups[freq]
+        cached = Rollup.load(self.rollup_path(freq)) if self.ordered else None
+        if cached is not None and (cached.rows > len(self) or (
+            cached.rows and int(self.times[cached.rows - 1]) != cached.last_ns
+        )):
+            cached = None
+        if cached is not None and cached.rows == len(self):
+            rollup = cached
+        else:
+            rollup = (
+                extend_rollup(cached, self.columns, freq) if cached is not None
+                else compute_rollup(self.columns, freq)
+            )
+            self.unsaved.add(freq)
+        self.rollups[freq] = rollup
+        return rollup
+
+    def refresh(self, passbook: Path | None = None, freqs: tuple[str, ...] = FREQUENCIES) -> None:
+        if not self.store.rows:
+            self.store.import_csv(passbook or gold_alert.PASSBOOK_PATH)
+            self.load()
+        for freq in freqs:
+            rollup = self.rollup(freq)
+            if freq in self.unsaved and self.ordered and len(self):
+                rollup.save(self.rollup_path(freq))
+            self.unsaved.discard(freq)
+
+    def resample(self, freq: str, agg: str, column: str) -> tuple[np.ndarray, np.ndarray]:
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Aggregation must be one of: {', '.join(AGGREGATIONS)}")
+        if column not in VALUE_COLUMNS:
+            raise ValueError(f"Unknown passbook column: {column}")
+        rollup = self.rollup(freq)
+        if agg == "mean":
+            return rollup.labels, np.divide(
+                rollup.stats[f"{column}.sum"], rollup.stats[f"{column}.count"],
+                out=np.full(len(rollup.labels), np.nan), where=rollup.stats[f"{column}.count"] > 0,
+            )
+        return rollup.labels, rollup.stats[f"{column}.{agg}"]
+
+    def daily_series(self, column: str = "spot_aud") -> tuple[np.ndarray, np.ndarray]:
+        labels, values = self.resample("D", "last", column)
+        valid = ~np.isnan(values)
+        return labels[valid], values[valid]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize the passbook by day, week or month.")
+    parser.add_argument("column", nargs="?", default="spot_aud", choices=VALUE_COLUMNS)
+    parser.add_argument("--freq", choices=FREQUENCIES, default="W")
+    parser.add_argument("--agg", choices=AGGREGATIONS, nargs="+", default=["mean", "min", "max"])
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to include (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    query = PassbookQuery()
+    series = [query.resample(args.freq, agg, args.column) for agg in args.agg]
+    print(f"{'Period':<10} " + " ".join(f"{agg:>10}" for agg in args.agg))
+    for row, label in enumerate(series[0][0] if series else []):
+        if args.since is None or label >= np.datetime64(args.since):
+            print(f"{str(label):<10} " + " ".join(f"{values[row]:>10.2f}" for _, values in series))
+
+
+if __name__ == "__main__":
+    main()
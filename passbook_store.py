@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import gold_alert
+
+
+STORE_NAME = "passbook"
+SCHEMA_NAME = "schema.json"
+SCHEMA_VERSION = 1
+COLUMNS = {
+    "captured_at": "<i8",
+    "spot_aud": "<f8",
+    "spot_cny": "<f8",
+    "daily_change_pct": "<f8",
+    "ma50_aud": "<f8",
+    "ma200_aud": "<f8",
+    "pm_1g": "<f8",
+    "pm_5g": "<f8",
+    "taobao_1g_cny": "<f8",
+    "taobao_5g_cny": "<f8",
+    "taobao_5g_bean_cny": "<f8",
+    "taobao_share_1g_cny": "<f8",
+    "taobao_checked_day": "<f8",
+    "portfolio_grams": "<f8",
+    "portfolio_cost_aud": "<f8",
+}
+CSV_FIELDS = {
+    "spot_aud": "Spot_AUD_g",
+    "spot_cny": "Spot_CNY_g",
+    "ma50_aud": "MA50_AUD",
+    "ma200_aud": "MA200_AUD",
+    "pm_1g": "Est_Shop_AUD",
+    "taobao_1g_cny": "Taobao_1g_CNY",
+    "taobao_5g_cny": "Taobao_5g_CNY",
+}
+NANOSECONDS = 1_000_000_000
+
+
+def timestamp_ns(moment: datetime) -> int:
+    return int(moment.timestamp()) * NANOSECONDS + moment.microsecond * 1_000
+
+
+def optional(value: float | None) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def checked_day(snapshot: gold_alert.MarketSnapshot) -> float:
+    try:
+        checked = datetime.strptime(snapshot.taobao_app_checked_on, "%d %b %Y").date()
+    except ValueError:
+        return np.nan
+    return float(np.datetime64(checked, "D").astype("int64"))
+
+
+def snapshot_row(snapshot: gold_alert.MarketSnapshot) -> dict[str, float]:
+    row = {"taobao_checked_day": checked_day(snapshot)}
+    for name in COLUMNS:
+        if name not in row and name != "captured_at":
+            row[name] = optional(getattr(snapshot, name))
+    if not snapshot.portfolio_available:
+        row["portfolio_grams"] = row["portfolio_cost_aud"] = np.nan
+    return row
+
+
+class PassbookStore:
+    def __init__(self, directory: Path | None = None) -> None:
+        self.directory = directory or gold_alert.STATE_DIR / STORE_NAME
+        self.rows = 0
+        try:
+            schema = json.loads((self.directory / SCHEMA_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if schema.get("version") == SCHEMA_VERSION and schema.get("columns") == COLUMNS:
+            self.rows = int(schema["rows"])
+
+    def column_path(self, name: str) -> Path:
+        return self.directory / f"{name}.bin"
+
+    def append_rows(self, values: dict[str, np.ndarray]) -> int:
+        count = len(values["captured_at"])
+        if not count:
+            return 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            column = np.asarray(values.get(name, np.full(count, np.nan)), dtype=dtype)
+            path = self.column_path(name)
+            with path.open("r+b" if path.exists() else "wb") as handle:
+                handle.truncate(self.rows * column.itemsize)
+                handle.seek(0, 2)
+                handle.write(column.tobytes())
+        self.rows += count
+        temporary = self.directory / f"{SCHEMA_NAME}.tmp"
+        temporary.write_text(
+            json.dumps({"version": SCHEMA_VERSION, "rows": self.rows, "columns": COLUMNS}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        temporary.replace(self.directory / SCHEMA_NAME)
+        return count
+
+    def append_snapshot(self, snapshot: gold_alert.MarketSnapshot) -> None:
+        row = {name: [value] for name, value in snapshot_row(snapshot).items()}
+        self.append_rows({"captured_at": [timestamp_ns(snapshot.captured_at)], **row})
+
+    def import_csv(self, path: Path, before_ns: int | None = None) -> int:
+        if not path.exists():
+            return 0
+        header, (dates, *columns) = gold_alert.read_csv_columns(path, ("Date", *CSV_FIELDS.values()))
+        if "Date" not in header:
+            raise RuntimeError(f"{path} must contain a Date column")
+        keep = []
+        stamps = []
+        for row, text in enumerate(dates):
+            try:
+                moment = datetime.strptime(text.strip()[:16], "%Y-%m-%d %H:%M")
+            except ValueError:
+                continue
+            stamp = timestamp_ns(moment.replace(tzinfo=gold_alert.PERTH_TIMEZONE))
+            if before_ns is None or stamp < before_ns:
+                keep.append(row)
+                stamps.append(stamp)
+        values = {"captured_at": np.array(stamps, dtype="int64")}
+        for name, texts in zip(CSV_FIELDS, columns):
+            values[name] = [optional(gold_alert.csv_number(texts[row])) for row in keep]
+        return self.append_rows(values)
+
+    def read(self, names: tuple[str, ...] | None = None) -> dict[str, np.ndarray]:
+        columns = {}
+        for name in names or tuple(COLUMNS):
+            if self.rows:
+                columns[name] = np.memmap(self.column_path(name), dtype=COLUMNS[name], mode="r", shape=(self.rows,))
+            else:
+                columns[name] = np.zeros(0, dtype=COLUMNS[name])
+        return columns
+
+
+def open_store(directory: Path | None = None, names: tuple[str, ...] | None = None) -> dict[str, np.ndarray]:
+    return PassbookStore(directory).read(names)
+
+
+def mirror_snapshot(
+    snapshot: gold_alert.MarketSnapshot,
+    directory: Path | None = None,
+    passbook: Path | None = None,
+) -> None:
+    store = PassbookStore(directory)
+    if not store.rows:
+        minute = snapshot.captured_at.replace(second=0, microsecond=0)
+        store.import_csv(passbook or gold_alert.PASSBOOK_PATH, before_ns=timestamp_ns(minute))
+    store.append_snapshot(snapshot)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the typed passbook store from the CSV passbook.")
+    parser.add_argument("--passbook", type=Path, default=gold_alert.PASSBOOK_PATH)
+    parser.add_argument("--output", type=Path, default=gold_alert.STATE_DIR / STORE_NAME)
+    args = parser.parse_args()
+    (args.output / SCHEMA_NAME).unlink(missing_ok=True)
+    rows = PassbookStore(args.output).import_csv(args.passbook)
+    print(f"Wrote {rows} row(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
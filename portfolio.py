@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import argparse
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+import backtest
+import gold_alert
+import passbook_query
+
+
+LEDGER_COLUMNS = ("Date", "Grams", "Total_Paid_AUD", "Price_Paid_AUD", "Source", "Notes")
+GROUPINGS = ("location", "size", "currency")
+SOURCE_LOCATIONS = {"taobao": "China", "perth mint": "Australia", "perth_mint": "Australia"}
+SOURCE_CURRENCIES = {"taobao": "CNY", "perth mint": "AUD", "perth_mint": "AUD"}
+DEFAULT_LOCATION = "Unspecified"
+DEFAULT_CURRENCY = "AUD"
+STORED_IN_PATTERN = re.compile(r"stored in ([^;,.]+)", re.IGNORECASE)
+GRAMS_TOLERANCE = 1e-9
+
+
+@dataclass(frozen=True, eq=False)
+class LotBook:
+    dates: np.ndarray
+    grams: np.ndarray
+    cost: np.ndarray
+    open_grams: np.ndarray
+    open_cost: np.ndarray
+    codes: dict[str, np.ndarray]
+    labels: dict[str, tuple[str, ...]]
+    sale_dates: np.ndarray
+    sale_grams: np.ndarray
+    sale_proceeds: np.ndarray
+    sale_cost: np.ndarray
+
+    @property
+    def total_open_grams(self) -> float:
+        return float(self.open_grams.sum())
+
+    @property
+    def total_open_cost(self) -> float:
+        return float(self.open_cost.sum())
+
+    @property
+    def realized_aud(self) -> float:
+        return float((self.sale_proceeds - self.sale_cost).sum())
+
+    @property
+    def break_even_spot(self) -> float | None:
+        grams = self.total_open_grams
+        return self.total_open_cost / grams if grams > GRAMS_TOLERANCE else None
+
+
+@dataclass(frozen=True, eq=False)
+class LotValuation:
+    value: np.ndarray
+    unrealized: np.ndarray
+    return_pct: np.ndarray
+    break_even: np.ndarray
+    holding_days: np.ndarray
+    premium_paid: np.ndarray
+    premium_recovered_pct: np.ndarray
+
+
+@dataclass(frozen=True)
+class AllocationRow:
+    label: str
+    lots: int
+    grams: float
+    cost: float
+    value: float
+    unrealized: float
+    share_pct: float
+
+
+def numbers(values: list[str]) -> np.ndarray:
+    try:
+        array = np.array(values, dtype="float64")
+    except ValueError:
+        array = np.array([
+            number if (number := gold_alert.csv_number(value)) is not None else np.nan for value in values
+        ], dtype="float64")
+    return np.where(np.isfinite(array), array, np.nan)
+
+
+def day_dates(values: list[str]) -> np.ndarray:
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(np.datetime64(value.strip()[:10], "D"))
+            except ValueError:
+                parsed.append(np.datetime64("NaT", "D"))
+        return np.array(parsed, dtype="datetime64[D]")
+
+
+def lot_attributes(sources: list[str], notes: list[str]) -> dict[str, tuple[np.ndarray, tuple[str, ...]]]:
+    pairs: dict[tuple[str, str], int] = {}
+    pair_codes = np.fromiter(
+        (pairs.setdefault(pair, len(pairs)) for pair in zip(sources, notes)), dtype="int32", count=len(sources),
+    )
+    locations = []
+    currencies = []
+    for source, note in pairs:
+        source = source.strip().lower()
+        stored = STORED_IN_PATTERN.search(note)
+        locations.append(stored.group(1).strip().title() if stored else SOURCE_LOCATIONS.get(source, DEFAULT_LOCATION))
+        currencies.append(SOURCE_CURRENCIES.get(source, DEFAULT_CURRENCY))
+    attributes = {}
+    for name, labels in (("location", locations), ("currency", currencies)):
+        unique, codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        attributes[name] = codes.astype("int32")[pair_codes], tuple(unique.tolist())
+    return attributes
+
+
+def build_book(
+    dates: np.ndarray,
+    grams: np.ndarray,
+    paid: np.ndarray,
+    sources: list[str],
+    notes: list[str],
+) -> LotBook:
+    valid = np.isfinite(grams) & np.isfinite(paid) & (grams != 0) & (paid >= 0)
+    buys = np.flatnonzero(valid & (grams > 0))
+    sells = np.flatnonzero(valid & (grams < 0) & ~np.isnat(dates))
+    buys = buys[np.argsort(dates[buys], kind="stable")]
+    sells = sells[np.argsort(dates[sells], kind="stable")]
+
+    lot_grams = grams[buys]
+    lot_cost = paid[buys]
+    sale_grams = -grams[sells]
+    bought = np.concatenate(([0.0], np.cumsum(lot_grams)))
+    spent = np.concatenate(([0.0], np.cumsum(lot_cost)))
+    sold = np.concatenate(([0.0], np.cumsum(sale_grams)))
+
+    available = bought[np.searchsorted(dates[buys], dates[sells], side="right")]
+    oversold = np.flatnonzero(sold[1:] > available + GRAMS_TOLERANCE)
+    if len(oversold):
+        first = oversold[0]
+        raise RuntimeError(
+            f"Sale of {sale_grams[first]:g}g on {dates[sells][first]} exceeds the "
+            f"{available[first] - sold[first]:g}g held at that date"
+        )
+
+    open_grams = lot_grams - np.clip(sold[-1] - bought[:-1], 0.0, lot_grams)
+    open_grams[open_grams < GRAMS_TOLERANCE] = 0.0
+    size_values, size_codes = np.unique(lot_grams, return_inverse=True)
+    codes = {"size": size_codes.astype("int32")}
+    labels = {"size": tuple(f"{size:g}g" for size in size_values)}
+    for name, (row_codes, names) in lot_attributes(sources, notes).items():
+        codes[name] = row_codes[buys]
+        labels[name] = names
+    return LotBook(
+        dates=dates[buys],
+        grams=lot_grams,
+        cost=lot_cost,
+        open_grams=open_grams,
+        open_cost=open_grams * (lot_cost / lot_grams),
+        codes=codes,
+        labels=labels,
+        sale_dates=dates[sells],
+        sale_grams=sale_grams,
+        sale_proceeds=paid[sells],
+        sale_cost=np.diff(np.interp(sold, bought, spent)),
+    )
+
+
+def load_ledger(path: Path | None = None) -> LotBook:
+    path = path or gold_alert.HOLDINGS_PATH
+    if not path.exists():
+        return build_book(np.zeros(0, dtype="datetime64[D]"), np.zeros(0), np.zeros(0), [], [])
+    header, (dates, grams_text, total_text, unit_text, sources, notes) = gold_alert.read_csv_columns(
+        path, LEDGER_COLUMNS,
+    )
+    if "Grams" not in header:
+        raise RuntimeError(f"{path} must contain a Grams column")
+    if "Total_Paid_AUD" not in header and "Price_Paid_AUD" not in header:
+        raise RuntimeError(f"{path} must contain Total_Paid_AUD or Price_Paid_AUD")
+
+    grams = numbers(grams_text)
+    paid = numbers(total_text)
+    missing = np.isnan(paid)
+    if missing.any():
+        paid[missing] = np.abs(grams[missing]) * numbers(unit_text)[missing]
+    return build_book(day_dates(dates), grams, paid, sources, notes)
+
+
+def purchase_spots(
+    book: LotBook,
+    history_dates: list[str] | np.ndarray,
+    history_prices: np.ndarray,
+) -> np.ndarray:
+    days = np.array(history_dates, dtype="datetime64[D]")
+    index = np.searchsorted(days, book.dates, side="right") - 1
+    spots = np.asarray(history_prices, dtype="float64")[np.clip(index, 0, None)] if len(days) else np.full(
+        len(book.dates), np.nan,
+    )
+    return np.where((index >= 0) & ~np.isnat(book.dates), spots, np.nan)
+
+
+def value_lots(
+    book: LotBook,
+    spot_aud: float,
+    as_of: date | np.datetime64,
+    purchase_spot: np.ndarray | None = None,
+) -> LotValuation:
+    break_even = book.cost / book.grams
+    value = book.open_grams * spot_aud
+    unrealized = value - book.open_cost
+    holding_days = (np.datetime64(as_of, "D") - book.dates).astype("float64")
+    holding_days[np.isnat(book.dates)] = np.nan
+    if purchase_spot is None:
+        purchase_spot = np.full(len(book.grams), np.nan)
+    premium = break_even - purchase_spot
+    return LotValuation(
+        value=value,
+        unrealized=unrealized,
+        return_pct=backtest.ratio(unrealized, book.open_cost) * 100,
+        break_even=break_even,
+        holding_days=holding_days,
+        premium_paid=premium * book.open_grams,
+        premium_recovered_pct=backtest.ratio(spot_aud - purchase_spot, premium) * 100,
+    )
+
+
+def allocation(book: LotBook, valuation: LotValuation, by: str) -> list[AllocationRow]:
+    if by not in GROUPINGS:
+        raise ValueError(f"Allocation must be grouped by one of: {', '.join(GROUPINGS)}")
+    held = book.open_grams > 0
+    codes = book.codes[by][held]
+    labels = book.labels[by]
+    totals = [
+        np.bincount(codes, weights=weights[held], minlength=len(labels))
+        for weights in (book.open_grams, book.open_cost, valuation.value, valuation.unrealized)
+    ]
+    lots = np.bincount(codes, minlength=len(labels))
+    total_value = totals[2].sum()
+    return [
+        AllocationRow(
+            label=labels[group],
+            lots=int(lots[group]),
+            grams=float(totals[0][group]),
+            cost=float(totals[1][group]),
+            value=float(totals[2][group]),
+            unrealized=float(totals[3][group]),
+            share_pct=float(totals[2][group] / total_value * 100) if total_value else 0.0,
+        )
+        for group in np.argsort(-totals[2], kind="stable")
+        if lots[group]
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Value the holdings ledger lot by lot.")
+    parser.add_argument("--ledger", type=Path, default=gold_alert.HOLDINGS_PATH)
+    parser.add_argument("--history", type=Path,
+                        help="read spot prices from a Date,Spot_AUD_g CSV instead of the passbook store")
+    parser.add_argument("--spot", type=float, help="value lots at this AUD/g spot instead of the latest history row")
+    parser.add_argument("--by", choices=GROUPINGS, nargs="+", default=list(GROUPINGS))
+    parser.add_argument("--lots", type=int, default=20, help="list this many open lots")
+    args = parser.parse_args()
+
+    book = load_ledger(args.ledger)
+    history_dates, history_prices = (
+        backtest.load_history_csv(args.history) if args.history else passbook_query.PassbookQuery().daily_series()
+    )
+    spot = args.spot if args.spot is not None else (float(history_prices[-1]) if len(history_prices) else None)
+    if spot is None:
+        parser.error("no spot price history was found; pass --spot")
+    today = datetime.now(gold_alert.PERTH_TIMEZONE).date()
+    valuation = value_lots(book, spot, today, purchase_spots(book, history_dates, history_prices))
+
+    open_cost = book.total_open_cost
+    unrealized = float(valuation.unrealized.sum())
+    break_even = book.break_even_spot
+    print(f"Spot: ${spot:,.2f} AUD/g")
+    print(f"Open: {book.total_open_grams:g}g in {int((book.open_grams > 0).sum())} lots | "
+          f"cost ${open_cost:,.2f} | value ${valuation.value.sum():,.2f} | "
+          f"unrealized ${unrealized:+,.2f} ({unrealized / open_cost * 100 if open_cost else 0:+.1f}%)")
+    print(f"Break-even spot: {f'${break_even:,.2f} AUD/g' if break_even is not None else 'n/a'} | "
+          f"realized ${book.realized_aud:+,.2f} over {len(book.sale_grams)} sales")
+
+    for grouping in args.by:
+        print(f"\nBY {grouping.upper()}")
+        for row in allocation(book, valuation, grouping):
+            print(f"{row.label:<14} {row.grams:>10g}g {row.lots:>7} lots ${row.value:>14,.2f} "
+                  f"{row.share_pct:>5.1f}% {row.unrealized:>+14,.2f}")
+
+    held = np.flatnonzero(book.open_grams > 0)[:args.lots]
+    if len(held):
+        print(f"\n{'Bought':<10} {'Grams':>8} {'Break-even':>11} {'Days':>6} {'P/L':>12} {'Premium back':>13}")
+    for lot in held:
+        recovered = valuation.premium_recovered_pct[lot]
+        days = valuation.holding_days[lot]
+        print(f"{str(book.dates[lot]):<10} {book.open_grams[lot]:>8g} {valuation.break_even[lot]:>11,.2f} "
+              f"{(f'{days:.0f}' if np.isfinite(days) else 'n/a'):>6} {valuation.unrealized[lot]:>+12,.2f} "
+              f"{(f'{recovered:.0f}%' if np.isfinite(recovered) else 'n/a'):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 import argparse
 import csv
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 
 COLUMNS = ["Date", "Item", "Grams", "Total_Paid_AUD", "Source", "Notes"]
+IMPORT_REQUIRED_COLUMNS = ("Date", "Grams", "Total_Paid_AUD")
+FINGERPRINT_BYTES = 16
+REJECT_PREVIEW_ROWS = 20
+
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    duplicates: int = 0
+    rejected: list[tuple[int, str, dict[str, str]]] = field(default_factory=list)
 
 
 def clean_text(value: str, fallback: str = "") -> str:
@@ -52,15 +65,14 @@ def read_existing(path: Path) -> list[dict[str, str]]:
     raise ValueError(f"{path} has an unsupported holdings format")
 
 
-def append_purchase(
-    path: Path,
+def purchase_row(
     purchase_date: str,
     item: str,
     grams: str,
     total_paid_aud: str,
     source: str,
     notes: str = "",
-) -> bool:
+) -> dict[str, str]:
     try:
         parsed_date = date.fromisoformat(purchase_date.strip())
     except ValueError:
@@ -68,7 +80,7 @@ def append_purchase(
 
     grams_value = positive_decimal(grams, "Grams")
     total_value = positive_decimal(total_paid_aud, "Total paid (AUD)")
-    row = {
+    return {
         "Date": parsed_date.isoformat(),
         "Item": clean_text(item, "Gold purchase"),
         "Grams": format(grams_value.normalize(), "f"),
@@ -76,30 +88,201 @@ def append_purchase(
         "Source": clean_text(source, "Other"),
         "Notes": clean_text(notes),
     }
-    rows = read_existing(path)
-    if row in rows:
+
+
+def sale_row(
+    sale_date: str,
+    item: str,
+    grams: str,
+    proceeds_aud: str,
+    source: str,
+    notes: str = "",
+) -> dict[str, str]:
+    row = purchase_row(sale_date, item, grams, proceeds_aud, source, notes)
+    row["Grams"] = f"-{row['Grams']}"
+    return row
+
+
+def check_holdings(rows: list[dict[str, str]]) -> None:
+    changes = []
+    for row in rows:
+        try:
+            changes.append((date.fromisoformat(row["Date"].strip()), Decimal(row["Grams"].replace(",", "").strip())))
+        except (ValueError, InvalidOperation):
+            continue
+    held = Decimal(0)
+    for day, grams in sorted(changes, key=lambda change: (change[0], change[1] < 0)):
+        if grams < 0 and held + grams < 0:
+            raise ValueError(f"Sale of {-grams:f}g on {day} exceeds the {held:f}g held at that date")
+        held += grams
+
+
+def fingerprint(values: Iterable[str]) -> bytes:
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=FINGERPRINT_BYTES).digest()
+
+
+class PurchaseLedger:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.fingerprints: set[bytes] = set()
+        self.handle = None
+        self.writer = None
+
+    def __enter__(self) -> "PurchaseLedger":
+        header = self.index_existing()
+        if header != COLUMNS:
+            rows = read_existing(self.path) if header else []
+            self.fingerprints = {fingerprint(row[column] for column in COLUMNS) for row in rows}
+            with self.path.open("w", newline="", encoding="utf-8") as handle:
+                writer = csv.DictWriter(handle, fieldnames=COLUMNS, lineterminator="\n")
+                writer.writeheader()
+                writer.writerows(rows)
+        elif not self.ends_with_newline():
+            with self.path.open("a", newline="", encoding="utf-8") as handle:
+                handle.write("\n")
+        self.handle = self.path.open("a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.handle, fieldnames=COLUMNS, lineterminator="\n")
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.handle.close()
+
+    def index_existing(self) -> list[str] | None:
+        if not self.path.exists():
+            return None
+        with self.path.open(newline="", encoding="utf-8") as handle:
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if header != COLUMNS:
+                return header
+            width = len(COLUMNS)
+            self.fingerprints = {fingerprint((row + [""] * width)[:width]) for row in reader if row}
+        return header
+
+    def ends_with_newline(self) -> bool:
+        with self.path.open("rb") as handle:
+            handle.seek(-1, 2)
+            return handle.read(1) == b"\n"
+
+    def add(self, row: dict[str, str]) -> bool:
+        key = fingerprint(row[column] for column in COLUMNS)
+        if key in self.fingerprints:
+            return False
+        self.fingerprints.add(key)
+        self.writer.writerow(row)
+        return True
+
+
+def append_purchase(
+    path: Path,
+    purchase_date: str,
+    item: str,
+    grams: str,
+    total_paid_aud: str,
+    source: str,
+    notes: str = "",
+) -> bool:
+    row = purchase_row(purchase_date, item, grams, total_paid_aud, source, notes)
+    with PurchaseLedger(path) as ledger:
+        added = ledger.add(row)
+    if not added:
         print("This purchase is already recorded; no duplicate was added.")
         return False
+    print(f"Recorded {row['Grams']}g for A${row['Total_Paid_AUD']} on {row['Date']}.")
+    return True
+
+
+def append_sale(
+    path: Path,
+    sale_date: str,
+    item: str,
+    grams: str,
+    proceeds_aud: str,
+    source: str,
+    notes: str = "",
+) -> bool:
+    row = sale_row(sale_date, item, grams, proceeds_aud, source, notes)
+    check_holdings(read_existing(path) + [row])
+    with PurchaseLedger(path) as ledger:
+        added = ledger.add(row)
+    if not added:
+        print("This sale is already recorded; no duplicate was added.")
+        return False
+    print(f"Recorded the sale of {row['Grams'][1:]}g for A${row['Total_Paid_AUD']} on {row['Date']}.")
+    return True
+
 
-    rows.append(row)
+def import_purchases(path: Path, source_path: Path, default_source: str = "Other") -> ImportResult:
+    result = ImportResult()
+    with source_path.open(newline="", encoding="utf-8-sig") as handle:
+        reader = csv.DictReader(handle)
+        missing = [column for column in IMPORT_REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{source_path} must contain columns: {', '.join(missing)}")
+        with PurchaseLedger(path) as ledger:
+            for record in reader:
+                try:
+                    row = purchase_row(
+                        record["Date"] or "", record.get("Item") or "", record["Grams"] or "",
+                        record["Total_Paid_AUD"] or "", record.get("Source") or default_source,
+                        record.get("Notes") or "",
+                    )
+                except ValueError as error:
+                    result.rejected.append((reader.line_num, str(error), record))
+                    continue
+                if ledger.add(row):
+                    result.added += 1
+                else:
+                    result.duplicates += 1
+    return result
+
+
+def write_rejects(path: Path, rejected: list[tuple[int, str, dict[str, str]]]) -> None:
+    fieldnames = ["Line", "Error"] + list(dict.fromkeys(key for _, _, record in rejected for key in record if key))
     with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=COLUMNS)
+        writer = csv.DictWriter(handle, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
         writer.writeheader()
-        writer.writerows(rows)
-    print(f"Recorded {row['Grams']}g for A${row['Total_Paid_AUD']} on {row['Date']}.")
-    return True
+        writer.writerows({**record, "Line": line, "Error": error} for line, error, record in rejected)
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Record a gold purchase in the holdings ledger.")
-    parser.add_argument("--date", required=True)
-    parser.add_argument("--item", required=True)
-    parser.add_argument("--grams", required=True)
-    parser.add_argument("--total-paid-aud", required=True)
-    parser.add_argument("--source", required=True)
+    parser = argparse.ArgumentParser(description="Record a gold purchase or sale in the holdings ledger.")
+    parser.add_argument("--date")
+    parser.add_argument("--item")
+    parser.add_argument("--grams")
+    parser.add_argument("--total-paid-aud")
+    parser.add_argument("--source")
     parser.add_argument("--notes", default="")
+    parser.add_argument("--sell", action="store_true",
+                        help="record a sale: --grams sold and the AUD received as --total-paid-aud")
+    parser.add_argument("--import", dest="import_path", type=Path,
+                        help="record every row of a Date,Item,Grams,Total_Paid_AUD,Source,Notes CSV")
+    parser.add_argument("--rejects", type=Path, help="write rows rejected by --import to this CSV")
     args = parser.parse_args()
-    append_purchase(
+
+    if args.import_path:
+        result = import_purchases(Path("my_holdings.csv"), args.import_path, args.source or "Other")
+        print(f"Imported {result.added} purchases; skipped {result.duplicates} duplicates; "
+              f"rejected {len(result.rejected)} rows.")
+        for line, error, _ in result.rejected[:REJECT_PREVIEW_ROWS]:
+            print(f"  line {line}: {error}")
+        if len(result.rejected) > REJECT_PREVIEW_ROWS:
+            print(f"  ... and {len(result.rejected) - REJECT_PREVIEW_ROWS} more")
+        if args.rejects and result.rejected:
+            write_rejects(args.rejects, result.rejected)
+            print(f"Wrote rejected rows to {args.rejects}")
+        return
+
+    missing = [
+        option for option, value in (
+            ("--date", args.date), ("--item", args.item), ("--grams", args.grams),
+            ("--total-paid-aud", args.total_paid_aud), ("--source", args.source),
+        ) if value is None
+    ]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+    append_entry = append_sale if args.sell else append_purchase
+    append_entry(
         Path("my_holdings.csv"), args.date, args.item, args.grams,
         args.total_paid_aud, args.source, args.notes,
     )
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import alert_rules
+import gold_alert
+
+
+USERS_DIR = Path("users")
+PROFILE_NAME = "profile.json"
+HOLDINGS_NAME = "holdings.csv"
+RULES_NAME = "alert_rules.csv"
+USER_WORKERS = os.cpu_count() or 1
+USERS_PER_WORKER = 4
+
+_shared: tuple[gold_alert.MarketSnapshot, str, str, Path, set[str]] | None = None
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    user_id: str
+    email: str
+    mode: str
+    dip_percentage: float
+    directory: Path
+
+    @property
+    def holdings_path(self) -> Path:
+        return self.directory / HOLDINGS_NAME
+
+    @property
+    def rules_path(self) -> Path:
+        return self.directory / RULES_NAME
+
+
+def load_profile(directory: Path) -> UserProfile:
+    path = directory / PROFILE_NAME
+    try:
+        profile = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as error:
+        raise RuntimeError(f"{path} could not be read: {error}") from None
+    if not isinstance(profile, dict):
+        raise RuntimeError(f"{path} must contain a JSON object")
+    email = str(profile.get("email") or "").strip()
+    mode = str(profile.get("mode") or "Bilingual").strip().capitalize()
+    try:
+        dip_pct = float(profile.get("dip_pct", gold_alert.DIP_PERCENTAGE * 100))
+    except (TypeError, ValueError):
+        raise RuntimeError(f"{path}: dip_pct must be a number") from None
+    if "@" not in email:
+        raise RuntimeError(f"{path}: email must be an email address")
+    if mode not in gold_alert.REPORT_MODES:
+        raise RuntimeError(f"{path}: mode must be one of {', '.join(gold_alert.REPORT_MODES)}")
+    if not 0 < dip_pct < 100:
+        raise RuntimeError(f"{path}: dip_pct must be between 0 and 100")
+    return UserProfile(directory.name, email, mode, dip_pct / 100, directory)
+
+
+def load_users(directory: Path | None = None) -> list[UserProfile]:
+    directory = directory or USERS_DIR
+    if not directory.is_dir():
+        return []
+    users = []
+    for path in sorted(directory.iterdir()):
+        if not path.is_dir() or not (path / PROFILE_NAME).exists():
+            continue
+        try:
+            users.append(load_profile(path))
+        except RuntimeError as error:
+            print(f"Skipping user {path.name}: {error}")
+    return users
+
+
+def user_snapshot(snapshot: gold_alert.MarketSnapshot, profile: UserProfile) -> gold_alert.MarketSnapshot:
+    return replace(snapshot, **gold_alert.portfolio_fields(profile.holdings_path), dip_percentage=profile.dip_percentage)
+
+
+def share(
+    snapshot: gold_alert.MarketSnapshot,
+    store_status: str,
+    sender: str,
+    outbox: Path,
+    delivered: set[str],
+) -> None:
+    global _shared
+    _shared = (snapshot, store_status, sender, outbox, delivered)
+
+
+def queue_user(profile: UserProfile) -> int:
+    snapshot, store_status, sender, outbox, delivered = _shared
+    personal = user_snapshot(snapshot, profile)
+    key = gold_alert.idempotency_key(snapshot, profile.email, f"{profile.mode}:{profile.user_id}")
+    queued = 0
+    if key not in delivered and not (outbox / f"{key}.eml").exists():
+        message = gold_alert.build_message(personal, store_status, sender, profile.email, profile.mode)
+        gold_alert.queue_message(message, key, outbox)
+        queued += 1
+    if profile.rules_path.exists():
+        queued += alert_rules.enqueue_rule_alerts(
+            personal, sender, profile.rules_path, outbox, (profile.email, profile.mode), delivered,
+        )
+    return queued
+
+
+def enqueue_user_reports(
+    snapshot: gold_alert.MarketSnapshot,
+    store_status: str,
+    sender: str,
+    directory: Path | None = None,
+    outbox: Path | None = None,
+    workers: int = USER_WORKERS,
+) -> int:
+    users = load_users(directory)
+    if not users:
+        return 0
+    shared = (snapshot, store_status, sender, outbox or gold_alert.OUTBOX_DIR, gold_alert.load_delivered_keys())
+    workers = min(workers, -(-len(users) // USERS_PER_WORKER))
+    if workers <= 1:
+        share(*shared)
+        return sum(map(queue_user, users))
+    with ProcessPoolExecutor(max_workers=workers, initializer=share, initargs=shared) as pool:
+        return sum(pool.map(queue_user, users, chunksize=USERS_PER_WORKER))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List the users whose reports are fanned out from each snapshot.")
+    parser.add_argument("--users", type=Path, default=USERS_DIR)
+    args = parser.parse_args()
+    for profile in load_users(args.users):
+        grams, cost = (
+            gold_alert.load_portfolio(profile.holdings_path) if profile.holdings_path.exists() else (0.0, 0.0)
+        )
+        rules = len(alert_rules.load_rules(profile.rules_path)) if profile.rules_path.exists() else 0
+        print(
+            f"{profile.user_id:<16} {profile.email:<32} {profile.mode:<9} dip {profile.dip_percentage * 100:g}% "
+            f"{grams:,.2f}g A${cost:,.2f} {rules} rule(s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import math
+import operator
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import datetime, timedelta
+from email import policy
+from email.parser import BytesParser
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+import alert_rules
+import gold_alert
+import passbook_store
+
+
+COMPARISONS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq, "!=": operator.ne,
+}
+
+
+def snapshot(**changes):
+    values = {
+        "captured_at": datetime(2026, 7, 14, 10, 0, tzinfo=gold_alert.PERTH_TIMEZONE),
+        "spot_aud": 150.0, "spot_cny": 700.0, "daily_change_pct": 0.4, "ma50_aud": 149.0, "ma200_aud": 150.5,
+        "pm_1g": 180.0, "pm_5g": 800.0,
+    }
+    return gold_alert.MarketSnapshot(**{**values, **changes})
+
+
+def history(rows=80, seed=2):
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 5, 1, 10, 0, tzinfo=gold_alert.PERTH_TIMEZONE)
+    moments = [start + timedelta(hours=12 * row) for row in range(rows)]
+    return {
+        "captured_at": np.array([passbook_store.timestamp_ns(moment) for moment in moments]),
+        "spot_aud": 150 + rng.normal(0, 1, rows),
+        "spot_cny": 700 + rng.normal(0, 5, rows),
+        "daily_change_pct": rng.normal(0, 0.5, rows),
+        "ma50_aud": np.full(rows, 149.0),
+        "ma200_aud": np.full(rows, 151.0),
+        "pm_1g": np.where(rng.random(rows) < 0.2, np.nan, 175 + rng.normal(0, 2, rows)),
+    }
+
+
+def loop_evaluate(rules, columns):
+    values = alert_rules.field_matrix(columns)
+    result = np.zeros((len(rules), values.shape[1]), dtype=bool)
+    for number, rule in enumerate(rules):
+        for row in range(values.shape[1]):
+            matched = True
+            for field, name, operand in alert_rules.parse_condition(rule.condition):
+                def side(at):
+                    left = values[alert_rules.FIELD_INDEX[field], at]
+                    right = operand if isinstance(operand, float) else values[alert_rules.FIELD_INDEX[operand], at]
+                    return left, right
+
+                left, right = side(row)
+                if math.isnan(left) or math.isnan(right):
+                    matched = False
+                elif name in COMPARISONS:
+                    matched = matched and COMPARISONS[name](left, right)
+                else:
+                    before = side(row - 1) if row else (math.nan, math.nan)
+                    if name == "crosses_above":
+                        matched = matched and left > right and before[0] <= before[1]
+                    else:
+                        matched = matched and left < right and before[0] >= before[1]
+            result[number, row] = matched
+    return result
+
+
+class AlertRuleTests(unittest.TestCase):
+    def test_batch_evaluation_matches_a_loop_per_rule(self):
+        rng = np.random.default_rng(7)
+        columns = history(120)
+        fields = ("spot_aud", "pm_1g_premium_pct", "ma50_distance_pct", "daily_move_sigma", "daily_change_pct")
+        rules = []
+        for number in range(300):
+            clauses = []
+            for _ in range(rng.integers(1, 4)):
+                field = fields[rng.integers(len(fields))]
+                name = list(alert_rules.SIGNS)[rng.integers(len(alert_rules.SIGNS))]
+                operand = fields[rng.integers(len(fields))] if rng.random() < 0.2 else f"{rng.normal(0, 3):.2f}"
+                if name in ("==", "!=") and rng.random() < 0.5:
+                    operand = field
+                clauses.append(f"{field} {name} {operand}")
+            rules.append(alert_rules.AlertRule(f"rule{number}", " and ".join(clauses)))
+
+        compiled = alert_rules.compile_rules(rules)
+        expected = loop_evaluate(rules, columns)
+        np.testing.assert_array_equal(alert_rules.evaluate(compiled, columns), expected)
+        with patch.object(alert_rules, "BLOCK_ELEMENTS", 1_000):
+            np.testing.assert_array_equal(alert_rules.evaluate(compiled, columns), expected)
+        self.assertTrue(expected.any())
+
+    def test_rules_fire_on_the_snapshot_that_makes_them_true(self):
+        past = history()
+        rules = alert_rules.compile_rules([
+            alert_rules.AlertRule("golden_cross", "ma50_aud crosses_above ma200_aud"),
+            alert_rules.AlertRule("cheap_mint", "pm_1g_premium_pct < 15 AND spot_aud > 100"),
+            alert_rules.AlertRule("big_move", "daily_move_sigma > 4"),
+            alert_rules.AlertRule("stale_taobao", "taobao_age_days > 7"),
+        ])
+        quiet = snapshot(ma50_aud=149.5, pm_1g=180.0, taobao_app_checked_on="10 Jul 2026")
+        self.assertEqual(alert_rules.fired_rules(rules, quiet, past), [])
+
+        busy = snapshot(ma50_aud=152.0, daily_change_pct=3.0, pm_1g=170.0, taobao_app_checked_on="01 Jul 2026")
+        fired = [rule.rule_id for rule in alert_rules.fired_rules(rules, busy, past)]
+        self.assertEqual(fired, ["golden_cross", "cheap_mint", "big_move", "stale_taobao"])
+
+        columns = alert_rules.snapshot_columns(busy, past)
+        self.assertEqual(len(columns["spot_aud"]), len(past["spot_aud"]) + 1)
+        sigma = alert_rules.field_matrix(columns)[alert_rules.FIELD_INDEX["daily_move_sigma"], -1]
+        self.assertAlmostEqual(sigma, 3.0 / np.std(past["daily_change_pct"][1::2], ddof=1))
+        imported = dict(past, daily_change_pct=np.where(np.arange(80) % 2, past["daily_change_pct"], np.nan))
+        gappy = alert_rules.field_matrix(alert_rules.snapshot_columns(busy, imported))
+        self.assertAlmostEqual(gappy[alert_rules.FIELD_INDEX["daily_move_sigma"], -1], sigma)
+        later = replace(busy, captured_at=busy.captured_at + timedelta(days=alert_rules.SIGMA_LOOKBACK_DAYS))
+        self.assertEqual(len(alert_rules.snapshot_columns(later, past)["spot_aud"]), 2)
+        repeated = {name: np.append(past[name], columns[name][-1]) for name in past}
+        self.assertNotIn("cheap_mint", [rule.rule_id for rule in alert_rules.fired_rules(rules, busy, repeated)])
+
+    def test_rules_file_is_validated_and_alerts_are_queued_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            path = root / "alert_rules.csv"
+            path.write_text(
+                "Rule_ID,Condition,Recipients,Label\n"
+                "dip,spot_aud < 155,family@example.com:Mandarin;me@example.com,Spot under A$155\n"
+                "premium,pm_1g_premium_pct < 10,,Cheap Perth Mint 1g\n"
+                "cross,ma50_aud crosses_below ma200_aud,me@example.com,\n",
+                encoding="utf-8",
+            )
+            rules = alert_rules.load_rules(path)
+            self.assertEqual(rules[0].recipients, (("family@example.com", "Mandarin"), ("me@example.com", "Bilingual")))
+            self.assertEqual(rules[2].label, "cross")
+
+            outbox = root / "outbox"
+            market = replace(snapshot(), pm_1g=None)
+            past = dict(history(5), spot_aud=np.full(5, 160.0))
+            with patch.object(gold_alert, "DELIVERY_LEDGER_PATH", root / "ledger.jsonl"), \
+                    patch.object(passbook_store, "open_store", return_value=past):
+                self.assertEqual(alert_rules.enqueue_rule_alerts(market, "owner@example.com", path, outbox), 2)
+                self.assertEqual(alert_rules.enqueue_rule_alerts(market, "owner@example.com", path, outbox), 0)
+            messages = [BytesParser(policy=policy.default).parsebytes(item.read_bytes()) for item in outbox.iterdir()]
+            subjects = {message["To"]: message["Subject"] for message in messages}
+            self.assertEqual(subjects["me@example.com"], "Gold alert: Spot under A$155 ($150.00/g)")
+            self.assertIn("黄金提醒", subjects["family@example.com"])
+
+            path.write_text("Rule_ID,Condition\nstale,taobao_age_days > 7\n", encoding="utf-8")
+            queued = []
+            with patch.object(gold_alert, "DELIVERY_LEDGER_PATH", root / "ledger.jsonl"), \
+                    patch.object(gold_alert, "STATE_DIR", root / "state"):
+                for hours in (0, 12, 24):
+                    market = snapshot(
+                        captured_at=snapshot().captured_at + timedelta(hours=hours, seconds=37),
+                        taobao_app_checked_on="01 Jul 2026",
+                    )
+                    queued.append(alert_rules.enqueue_rule_alerts(market, "owner@example.com", path, outbox))
+                    passbook_store.mirror_snapshot(market, passbook=root / "missing.csv")
+            self.assertEqual(queued, [1, 0, 0])
+            age = alert_rules.field_matrix(passbook_store.open_store(root / "state" / passbook_store.STORE_NAME))
+            self.assertEqual(age[alert_rules.FIELD_INDEX["taobao_age_days"]].tolist(), [13.0, 13.0, 14.0])
+
+            path.write_text("Rule_ID,Condition\nbad,spot_aud is low\n", encoding="utf-8")
+            with self.assertRaisesRegex(RuntimeError, "line 2: Cannot parse"):
+                alert_rules.load_rules(path)
+            path.write_text("Rule_ID,Condition\nbad,gold_price > 1\n", encoding="utf-8")
+            with self.assertRaisesRegex(RuntimeError, "line 2: Unknown field: gold_price"):
+                alert_rules.load_rules(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
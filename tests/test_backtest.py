@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import backtest
+
+
+def random_walk(days=1_500, seed=7):
+    rng = np.random.default_rng(seed)
+    return 40 * np.exp(np.cumsum(rng.normal(0.0002, 0.012, days)))
+
+
+class GridTests(unittest.TestCase):
+    def test_grid_matches_a_day_by_day_loop(self):
+        prices = random_walk()
+        grid = backtest.run_grid(prices, dips=(0.0, 0.03, 0.08), windows=(20, 50), holding_days=(5, 63))
+        rows = {(row.ma_window, round(row.dip_pct, 4), row.holding_days): row for row in grid.rows()}
+        self.assertEqual(len(rows), 12)
+
+        for window, dip, hold in rows:
+            with self.subTest(window=window, dip=dip, hold=hold):
+                signal_days = [
+                    day for day in range(window - 1, len(prices))
+                    if prices[day] <= prices[day - window + 1:day + 1].mean() * (1 - dip)
+                ]
+                eligible = prices[window - 1:]
+                forward = [prices[day + hold] / prices[day] - 1 for day in signal_days if day + hold < len(prices)]
+                row = rows[window, dip, hold]
+                self.assertEqual(row.signal_days, len(signal_days))
+                self.assertAlmostEqual(row.signal_frequency_pct, len(signal_days) / len(eligible) * 100)
+                self.assertAlmostEqual(row.forward_return_pct, np.mean(forward) * 100)
+                self.assertAlmostEqual(row.hit_rate_pct, np.mean(np.array(forward) > 0) * 100)
+                self.assertAlmostEqual(row.average_cost, len(signal_days) / np.sum(1 / prices[signal_days]))
+                self.assertAlmostEqual(row.dca_average_cost, len(eligible) / np.sum(1 / eligible))
+
+    def test_dip_buying_beats_dca_on_a_mean_reverting_series(self):
+        days = np.arange(600)
+        prices = 100 + 10 * np.sin(days / 15)
+        row = next(
+            row for row in backtest.run_grid(prices, dips=(0.05,), windows=(50,), holding_days=(21,)).rows()
+        )
+        self.assertGreater(row.signal_days, 0)
+        self.assertLess(row.cost_vs_dca_pct, -5)
+
+    def test_combinations_without_signals_report_missing_values(self):
+        prices = np.linspace(50, 100, 300)
+        row = backtest.run_grid(prices, dips=(0.05,), windows=(20,), holding_days=(400,)).rows()[0]
+        self.assertEqual(row.signal_days, 0)
+        self.assertIsNone(row.forward_return_pct)
+        self.assertIsNone(row.average_cost)
+        self.assertIsNone(row.cost_vs_dca_pct)
+        self.assertIsNone(row.baseline_return_pct)
+
+    def test_invalid_inputs_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "200-day"):
+            backtest.run_grid(random_walk(100), windows=(200,))
+        with self.assertRaisesRegex(ValueError, "positive numbers"):
+            backtest.run_grid([1.0, float("nan"), 2.0], windows=(1,))
+        with self.assertRaisesRegex(ValueError, "Dips"):
+            backtest.run_grid(random_walk(100), dips=(1.5,), windows=(10,))
+
+
+class HistoryFileTests(unittest.TestCase):
+    def test_history_round_trips_and_passbook_keeps_last_spot_per_day(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "history.csv"
+            backtest.save_history_csv(path, ["2026-07-13", "2026-07-14"], np.array([150.5, 151.25]))
+            dates, prices = backtest.load_history_csv(path)
+            self.assertEqual(dates, ["2026-07-13", "2026-07-14"])
+            self.assertEqual(prices.tolist(), [150.5, 151.25])
+
+            passbook = Path(directory) / "gold_passbook.csv"
+            passbook.write_text(
+                "Date,Spot_AUD_g,Spot_CNY_g\n"
+                "2026-07-13 10:00,150.0,700\n2026-07-13 15:00,151.0,705\n2026-07-14 10:00,N/A,700\n",
+                encoding="utf-8",
+            )
+            dates, prices = backtest.load_history_csv(passbook)
+            self.assertEqual(dates, ["2026-07-13"])
+            self.assertEqual(prices.tolist(), [151.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
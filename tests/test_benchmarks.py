@@ -0,0 +1,65 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import gold_alert
+from benchmarks import bench_gold_alert
+
+
+class BenchmarkHarnessTests(unittest.TestCase):
+    def test_slowdowns_beyond_threshold_are_reported(self):
+        baseline = {"results": {"fast": {"median_s": 0.010}, "slow": {"median_s": 0.010}}}
+        current = {"results": {"fast": {"median_s": 0.011}, "slow": {"median_s": 0.020}, "new": {"median_s": 1.0}}}
+        regressions = bench_gold_alert.compare_results(current, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("slow:"))
+        self.assertEqual(current["results"]["fast"]["ratio"], 1.1)
+        self.assertNotIn("ratio", current["results"]["new"])
+
+    def test_timings_are_scaled_by_the_calibration_loop(self):
+        baseline = {"calibration_s": 0.01, "results": {name: {"median_s": 0.010} for name in ("same", "slow", "few")}}
+        current = {
+            "calibration_s": 0.02,
+            "results": {
+                "same": {"median_s": 0.021, "rounds": 5},
+                "slow": {"median_s": 0.030, "rounds": 5},
+                "few": {"median_s": 1.0, "rounds": 1},
+            },
+        }
+        regressions = bench_gold_alert.compare_results(current, baseline, threshold=0.25)
+        self.assertEqual([regression.split(":")[0] for regression in regressions], ["slow"])
+        self.assertEqual(current["results"]["same"]["ratio"], 1.05)
+        self.assertNotIn("ratio", current["results"]["few"])
+
+        calls = []
+        timing = bench_gold_alert.measure(lambda: calls.append(1), rounds=1)
+        self.assertEqual(timing["rounds"], bench_gold_alert.MIN_ROUNDS)
+        self.assertGreater(timing["calls"], 1)
+        self.assertGreater(len(calls), bench_gold_alert.WARMUP_ROUNDS + timing["rounds"] * timing["calls"])
+
+    def test_smtp_sink_receives_pooled_deliveries(self):
+        snapshot = bench_gold_alert.benchmark_snapshot()
+        messages = [
+            gold_alert.build_message(snapshot, "Open", "owner@example.com", f"reader{number}@example.com", mode)
+            for number, mode in enumerate(["Bilingual", "Mandarin"] * 3)
+        ]
+        with bench_gold_alert.serving(bench_gold_alert.SMTPSink()) as sink:
+            environment = {"SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(sink.server_address[1])}
+            with patch.dict(os.environ, environment):
+                results = gold_alert.deliver_messages(messages, "owner@example.com", "secret", connections=2)
+        self.assertTrue(all(result.delivered for result in results))
+        self.assertEqual(sink.messages, 6)
+
+    def test_page_server_answers_conditional_requests_with_304(self):
+        pages = {"/pm-1g": (bench_gold_alert.PERTH_MINT_PAGES / "json_ld_offer.html").read_text(encoding="utf-8")}
+        with bench_gold_alert.serving(bench_gold_alert.PageServer(pages)) as shop, \
+                patch.object(gold_alert, "_http_cache", {}), \
+                patch.object(gold_alert, "_source_health", {}):
+            url = f"http://127.0.0.1:{shop.server_address[1]}/pm-1g"
+            self.assertEqual(gold_alert.fetch_perth_mint_price(url, timeout=5), 226.48)
+            with patch.object(gold_alert, "parse_perth_mint_price", side_effect=AssertionError("parsed again")):
+                self.assertEqual(gold_alert.fetch_perth_mint_price(url, timeout=5), 226.48)
+
+
+if __name__ == "__main__":
+    unittest.main()
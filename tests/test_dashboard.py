@@ -0,0 +1,101 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import dashboard
+import gold_alert
+
+
+def passbook_lines(count, start=datetime(2026, 2, 20, 9, 0)):
+    lines = []
+    for number in range(count):
+        moment = start + timedelta(minutes=7 * number)
+        spot = 230 + (number % 17) - (number % 5) * 0.5
+        taobao = "N/A" if number % 3 else "903"
+        lines.append(f"{moment:%Y-%m-%d %H:%M},{spot},{spot * 4.8:.2f},212.5,176.0,{spot * 1.15:.2f},{taobao},")
+    return lines
+
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class DashboardTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        root = Path(self.directory.name)
+        self.passbook = root / "gold_passbook.csv"
+        self.output = root / "dashboard"
+        self.holdings = root / "my_holdings.csv"
+        self.holdings.write_text(
+            "Date,Item,Grams,Total_Paid_AUD,Source,Notes\n2026-03-10,Lingfeng 5g gold bar,5,1190,Taobao,\n",
+            encoding="utf-8",
+        )
+        self.lines = passbook_lines(6_000)
+
+    def write_passbook(self, lines):
+        self.passbook.write_text(",".join(gold_alert.PASSBOOK_COLUMNS) + "\n" + "".join(
+            line + "\n" for line in lines
+        ), encoding="utf-8")
+
+    def build(self, directory, rebuild=False):
+        return dashboard.update_dashboard(self.passbook, directory, self.holdings, rebuild=rebuild)
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        self.write_passbook(self.lines[:4_000])
+        self.assertEqual(self.build(self.output), 4_000)
+        untouched = self.output / "intraday" / "2026-02.json"
+        before = untouched.stat().st_mtime_ns
+        self.write_passbook(self.lines)
+        self.assertEqual(self.build(self.output), 2_000)
+        self.assertEqual(self.build(self.output), 0)
+        self.assertEqual(untouched.stat().st_mtime_ns, before)
+
+        full = Path(self.directory.name) / "full"
+        self.build(full, rebuild=True)
+        manifest = read_json(self.output / "manifest.json")
+        self.assertEqual(manifest, read_json(full / "manifest.json"))
+        for resolution in manifest["resolutions"].values():
+            for chunk in resolution["chunks"]:
+                self.assertEqual(read_json(self.output / chunk["path"]), read_json(full / chunk["path"]))
+
+    def test_rollups_aggregate_buckets_and_skip_missing_values(self):
+        self.write_passbook([
+            "2026-07-13 10:00,150.0,700,149,140,180.0,903,",
+            "2026-07-13 10:05,152.0,710,149,140,N/A,N/A,",
+            "2026-07-13 15:00,N/A,700,149,140,N/A,,",
+            "2026-07-14 10:00,149.0,698,148,140,181.0,,",
+        ])
+        self.build(self.output)
+        manifest = read_json(self.output / "manifest.json")
+        self.assertEqual(manifest["latest"]["spot_aud"], 149.0)
+        self.assertEqual(manifest["resolutions"]["intraday"]["chunks"][0]["points"], 2)
+
+        daily = read_json(self.output / "daily" / "2026.json")
+        self.assertEqual(daily["t"], ["2026-07-13", "2026-07-14"])
+        self.assertEqual((daily["open"][0], daily["high"][0], daily["low"][0], daily["close"][0]), (150, 152, 150, 152))
+        self.assertEqual(daily["premium_pct"][0], 20.01)
+        self.assertEqual(daily["taobao_1g_cny"], [903.0, None])
+        weekly = read_json(self.output / "weekly" / "all.json")
+        self.assertEqual((weekly["t"], weekly["low"], weekly["close"]), (["2026-07-13"], [149.0], [149.0]))
+
+        holdings = read_json(self.output / "holdings.json")
+        self.assertEqual((holdings["grams"], holdings["cost_aud"]), (5.0, 1190.0))
+        self.assertEqual(holdings["lots"], [["2026-03-10", 5.0, 1190.0, 5.0]])
+
+    def test_a_rewritten_passbook_triggers_a_rebuild(self):
+        self.write_passbook(self.lines[:100])
+        self.build(self.output)
+        self.write_passbook(self.lines[50:150])
+        self.assertEqual(self.build(self.output), 100)
+        manifest = read_json(self.output / "manifest.json")
+        self.assertEqual(manifest["source"]["points"], 100)
+        intraday = read_json(self.output / manifest["resolutions"]["intraday"]["chunks"][0]["path"])
+        self.assertEqual(intraday["t"][0], "2026-02-20 14:45")
+
+
+if __name__ == "__main__":
+    unittest.main()
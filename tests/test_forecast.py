@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import forecast
+import gold_alert
+
+
+def trending_prices(days=1_400, seed=11):
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(0, 0.01, days)
+    returns = np.zeros(days)
+    for day in range(1, days):
+        returns[day] = 0.3 * returns[day - 1] + shocks[day]
+    return 100 * np.exp(np.cumsum(returns))
+
+
+def business_dates(days):
+    return pd.bdate_range("2018-01-01", periods=days).strftime("%Y-%m-%d").tolist()
+
+
+class FeatureStoreTests(unittest.TestCase):
+    def test_features_only_use_past_prices(self):
+        prices = trending_prices(400)
+        features = forecast.compute_features(prices)
+        changed = prices.copy()
+        changed[300:] *= 1.5
+        self.assertTrue(np.array_equal(forecast.compute_features(changed)[:300], features[:300], equal_nan=True))
+        self.assertAlmostEqual(features[250, 0], np.log(prices[250] / prices[249]))
+        self.assertAlmostEqual(features[250, 5], prices[250] / prices[201:251].mean() - 1)
+        self.assertTrue(np.isnan(features[198, 6]))
+
+    def test_incremental_updates_match_a_full_rebuild_and_round_trip(self):
+        prices = trending_prices(600)
+        dates = business_dates(600)
+        store = forecast.FeatureStore()
+        self.assertEqual(store.update(dates[:500], prices[:500]), 500)
+        self.assertEqual(store.update(dates[495:], prices[495:]), 100)
+        revised = prices[590:].copy()
+        revised[0] *= 1.01
+        self.assertEqual(store.update(dates[590:], revised), 10)
+
+        expected = prices.copy()
+        expected[590] *= 1.01
+        np.testing.assert_allclose(store.features, forecast.compute_features(expected), rtol=1e-9, equal_nan=True)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "features.npz"
+            store.save(path)
+            loaded = forecast.FeatureStore.load(path)
+        self.assertEqual(loaded.dates.tolist(), dates)
+        np.testing.assert_array_equal(loaded.features, store.features)
+
+
+class WalkForwardTests(unittest.TestCase):
+    def test_training_rows_end_before_the_test_window_minus_the_horizon(self):
+        for days in forecast.HORIZONS.values():
+            for train_end, test_start, test_end in forecast.walk_forward_folds(2_000, days):
+                self.assertEqual(train_end + days, test_start)
+                self.assertLessEqual(test_end - test_start, forecast.FOLD_DAYS)
+
+    def test_parallel_training_beats_baselines_and_scores_the_latest_row(self):
+        prices = trending_prices()
+        store = forecast.FeatureStore()
+        store.update(business_dates(len(prices)), prices)
+        model = forecast.train(store, workers=2)
+
+        daily = model["horizons"]["1 day"]["evaluation"]
+        self.assertGreater(daily["folds"], 1)
+        self.assertLess(daily["model_mae_pct"], daily["no_change_mae_pct"])
+        self.assertLess(abs(daily["interval_coverage_pct"] - 80), 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "forecast_model.json"
+            forecast.save_model(model, path)
+            loaded = forecast.load_model(path)
+        ranges = forecast.score_latest(store, loaded)
+        self.assertEqual([forecast_range.horizon for forecast_range in ranges], list(forecast.HORIZONS))
+        for forecast_range in ranges:
+            self.assertLess(forecast_range.low_aud, forecast_range.expected_aud)
+            self.assertLess(forecast_range.expected_aud, forecast_range.high_aud)
+
+    def test_daily_run_scores_without_retraining(self):
+        prices = trending_prices()
+        dates = business_dates(len(prices))
+        with tempfile.TemporaryDirectory() as directory:
+            store_path = Path(directory) / "features.npz"
+            model_path = Path(directory) / "forecast_model.json"
+            self.assertEqual(forecast.daily_forecast(pd.Series(dtype=float), pd.Series(dtype=float),
+                                                     store_path=store_path, model_path=model_path), ())
+            store = forecast.FeatureStore()
+            store.update(dates[:-1], prices[:-1])
+            store.save(store_path)
+            forecast.save_model(forecast.train(store, workers=1), model_path)
+
+            index = pd.DatetimeIndex(dates[-5:])
+            gold = pd.Series(prices[-5:] * gold_alert.OUNCE_TO_GRAMS * 0.65, index=index)
+            aud_usd = pd.Series([0.65] * 5, index=index)
+            with patch.object(forecast, "fit_ridge", side_effect=AssertionError("retrained")), \
+                    patch.object(forecast, "compute_features", wraps=forecast.compute_features) as compute:
+                ranges = forecast.daily_forecast(gold, aud_usd, store_path, model_path)
+            self.assertEqual(len(compute.call_args.args[0]) - compute.call_args.args[1], 1)
+            self.assertEqual(len(ranges), len(forecast.HORIZONS))
+            self.assertEqual(forecast.FeatureStore.load(store_path).dates[-1], dates[-1])
+
+
+class ReportTests(unittest.TestCase):
+    def test_outlook_is_rendered_only_when_forecasts_exist(self):
+        snapshot = gold_alert.MarketSnapshot(
+            captured_at=pd.Timestamp("2026-07-14 10:17", tz="Australia/Perth").to_pydatetime(),
+            spot_aud=150.0, spot_cny=700.0, daily_change_pct=0.1, ma50_aud=149.0, ma200_aud=140.0,
+            pm_1g=180.0, pm_5g=800.0,
+        )
+        self.assertNotIn("OUTLOOK", gold_alert.build_plain_report(snapshot, "Open"))
+        ranged = gold_alert.MarketSnapshot(**{**snapshot.__dict__, "forecasts": (
+            gold_alert.ForecastRange("1 week", 151.0, 146.5, 155.25, 80.0, low_confidence=True),
+        )})
+        plain = gold_alert.build_plain_report(ranged, "Open")
+        self.assertIn("1 week: $151.00 AUD/g ($146.50–$155.25) — low confidence", plain)
+        self.assertIn("Outlook", gold_alert.build_html_report(ranged, "Open"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,31 @@
+import json
 import os
+import smtplib
+import subprocess
+import sys
 import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime
+from dataclasses import replace
+from datetime import datetime, timedelta
 from email import policy
+from email.message import EmailMessage
 from email.parser import BytesParser
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from zoneinfo import ZoneInfo
 
+import pandas as pd
+
 import gold_alert
 
 
 PERTH = ZoneInfo("Australia/Perth")
+PERTH_MINT_PAGES = Path(__file__).parent / "fixtures" / "perth_mint"
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("numpy", "pandas", "requests", "yfinance", "bs4")
+IMPORT_BUDGET_MICROSECONDS = 250_000
 
 
 def snapshot(spot=100.0, ma50=100.0, ma200=90.0):
@@ -62,6 +76,28 @@ class EmailTests(unittest.TestCase):
         </script>"""
         self.assertEqual(gold_alert.parse_perth_mint_price(page), 226.48)
 
+    def test_fast_perth_mint_parser_matches_beautifulsoup_on_corpus(self):
+        expected = {
+            "commented_out_schema.html": 226.10,
+            "json_ld_broken_falls_back_to_span.html": 1102.40,
+            "json_ld_list_with_foreign_offer.html": 1089.52,
+            "json_ld_offer.html": 226.48,
+            "no_price.html": None,
+            "span_with_entities.html": 228.90,
+            "span_with_nested_markup.html": 231.15,
+            "unparseable_span.html": None,
+        }
+        self.assertEqual(sorted(path.name for path in PERTH_MINT_PAGES.glob("*.html")), sorted(expected))
+        for name, price in expected.items():
+            with self.subTest(page=name):
+                page = (PERTH_MINT_PAGES / name).read_text(encoding="utf-8")
+                fast = gold_alert.parse_perth_mint_price_fast(page)
+                self.assertEqual(gold_alert.parse_perth_mint_price_soup(page), price)
+                self.assertEqual(gold_alert.parse_perth_mint_price(page), price)
+                self.assertIn(fast, {price, None})
+                if name != "span_with_nested_markup.html":
+                    self.assertEqual(fast, price)
+
     def test_message_contains_plain_text_and_html(self):
         message = gold_alert.build_message(
             snapshot(), "Open — Mon–Fri 9am–5pm", "sender@example.com", "reader@example.com"
@@ -73,6 +109,21 @@ class EmailTests(unittest.TestCase):
             "multipart/alternative", "text/plain", "text/html"
         })
 
+    def test_sections_render_once_for_many_recipients(self):
+        gold_alert.clear_render_cache()
+        market = snapshot(spot=95)
+        with patch.object(gold_alert, "get_signal", wraps=gold_alert.get_signal) as signal:
+            messages = [
+                gold_alert.build_message(market, "Open", "sender@example.com", f"reader{number}@example.com",
+                                         "Mandarin" if number % 2 else "Bilingual")
+                for number in range(20)
+            ]
+        self.assertEqual(signal.call_count, 1)
+        self.assertEqual(gold_alert.build_chinese_summary.cache_info().misses, 1)
+        self.assertEqual(gold_alert.build_html_report.cache_info().misses, 1)
+        self.assertEqual(messages[3]["To"], "reader3@example.com")
+        self.assertIn("买入区间", messages[3]["Subject"])
+
     def test_missing_secrets_raise_clear_error(self):
         with patch.dict(os.environ, {}, clear=True):
             with self.assertRaisesRegex(RuntimeError, "GMAIL_ADDRESS, GMAIL_APP_PASSWORD"):
@@ -82,14 +133,87 @@ class EmailTests(unittest.TestCase):
         page = '<a href="item.htm?id=992105119294&amp;price=909&amp;sourceType=item">item</a>'
         self.assertEqual(gold_alert.parse_taobao_share_price(page), 909.0)
 
-    @patch("gold_alert.requests.get")
-    def test_fetch_taobao_visible_price_requests_and_parses_share_page(self, mock_get):
-        response = mock_get.return_value
+    @patch.object(gold_alert, "_http_cache", {})
+    @patch.object(gold_alert, "_source_health", {})
+    @patch("gold_alert.get_http_session")
+    def test_fetch_taobao_visible_price_requests_and_parses_share_page(self, mock_session):
+        response = mock_session.return_value.get.return_value
+        response.status_code = 200
+        response.headers = {}
         response.text = '<a href="item.htm?id=992105119294&amp;price=909&amp;sourceType=item">item</a>'
 
         self.assertEqual(gold_alert.fetch_taobao_visible_price("https://e.tb.cn/example"), 909.0)
         response.raise_for_status.assert_called_once_with()
-        mock_get.assert_called_once()
+        mock_session.return_value.get.assert_called_once()
+
+    @patch.object(gold_alert, "_http_cache", {})
+    @patch.object(gold_alert, "_source_health", {})
+    @patch("gold_alert.get_http_session")
+    def test_not_modified_page_reuses_cached_price_without_parsing(self, mock_session):
+        changed = MagicMock(status_code=200, headers={"ETag": '"v1"'}, text="<span class=\"price\">$120.50</span>")
+        unchanged = MagicMock(status_code=304, headers={})
+        mock_session.return_value.get.side_effect = [changed, unchanged]
+        parser = MagicMock(return_value=120.5)
+
+        url = "https://www.perthmint.com/example"
+        self.assertEqual(gold_alert.fetch_page_price(url, parser, {}, 5), 120.5)
+        self.assertEqual(gold_alert.fetch_page_price(url, parser, {}, 5), 120.5)
+        parser.assert_called_once()
+        second_headers = mock_session.return_value.get.call_args_list[1].kwargs["headers"]
+        self.assertEqual(second_headers["If-None-Match"], '"v1"')
+
+    def test_http_cache_round_trips_validators(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "http_cache.json"
+            entry = {"etag": '"v1"', "last_modified": None, "price": 120.5}
+            with patch.object(gold_alert, "_http_cache", {"https://example.com": entry}):
+                gold_alert.save_http_cache(path)
+            with patch.object(gold_alert, "_http_cache", None):
+                self.assertEqual(gold_alert.load_http_cache(path), {"https://example.com": entry})
+
+    @patch.object(gold_alert, "_http_cache", {})
+    @patch.object(gold_alert, "_source_health", {})
+    @patch("gold_alert.get_http_session")
+    def test_failing_source_opens_circuit_until_probe_succeeds(self, mock_session):
+        import requests
+
+        page = MagicMock(status_code=200, headers={}, text="page", content=b"page")
+        mock_session.return_value.get.side_effect = [requests.Timeout()] * 3 + [requests.ConnectionError(), page]
+        url = "https://e.tb.cn/example"
+        clock = [1_000_000.0]
+        with patch("gold_alert.time.time", side_effect=lambda: clock[0]):
+            for _ in range(3):
+                self.assertIsNone(gold_alert.fetch_page_price(url, lambda text: 909.0, {}, 20))
+            self.assertIsNone(gold_alert.fetch_page_price(url, lambda text: 909.0, {}, 20))
+            self.assertEqual(mock_session.return_value.get.call_count, 3)
+
+            health = gold_alert.source_health("e.tb.cn")
+            self.assertEqual(health.state(clock[0]), "open")
+            clock[0] += gold_alert.CIRCUIT_COOLDOWN_SECONDS
+            self.assertIsNone(gold_alert.fetch_page_price(url, lambda text: 909.0, {}, 20))
+            self.assertEqual(health.state(clock[0]), "open")
+            clock[0] += gold_alert.CIRCUIT_COOLDOWN_SECONDS
+            self.assertEqual(gold_alert.fetch_page_price(url, lambda text: 909.0, {}, 20), 909.0)
+        self.assertEqual(health.state(clock[0]), "closed")
+        self.assertEqual((health.failures, health.successes, health.consecutive_failures), (4, 1, 0))
+
+    def test_timeout_follows_observed_p95_latency(self):
+        health = gold_alert.SourceHealth(latencies=[0.5] * 3)
+        self.assertEqual(health.timeout(15.0), 15.0)
+        health = gold_alert.SourceHealth(latencies=[0.5] * 18 + [2.0, 4.0])
+        self.assertEqual(health.percentile(95), 2.0)
+        self.assertEqual(health.timeout(15.0), 4.0)
+        self.assertEqual(health.timeout(3.5), 3.5)
+        fast = gold_alert.SourceHealth(latencies=[0.1] * 10)
+        self.assertEqual(fast.timeout(15.0), gold_alert.MIN_FETCH_TIMEOUT_SECONDS)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "source_health.json"
+            with patch.object(gold_alert, "_source_health", {"www.perthmint.com": health}):
+                gold_alert.save_source_health(path)
+            with patch.object(gold_alert, "_source_health", None):
+                loaded = gold_alert.load_source_health(path)["www.perthmint.com"]
+        self.assertEqual(loaded.to_dict(), health.to_dict())
 
     def test_taobao_price_includes_currency_conversion_and_premium(self):
         text = gold_alert.taobao_price_text(500, 1, snapshot(spot=100))
@@ -136,6 +260,443 @@ class EmailTests(unittest.TestCase):
         self.assertNotIn("Public share page", report)
 
 
+def history(closes, end="2026-07-14"):
+    index = pd.bdate_range(end=end, periods=len(closes), tz="America/New_York")
+    return pd.DataFrame({"Close": closes}, index=index)
+
+
+class FetchTests(unittest.TestCase):
+    def test_sources_run_in_parallel_and_slow_source_times_out(self):
+        release = threading.Event()
+        jobs = {
+            "fast": (lambda: 1.0, 5),
+            "slow": (lambda: release.wait(5) and 2.0, 0.2),
+            "broken": (lambda: 1 / 0, 5),
+        }
+        started = time.monotonic()
+        try:
+            results = gold_alert.fetch_sources(jobs, deadline=5)
+        finally:
+            release.set()
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(results["fast"], 1.0)
+        self.assertIsInstance(results["slow"], TimeoutError)
+        self.assertIsInstance(results["broken"], ZeroDivisionError)
+        self.assertIsNone(gold_alert.optional_result(results, "slow"))
+        with self.assertRaisesRegex(RuntimeError, "slow did not respond"):
+            gold_alert.required_result(results, "slow")
+
+    def test_snapshot_is_built_from_sources_that_arrived(self):
+        def fake_history(symbol, period, refresh=False):
+            return {"GC=F": history([3000.0] * 199 + [3100.0]), "AUDUSD=X": history([0.65]),
+                    "CNY=X": history([7.2])}[symbol]
+
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(gold_alert, "MA_STATE_PATH", Path(directory) / "moving_averages.json"), \
+                patch.object(gold_alert, "fetch_history", side_effect=fake_history), \
+                patch.object(gold_alert, "fetch_perth_mint_price", side_effect=[None, 560.0]), \
+                patch.object(gold_alert, "fetch_taobao_visible_price", return_value=909.0), \
+                patch.object(gold_alert, "load_taobao_app_prices", return_value=(None, None, None, "")), \
+                patch.object(gold_alert, "load_portfolio", return_value=(5.0, 1190.0)), \
+                patch.object(gold_alert, "latest_forecasts", return_value=()) as forecasts:
+            market = gold_alert.collect_snapshot(datetime(2026, 7, 14, 10, tzinfo=PERTH))
+        self.assertEqual(forecasts.call_args.args[1].iloc[-1], 0.65)
+        self.assertAlmostEqual(market.spot_aud, 3100 / gold_alert.OUNCE_TO_GRAMS / 0.65)
+        self.assertAlmostEqual(market.ma200_aud, 3000.5 / gold_alert.OUNCE_TO_GRAMS / 0.65)
+        self.assertEqual({market.pm_1g, market.pm_5g}, {None, 560.0})
+        self.assertEqual(market.taobao_1g_cny, 909.0)
+        self.assertEqual(market.taobao_5g_cny, 909.0 * 5)
+
+
+class WatchlistTests(unittest.TestCase):
+    def test_watchlist_file_is_loaded_and_validated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "watchlist.csv"
+            path.write_text(
+                "Product_ID,Retailer,Grams,Purity,Currency,URL,Label\n"
+                "pm_1oz,perth_mint,31.1035,0.9999,AUD,https://www.perthmint.com/1oz,1oz cast bar\n",
+                encoding="utf-8",
+            )
+            items = gold_alert.load_watchlist(path)
+            self.assertEqual(items[0].grams, 31.1035)
+            self.assertEqual(items[0].label, "1oz cast bar")
+            path.write_text(path.read_text(encoding="utf-8") + "pm_1oz,taobao,1,1,AUD,https://x,x\n", encoding="utf-8")
+            with self.assertRaisesRegex(RuntimeError, "line 3"):
+                gold_alert.load_watchlist(path)
+
+    def test_token_bucket_spaces_requests_and_respects_deadline(self):
+        bucket = gold_alert.TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        self.assertTrue(bucket.acquire(started + 5))
+        self.assertTrue(bucket.acquire(started + 5))
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertFalse(bucket.acquire(time.monotonic()))
+
+    def test_watchlist_fetch_uses_bounded_pool_and_batch_premiums(self):
+        items = [
+            gold_alert.WatchlistItem(f"pm_{grams}g", "perth_mint", grams, 0.9999, "AUD",
+                                     f"https://shop{grams}.example/bar", f"{grams}g bar")
+            for grams in range(1, 21)
+        ] + [gold_alert.WatchlistItem("tb_1g", "taobao", 1, 1.0, "CNY", "https://tb.example/1g", "Seller 1g")]
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_fetch(item, timeout):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return None if item.product_id == "pm_20g" else item.grams * (110.0 if item.currency == "AUD" else 550.0)
+
+        with patch.object(gold_alert, "fetch_retail_price", side_effect=fake_fetch):
+            prices = gold_alert.fetch_watchlist(items, deadline=5, workers=4)
+        self.assertLessEqual(peak[0], 4)
+        quotes = gold_alert.price_quotes(items, prices, spot_aud=100.0, spot_cny=500.0)
+        self.assertAlmostEqual(quotes[0].premium_pct, (110 / 0.9999 / 100 - 1) * 100)
+        self.assertEqual(quotes[19].price, None)
+        self.assertAlmostEqual(quotes[-1].premium_pct, 10.0)
+
+    def test_premium_and_deadline_follow_the_watchlist(self):
+        import alert_rules
+
+        market = snapshot()
+        quote = gold_alert.price_quotes(gold_alert.DEFAULT_WATCHLIST[:1], {"pm_1g": market.pm_1g}, market.spot_aud,
+                                        market.spot_cny)[0]
+        columns = alert_rules.snapshot_columns(market, {"captured_at": []})
+        rule_value = alert_rules.field_matrix(columns)[alert_rules.FIELD_INDEX["pm_1g_premium_pct"], -1]
+        self.assertAlmostEqual(rule_value, quote.premium_pct)
+        self.assertIn(f"{gold_alert.premium_pct(903.0, 1, market.spot_cny):+.1f}% premium",
+                      gold_alert.taobao_price_text(903.0, 1, market))
+
+        def items(count):
+            return [gold_alert.WatchlistItem(f"pm_{number}", "perth_mint", 1, 0.9999, "AUD",
+                                             f"https://shop.example/{number}", "bar") for number in range(count)]
+
+        self.assertEqual(gold_alert.watchlist_deadline(items(3)), gold_alert.FETCH_DEADLINE_SECONDS)
+        self.assertEqual(gold_alert.watchlist_deadline(items(204)), 100 + gold_alert.TAOBAO_TIMEOUT_SECONDS)
+        self.assertEqual(gold_alert.watchlist_deadline(items(5_000)), gold_alert.WATCHLIST_MAX_DEADLINE_SECONDS)
+
+    def test_reports_render_every_watched_product(self):
+        items = [
+            gold_alert.WatchlistItem("pm_1oz", "perth_mint", 31.1, 1.0, "AUD", "https://pm.example/1oz", "1oz coin",
+                                     "1盎司金币"),
+            gold_alert.WatchlistItem("tb_2g", "taobao", 2, 1.0, "CNY", "https://tb.example/2g", "Seller 2g bar"),
+        ]
+        market = gold_alert.MarketSnapshot(**{
+            **snapshot().__dict__,
+            "quotes": gold_alert.price_quotes(items, {"pm_1oz": 3421.0, "tb_2g": 1100.0}, 100.0, 500.0),
+        })
+        plain = gold_alert.build_plain_report(market, "Open")
+        self.assertIn("1oz coin: $3,421.00 AUD (+10.0% premium) — https://pm.example/1oz", plain)
+        self.assertIn("Seller 2g bar: ¥1,100.00 / A$220.00 (+10.0% premium)", plain)
+        self.assertIn("1盎司金币：$3,421.00 AUD", plain)
+        self.assertNotIn(gold_alert.PM_5G_URL, plain)
+        self.assertIn("https://tb.example/2g", gold_alert.build_html_report(market, "Open"))
+
+
+class HistoryCacheTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache_patch = patch.object(gold_alert, "HISTORY_CACHE_DIR", Path(directory.name))
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        today = pd.Timestamp.now(tz="America/New_York").normalize()
+        self.full = history([float(value) for value in range(260)], end=today - pd.Timedelta(days=1))
+        self.delta = pd.concat([self.full.tail(2), pd.DataFrame({"Close": [999.0]}, index=[today])])
+
+    def fake_ticker(self):
+        ticker = MagicMock()
+        ticker.history.side_effect = lambda **kwargs: self.delta if "start" in kwargs else self.full
+        return patch("yfinance.Ticker", return_value=ticker), ticker
+
+    def test_second_run_fetches_only_the_missing_delta(self):
+        ticker_patch, ticker = self.fake_ticker()
+        with ticker_patch:
+            first = gold_alert.fetch_history("GC=F", "1y")
+            second = gold_alert.fetch_history("GC=F", "1y")
+        self.assertEqual(len(first), len(self.full))
+        self.assertEqual(second["Close"].iloc[-1], 999.0)
+        self.assertEqual(second["Close"].iloc[-2], first["Close"].iloc[-1])
+        self.assertFalse(second.index.has_duplicates)
+        self.assertIn("period", ticker.history.call_args_list[0].kwargs)
+        self.assertIn("start", ticker.history.call_args_list[1].kwargs)
+
+    def test_corrupted_cache_and_forced_refresh_download_the_full_window(self):
+        ticker_patch, ticker = self.fake_ticker()
+        with ticker_patch:
+            gold_alert.fetch_history("GC=F", "1y")
+            data_path, _ = gold_alert.history_cache_paths("GC=F")
+            data_path.write_text(data_path.read_text(encoding="utf-8").replace("259.0", "1.0"), encoding="utf-8")
+            self.assertIsNone(gold_alert.load_cached_history("GC=F"))
+            gold_alert.fetch_history("GC=F", "1y")
+            gold_alert.fetch_history("GC=F", "1y", refresh=True)
+        self.assertEqual(["period" in call.kwargs for call in ticker.history.call_args_list], [True, True, True])
+
+    def test_cache_is_used_when_yahoo_returns_nothing_new(self):
+        ticker_patch, _ = self.fake_ticker()
+        with ticker_patch:
+            gold_alert.fetch_history("GC=F", "1y")
+            self.delta = pd.DataFrame()
+            cached = gold_alert.fetch_history("GC=F", "1y")
+        self.assertEqual(cached["Close"].tolist(), self.full["Close"].tolist())
+
+    def test_old_cache_is_rejected_when_the_delta_fails(self):
+        self.full = history([float(value) for value in range(260)], end=self.full.index[-1] - pd.Timedelta(days=9))
+        ticker_patch, ticker = self.fake_ticker()
+        with ticker_patch:
+            gold_alert.fetch_history("GC=F", "1y")
+            ticker.history.side_effect = ConnectionError("Yahoo unavailable")
+            with self.assertRaisesRegex(RuntimeError, "No recent market data for GC=F"):
+                gold_alert.fetch_history("GC=F", "1y")
+            ticker.history.side_effect = None
+            ticker.history.return_value = pd.DataFrame()
+            with self.assertRaisesRegex(RuntimeError, "cached history ends"):
+                gold_alert.fetch_history("GC=F", "1y")
+
+    def test_unchanged_cache_files_are_served_from_memory(self):
+        ticker_patch, _ = self.fake_ticker()
+        with ticker_patch:
+            stored = gold_alert.fetch_history("GC=F", "1y")
+        with patch("pandas.read_csv", side_effect=AssertionError("cache file was parsed again")):
+            self.assertIs(gold_alert.load_cached_history("GC=F"), stored)
+        data_path, _ = gold_alert.history_cache_paths("GC=F")
+        data_path.write_text(data_path.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+        self.assertIsNone(gold_alert.load_cached_history("GC=F"))
+
+
+class MovingAverageTests(unittest.TestCase):
+    def test_rolling_means_match_full_recomputation(self):
+        closes = [float((value * 37) % 101) for value in range(300)]
+        engine = gold_alert.RollingMeans((3, 50, 200))
+        for day, close in enumerate(closes):
+            engine.push(f"{day:04d}", close)
+            for window in engine.windows:
+                expected = sum(closes[day + 1 - window:day + 1]) / window if day + 1 >= window else None
+                self.assertAlmostEqual(engine.mean(window), expected)
+        engine.push("0299", 500.0)
+        self.assertAlmostEqual(engine.mean(3), (closes[297] + closes[298] + 500.0) / 3)
+
+    def test_saved_state_is_updated_with_new_bars_only(self):
+        closes = history([float(value) for value in range(260)])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "moving_averages.json"
+            gold_alert.update_moving_averages(closes.iloc[:-5]["Close"], path)
+            engine = gold_alert.update_moving_averages(closes["Close"], path)
+        self.assertEqual(engine.last_key, closes.index[-1].strftime("%Y-%m-%d"))
+        self.assertAlmostEqual(engine.mean(50), closes["Close"].tail(50).mean())
+        self.assertAlmostEqual(engine.mean(200), closes["Close"].tail(200).mean())
+
+    def test_revised_overlapping_bars_rebuild_the_saved_state(self):
+        closes = history([float(value) for value in range(260)])["Close"]
+        revised = closes.copy()
+        revised.iloc[-8] += 40.0
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "moving_averages.json"
+            gold_alert.update_moving_averages(closes.iloc[:-5], path)
+            engine = gold_alert.update_moving_averages(revised, path)
+        self.assertAlmostEqual(engine.mean(50), revised.tail(50).mean())
+        self.assertAlmostEqual(engine.mean(200), revised.tail(200).mean())
+
+    def test_passbook_replay_keeps_the_last_spot_each_day(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "gold_passbook.csv"
+            path.write_text(
+                "Date,Spot_AUD_g\n2026-07-14 10:00,100\n2026-07-14 15:00,102\n2026-07-15 10:00,104\n",
+                encoding="utf-8",
+            )
+            engine = gold_alert.replay_passbook(path, windows=(2,))
+        self.assertEqual(engine.mean(2), 103.0)
+
+
+class FakeSMTP:
+    sessions = []
+    delivered = []
+    failures = {}
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.open = True
+        with self.lock:
+            self.sessions.append(self)
+
+    def login(self, sender, password):
+        with self.lock:
+            failure = self.failures.get(f"login:{sender}", [])
+            error = failure.pop(0) if failure else None
+        if error:
+            raise error
+        self.login_as = sender
+
+    def send_message(self, message):
+        with self.lock:
+            failure = self.failures.get(message["To"], [])
+            error = failure.pop(0) if failure else None
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            self.open = False
+        if error:
+            raise error
+        with self.lock:
+            self.delivered.append(message["To"])
+
+    def quit(self):
+        self.open = False
+
+
+class DeliveryTests(unittest.TestCase):
+    def setUp(self):
+        FakeSMTP.sessions, FakeSMTP.delivered = [], []
+        FakeSMTP.failures = {
+            "dropped@example.com": [smtplib.SMTPServerDisconnected("connection lost")],
+            "busy@example.com": [smtplib.SMTPResponseException(451, b"try again later")],
+            "gone@example.com": [smtplib.SMTPResponseException(550, b"no such user")] * 3,
+        }
+        backoff = patch.object(gold_alert, "SMTP_BACKOFF_SECONDS", 0)
+        backoff.start()
+        self.addCleanup(backoff.stop)
+
+    def messages(self, addresses):
+        messages = []
+        for address in addresses:
+            message = EmailMessage()
+            message["To"] = address
+            message.set_content("report")
+            messages.append(message)
+        return messages
+
+    def test_pool_reconnects_and_retries_temporary_failures(self):
+        addresses = [f"reader{number}@example.com" for number in range(40)]
+        addresses += ["dropped@example.com", "busy@example.com", "gone@example.com"]
+        results = gold_alert.deliver_messages(
+            self.messages(addresses), "sender@example.com", "secret", connections=3, smtp_factory=FakeSMTP,
+        )
+        by_recipient = {result.recipient: result for result in results}
+        self.assertEqual(len(FakeSMTP.delivered), 42)
+        self.assertEqual(by_recipient["dropped@example.com"].attempts, 2)
+        self.assertEqual(by_recipient["busy@example.com"].attempts, 2)
+        self.assertFalse(by_recipient["gone@example.com"].delivered)
+        self.assertEqual(by_recipient["gone@example.com"].attempts, 1)
+        self.assertIn("550", by_recipient["gone@example.com"].error)
+        self.assertLessEqual(len(FakeSMTP.sessions), 4)
+        self.assertGreaterEqual(len(FakeSMTP.sessions), 2)
+        self.assertFalse(any(session.open for session in FakeSMTP.sessions))
+        self.assertIn("Delivered 42/43", gold_alert.delivery_summary(results, 1.0))
+
+    def test_failed_connections_are_closed_and_unexpected_errors_stay_per_message(self):
+        FakeSMTP.failures.update({
+            "login:sender@example.com": [smtplib.SMTPResponseException(454, b"try again")],
+            "closing@example.com": [smtplib.SMTPResponseException(421, b"closing")],
+            "broken@example.com": [ValueError("bad header")],
+        })
+        addresses = [f"reader{number}@example.com" for number in range(10)]
+        addresses += ["closing@example.com", "broken@example.com"]
+        results = gold_alert.deliver_messages(
+            self.messages(addresses), "sender@example.com", "secret", connections=3, smtp_factory=FakeSMTP,
+        )
+        by_recipient = {result.recipient: result for result in results}
+        self.assertEqual(len(FakeSMTP.delivered), 11)
+        self.assertEqual(by_recipient["closing@example.com"].attempts, 2)
+        self.assertFalse(by_recipient["broken@example.com"].delivered)
+        self.assertEqual(by_recipient["broken@example.com"].error, "ValueError: bad header")
+        self.assertEqual(len([session for session in FakeSMTP.sessions if not hasattr(session, "login_as")]), 1)
+        self.assertFalse(any(session.open for session in FakeSMTP.sessions))
+
+    def test_distribution_list_is_read_from_environment_and_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "recipients.csv"
+            path.write_text("Email,Mode\nfamily@example.com,Mandarin\nowner@example.com,\n", encoding="utf-8")
+            environment = {
+                "GMAIL_ADDRESS": "owner@example.com",
+                "GMAIL_APP_PASSWORD": "app pass",
+                "REPORT_RECIPIENTS": "a@example.com, b@example.com:mandarin",
+                "REPORT_RECIPIENTS_FILE": str(path),
+            }
+            with patch.dict(os.environ, environment, clear=True):
+                _, password, recipients = gold_alert.get_email_settings()
+        self.assertEqual(password, "apppass")
+        self.assertEqual(recipients, [
+            ("owner@example.com", "Bilingual"), ("a@example.com", "Bilingual"),
+            ("b@example.com", "Mandarin"), ("family@example.com", "Mandarin"),
+        ])
+
+
+class OutboxTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.outbox = Path(directory.name) / "outbox"
+        self.ledger = Path(directory.name) / "delivery_ledger.jsonl"
+        for name, value in {
+            "OUTBOX_DIR": self.outbox, "DELIVERY_LEDGER_PATH": self.ledger,
+            "open_smtp": FakeSMTP, "SMTP_BACKOFF_SECONDS": 0,
+        }.items():
+            patcher = patch.object(gold_alert, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        FakeSMTP.sessions, FakeSMTP.delivered = [], []
+        FakeSMTP.failures = {"gone@example.com": [smtplib.SMTPResponseException(550, b"no such user")]}
+        self.recipients = [("owner@example.com", "Bilingual"), ("gone@example.com", "Mandarin")]
+
+    def test_retries_send_only_pending_messages_once(self):
+        market = snapshot()
+        self.assertEqual(gold_alert.enqueue_reports(market, "Open", "owner@example.com", self.recipients), 2)
+        self.assertEqual(gold_alert.enqueue_reports(market, "Open", "owner@example.com", self.recipients), 0)
+        with self.assertRaisesRegex(RuntimeError, "1 of 2 email report"):
+            gold_alert.deliver_outbox("owner@example.com", "secret")
+        self.assertEqual(FakeSMTP.delivered, ["owner@example.com"])
+        self.assertEqual(len(list(self.outbox.glob("*.eml"))), 1)
+
+        self.assertEqual(gold_alert.enqueue_reports(market, "Open", "owner@example.com", self.recipients), 0)
+        self.assertEqual(gold_alert.deliver_outbox("owner@example.com", "secret"), 1)
+        self.assertEqual(FakeSMTP.delivered, ["owner@example.com", "gone@example.com"])
+        self.assertEqual(list(self.outbox.glob("*.eml")), [])
+        self.assertEqual(gold_alert.deliver_outbox("owner@example.com", "secret"), 0)
+        self.assertEqual(
+            gold_alert.load_delivered_keys(),
+            {gold_alert.idempotency_key(market, address, mode) for address, mode in self.recipients},
+        )
+
+    def test_run_sends_queued_reports_when_the_passbook_fails(self):
+        args = MagicMock(drain_outbox=False, refresh_history=False, timing_footer=False)
+        settings = ("owner@example.com", "secret", self.recipients[:1])
+        with (
+            patch.object(gold_alert, "get_email_settings", return_value=settings),
+            patch.object(gold_alert, "collect_snapshot", return_value=snapshot()),
+            patch.object(gold_alert, "save_http_cache"),
+            patch.object(gold_alert, "save_source_health"),
+            patch.object(gold_alert, "queue_rule_alerts", return_value=0),
+            patch.object(gold_alert, "queue_user_reports", return_value=0),
+            patch.object(gold_alert, "append_passbook", side_effect=RuntimeError("header mismatch")),
+            patch("builtins.print"),
+        ):
+            with self.assertRaisesRegex(RuntimeError, "header mismatch"):
+                gold_alert.run_pipeline(args, None)
+        self.assertEqual(FakeSMTP.delivered, ["owner@example.com"])
+        self.assertEqual(list(self.outbox.glob("*.eml")), [])
+
+    def test_messages_sent_before_a_crash_are_not_sent_again(self):
+        recipients = [(f"reader{number}@example.com", "Bilingual") for number in range(6)]
+        FakeSMTP.failures = {"reader3@example.com": [KeyboardInterrupt()]}
+        gold_alert.enqueue_reports(snapshot(), "Open", "owner@example.com", recipients)
+        with self.assertRaises(KeyboardInterrupt):
+            gold_alert.deliver_outbox("owner@example.com", "secret")
+        sent = list(FakeSMTP.delivered)
+        self.assertEqual(len(list(self.outbox.glob("*.eml"))), len(recipients) - len(sent))
+        self.assertEqual(len(gold_alert.load_delivered_keys()), len(sent))
+
+        gold_alert.deliver_outbox("owner@example.com", "secret")
+        self.assertEqual(sorted(FakeSMTP.delivered), sorted(address for address, _ in recipients))
+
+    def test_queued_message_keeps_its_content_and_key(self):
+        market = snapshot()
+        gold_alert.enqueue_reports(market, "Open", "owner@example.com", self.recipients[:1])
+        key = gold_alert.idempotency_key(market, "owner@example.com", "Bilingual")
+        parsed = BytesParser(policy=policy.default).parsebytes((self.outbox / f"{key}.eml").read_bytes())
+        self.assertEqual(parsed["Message-ID"], f"<{key}@gold-price-tracker>")
+        self.assertIn("Gold WAIT", parsed["Subject"])
+
+
 class PassbookTests(unittest.TestCase):
     def test_append_creates_one_header_and_multiple_rows(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -150,6 +711,32 @@ class PassbookTests(unittest.TestCase):
                 "Date,Spot_AUD_g,Spot_CNY_g,MA50_AUD,MA200_AUD,Est_Shop_AUD,Taobao_1g_CNY,Taobao_5g_CNY",
             )
 
+    def test_append_writes_only_the_new_row(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "gold_passbook.csv"
+            existing = (
+                "Date,Spot_AUD_g,Spot_CNY_g,MA50_AUD,MA200_AUD,Est_Shop_AUD,Taobao_1g_CNY,Taobao_5g_CNY\n"
+                "2026-02-20 17:49,231.22,1129.91,212.22,176.57,265.9,,"
+            )
+            path.write_text(existing, encoding="utf-8")
+            gold_alert.append_passbook(snapshot(), path)
+            self.assertEqual(
+                path.read_text(encoding="utf-8"),
+                existing + "\n2026-07-14 10:17,100.0,500.0,100.0,90.0,120.0,N/A,N/A\n",
+            )
+
+    def test_old_header_requires_explicit_compaction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "gold_passbook.csv"
+            path.write_text("Date,Spot_AUD_g,MA50_AUD\n2026-02-20 17:49,231.22,212.22\n", encoding="utf-8")
+            with self.assertRaisesRegex(RuntimeError, "--compact-passbook"):
+                gold_alert.append_passbook(snapshot(), path)
+            self.assertEqual(gold_alert.compact_passbook(path), 1)
+            gold_alert.append_passbook(snapshot(), path)
+            lines = path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(lines[0], ",".join(gold_alert.PASSBOOK_COLUMNS))
+            self.assertEqual(lines[1], "2026-02-20 17:49,231.22,,212.22,,,,")
+
     def test_portfolio_uses_per_gram_purchase_price(self):
         with tempfile.TemporaryDirectory() as directory:
             path = Path(directory) / "holdings.csv"
@@ -171,6 +758,171 @@ class PassbookTests(unittest.TestCase):
             self.assertEqual(grams, 7)
             self.assertEqual(cost, 1690)
 
+    def test_oversold_ledger_leaves_holdings_out_of_the_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "holdings.csv"
+            path.write_text(
+                "Date,Item,Grams,Total_Paid_AUD,Source,Notes\n"
+                "2026-03-10,Gold bar,5,1190,Taobao,\n"
+                "2026-04-01,Gold bar,-6,1500,Other,\n",
+                encoding="utf-8",
+            )
+            with patch("builtins.print") as printed:
+                fields = gold_alert.portfolio_fields(path)
+        self.assertFalse(fields["portfolio_available"])
+        self.assertIn("exceeds the 5g held", printed.call_args.args[0])
+
+        market = replace(snapshot(), **fields)
+        self.assertNotIn("Gold:", gold_alert.build_plain_report(market, "Open"))
+        self.assertNotIn("Your holdings", gold_alert.build_html_report(market, "Open"))
+        self.assertNotIn("持仓", gold_alert.build_chinese_summary(market, "Open"))
+        self.assertIn("Your holdings", gold_alert.build_html_report(snapshot(), "Open"))
+
+
+class RunMetricsTests(unittest.TestCase):
+    def tearDown(self):
+        gold_alert._run_metrics = None
+
+    def test_stages_are_not_recorded_unless_enabled(self):
+        self.assertIs(gold_alert.stage("fetch example.com"), gold_alert.NULL_SPAN)
+        self.assertIsNone(gold_alert.finish_run_metrics())
+
+    @patch.object(gold_alert, "_http_cache", {})
+    @patch.object(gold_alert, "_source_health", {})
+    @patch("gold_alert.get_http_session")
+    def test_metrics_file_records_bytes_outcomes_and_retries(self, mock_session):
+        changed = MagicMock(status_code=200, headers={"ETag": '"v1"', "Content-Length": "700"}, text="page",
+                            content=b"x" * 2048)
+        unchanged = MagicMock(status_code=304, headers={}, content=b"")
+        mock_session.return_value.get.side_effect = [changed, unchanged]
+        FakeSMTP.sessions, FakeSMTP.delivered = [], []
+        FakeSMTP.failures = {"busy@example.com": [smtplib.SMTPResponseException(451, b"try again later")]}
+        message = EmailMessage()
+        message["To"] = "busy@example.com"
+        message.set_content("report")
+
+        gold_alert.start_run_metrics()
+        with patch.object(gold_alert, "SMTP_BACKOFF_SECONDS", 0):
+            for _ in range(2):
+                gold_alert.fetch_page_price("https://www.perthmint.com/example", lambda page: 120.5, {}, 5)
+            gold_alert.deliver_messages([message], "sender@example.com", "", smtp_factory=FakeSMTP)
+        with self.assertRaises(RuntimeError), gold_alert.stage("append_passbook"):
+            raise RuntimeError("disk full")
+        with tempfile.TemporaryDirectory() as directory:
+            path = gold_alert.finish_run_metrics(Path(directory) / "gold_run_metrics.json")
+            stages = json.loads(path.read_text(encoding="utf-8"))["stages"]
+
+        fetch = stages["fetch www.perthmint.com"]
+        self.assertEqual(fetch["count"], 2)
+        self.assertEqual(fetch["bytes"], 700)
+        self.assertNotIn("bytes", stages["smtp send"])
+        self.assertEqual(fetch["outcomes"], {"ok": 1, "not_modified": 1})
+        self.assertEqual(stages["smtp send"]["retries"], 1)
+        self.assertEqual(stages["smtp send"]["outcomes"], {"delivered": 1})
+        self.assertEqual(stages["append_passbook"]["outcomes"], {"RuntimeError": 1})
+        self.assertIs(gold_alert.stage("fetch example.com"), gold_alert.NULL_SPAN)
+
+    def test_source_timing_footer_is_optional(self):
+        plain = gold_alert.build_plain_report(snapshot(), "Open", False)
+        self.assertNotIn("SOURCE TIMING", plain)
+
+        timed = replace(snapshot(), source_timings=(("history GC=F", 0.4213, "delta"),))
+        self.assertIn("SOURCE TIMING\nhistory GC=F: 0.42s (delta)", gold_alert.build_plain_report(timed, "Open"))
+        self.assertIn("Source timing: history GC=F: 0.42s (delta)", gold_alert.build_html_report(timed, "Open"))
+
+
+class DaemonTests(unittest.TestCase):
+    def test_cycles_run_only_at_report_times_on_trading_days(self):
+        saturday_close = datetime(2026, 7, 18, 16, 0, tzinfo=PERTH)
+        self.assertEqual(gold_alert.next_cycle_at(saturday_close), datetime(2026, 7, 20, 10, 0, tzinfo=PERTH))
+        before_good_friday = datetime(2026, 4, 2, 15, 0, tzinfo=PERTH)
+        self.assertEqual(gold_alert.next_cycle_at(before_good_friday), datetime(2026, 4, 4, 10, 0, tzinfo=PERTH))
+
+    def test_restart_catches_up_a_recent_slot_but_never_repeats_one(self):
+        now = datetime(2026, 7, 14, 10, 20, tzinfo=PERTH)
+        missed = datetime(2026, 7, 14, 10, 0, tzinfo=PERTH)
+        self.assertEqual(gold_alert.daemon_wake_time(now, datetime(2026, 7, 13, 15, 0, tzinfo=PERTH)), missed)
+        self.assertEqual(gold_alert.daemon_wake_time(now, missed), datetime(2026, 7, 14, 15, 0, tzinfo=PERTH))
+        late = datetime(2026, 7, 14, 12, 30, tzinfo=PERTH)
+        self.assertEqual(gold_alert.daemon_wake_time(late, None), datetime(2026, 7, 14, 15, 0, tzinfo=PERTH))
+
+    def test_daemon_runs_due_cycle_saves_state_and_stops_cleanly(self):
+        stop = threading.Event()
+        now = datetime(2026, 7, 14, 10, 5, tzinfo=PERTH)
+        with tempfile.TemporaryDirectory() as directory:
+            state = Path(directory) / "daemon.json"
+            gold_alert.save_daemon_state(datetime(2026, 7, 13, 15, 0, tzinfo=PERTH), state)
+            with (
+                patch.object(gold_alert, "DAEMON_STATE_PATH", state),
+                patch.object(gold_alert, "get_email_settings", return_value=("s@example.com", "", [])),
+                patch.object(gold_alert, "deliver_outbox", return_value=0),
+                patch.object(gold_alert, "save_http_cache"),
+                patch.object(gold_alert, "save_source_health"),
+                patch.object(gold_alert, "run_once", side_effect=lambda args: stop.set()) as run_once,
+            ):
+                cycles = gold_alert.run_daemon(MagicMock(), stop, clock=lambda: now)
+            self.assertEqual(cycles, 1)
+            run_once.assert_called_once()
+            self.assertEqual(gold_alert.load_daemon_state(state), datetime(2026, 7, 14, 10, 0, tzinfo=PERTH))
+
+    def test_failed_cycle_is_retried_with_backoff_before_its_slot_is_saved(self):
+        stop = threading.Event()
+        started = time.monotonic()
+        now = datetime(2026, 7, 14, 10, 5, tzinfo=PERTH)
+        outcomes = iter([RuntimeError("feed down"), RuntimeError("feed down"), None])
+        attempts = []
+
+        def run_once(args):
+            attempts.append(gold_alert.load_daemon_state(state))
+            outcome = next(outcomes)
+            if outcome is not None:
+                raise outcome
+            stop.set()
+
+        with tempfile.TemporaryDirectory() as directory:
+            state = Path(directory) / "daemon.json"
+            gold_alert.save_daemon_state(datetime(2026, 7, 13, 15, 0, tzinfo=PERTH), state)
+            with (
+                patch.object(gold_alert, "DAEMON_STATE_PATH", state),
+                patch.object(gold_alert, "DAEMON_RETRY_SECONDS", 0.02),
+                patch.object(gold_alert, "get_email_settings", return_value=("s@example.com", "", [])),
+                patch.object(gold_alert, "deliver_outbox", return_value=0),
+                patch.object(gold_alert, "save_http_cache"),
+                patch.object(gold_alert, "save_source_health"),
+                patch.object(gold_alert, "run_once", side_effect=run_once),
+                patch("builtins.print") as printed,
+            ):
+                cycles = gold_alert.run_daemon(
+                    MagicMock(), stop, clock=lambda: now + timedelta(seconds=time.monotonic() - started),
+                )
+            self.assertEqual(cycles, 3)
+            self.assertEqual(attempts, [datetime(2026, 7, 13, 15, 0, tzinfo=PERTH)] * 3)
+            self.assertEqual(gold_alert.load_daemon_state(state), datetime(2026, 7, 14, 10, 0, tzinfo=PERTH))
+        self.assertGreaterEqual(time.monotonic() - started, 0.06)
+        retries = [call.args[0] for call in printed.call_args_list if call.args[0].startswith("Retrying")]
+        self.assertEqual(len(retries), 2)
+
+
+class ImportTimeTests(unittest.TestCase):
+    def import_times(self, module):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        times = {}
+        for line in result.stderr.splitlines():
+            fields = line.removeprefix("import time:").split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                times[fields[2].strip()] = int(fields[1])
+        return times
+
+    def test_entry_points_start_without_heavy_dependencies(self):
+        for module in ("gold_alert", "record_purchase"):
+            with self.subTest(module=module):
+                times = self.import_times(module)
+                self.assertFalse(set(HEAVY_MODULES) & times.keys())
+                self.assertLess(times[module], IMPORT_BUDGET_MICROSECONDS)
+
 
 if __name__ == "__main__":
     unittest.main()
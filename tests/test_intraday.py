@@ -0,0 +1,142 @@
+import tempfile
+import threading
+import unittest
+from email import policy
+from email.parser import BytesParser
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import gold_alert
+import intraday
+
+
+START = pd.Timestamp("2026-07-14 01:00", tz="UTC")
+
+
+def bars(prices, first=0):
+    index = pd.DatetimeIndex([START + pd.Timedelta(minutes=first + number) for number in range(len(prices))])
+    fx_index = pd.DatetimeIndex([START - pd.Timedelta(minutes=5)])
+    return {
+        "gold": pd.Series(prices, index=index, dtype="float64"),
+        "aud_usd": pd.Series([0.65], index=fx_index),
+        "usd_cny": pd.Series([7.2], index=fx_index),
+    }
+
+
+class TickBufferTests(unittest.TestCase):
+    def test_buffer_keeps_the_latest_ticks_in_constant_memory(self):
+        buffer = intraday.TickBuffer(capacity=100)
+        for start in range(0, 5_000, 37):
+            times = np.arange(start, min(start + 37, 5_000))
+            buffer.push(times, np.repeat(times[:, None], len(intraday.TICK_FIELDS), axis=1))
+        times, values = buffer.window()
+        self.assertEqual(buffer.times.shape, (100,))
+        np.testing.assert_array_equal(times, np.arange(4_900, 5_000))
+        np.testing.assert_array_equal(values["spot_cny"], np.arange(4_900, 5_000))
+
+        buffer.push(np.array([4_999, 5_000]), np.full((2, len(intraday.TICK_FIELDS)), -1.0))
+        times, values = buffer.window()
+        self.assertEqual((len(buffer), buffer.last_ns), (100, 5_000))
+        np.testing.assert_array_equal(times[-3:], [4_998, 4_999, 5_000])
+        np.testing.assert_array_equal(values["gold_usd_oz"][-3:], [4_998, -1, -1])
+
+
+class IntradayMonitorTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patches = (
+            patch.object(gold_alert, "MA_STATE_PATH", Path(directory.name) / "moving_averages.json"),
+            patch.object(gold_alert, "load_portfolio", return_value=(5.0, 1190.0)),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        days = pd.date_range("2025-07-01", periods=250, freq="D", tz="UTC")
+        self.closes = pd.Series(3000.0, index=days)
+
+    def test_crossings_alert_after_debounce_and_respect_hysteresis(self):
+        monitor = intraday.IntradayMonitor(self.closes, capacity=60)
+        prices = [3000, 3000, 2840, 3000, 2840, 2840, 2855, 2860, 2900, 2900, 2990, 3020, 3020]
+        zones = []
+        for minute, price in enumerate(prices):
+            for snapshot in monitor.ingest(bars([price], minute)):
+                zones.append((minute, monitor.tracker.zone, round(snapshot.spot_aud, 2)))
+                latest = snapshot
+        self.assertEqual(zones, [
+            (5, "BUY ZONE", round(2840 / gold_alert.OUNCE_TO_GRAMS / 0.65, 2)),
+            (9, "WATCH", round(2900 / gold_alert.OUNCE_TO_GRAMS / 0.65, 2)),
+            (12, "WAIT", round(3020 / gold_alert.OUNCE_TO_GRAMS / 0.65, 2)),
+        ])
+        self.assertEqual(latest.portfolio_grams, 5.0)
+        self.assertAlmostEqual(latest.ma50_aud, 3000 / gold_alert.OUNCE_TO_GRAMS / 0.65)
+
+    def test_a_repolled_bar_does_not_confirm_a_crossing(self):
+        monitor = intraday.IntradayMonitor(self.closes)
+        self.assertEqual(monitor.ingest(bars([3000])), [])
+        self.assertEqual(monitor.ingest(bars([3000, 2845])), [])
+        self.assertEqual(monitor.ingest(bars([3000, 2840])), [])
+        self.assertEqual(len(monitor.buffer), 2)
+        np.testing.assert_array_equal(monitor.buffer.window()[1]["gold_usd_oz"], [3000, 2840])
+        alerts = monitor.ingest(bars([3000, 2840, 2840]))
+        self.assertEqual([alert.captured_at.strftime("%H:%M") for alert in alerts], ["09:02"])
+        self.assertEqual(monitor.tracker.zone, "BUY ZONE")
+
+    def test_first_poll_seeds_the_zone_without_replaying_the_day(self):
+        monitor = intraday.IntradayMonitor(self.closes)
+        self.assertEqual(monitor.ingest(bars([2840] * 30 + [3000] * 30)), [])
+        self.assertEqual(monitor.tracker.zone, "WAIT")
+        self.assertEqual(len(monitor.buffer), 60)
+        self.assertEqual(monitor.ingest(bars([3000] * 60)), [])
+        self.assertEqual(len(monitor.buffer), 60)
+
+    def test_loop_notifies_each_alert_and_stops(self):
+        monitor = intraday.IntradayMonitor(self.closes)
+        stop = threading.Event()
+        polls = iter([bars([3000], 0), bars([2840], 1), RuntimeError("feed down"), bars([2840], 2)])
+
+        def poll():
+            result = next(polls, None)
+            if result is None:
+                stop.set()
+                return bars([2840], 2)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        sent = []
+        with patch("builtins.print"):
+            alerts = intraday.run_intraday(stop, monitor, poll=poll, notify=sent.append, interval=0)
+        self.assertEqual(alerts, 1)
+        self.assertEqual(sent[0].captured_at.strftime("%H:%M"), "09:02")
+
+    def test_alert_email_describes_the_signal_change_only(self):
+        monitor = intraday.IntradayMonitor(self.closes)
+        monitor.ingest(bars([3000]))
+        alert = monitor.ingest(bars([2840, 2840], 1))[0]
+        recipients = [("me@example.com", "Bilingual"), ("family@example.com", "Mandarin")]
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(gold_alert, "OUTBOX_DIR", Path(directory) / "outbox"), \
+                patch.object(gold_alert, "DELIVERY_LEDGER_PATH", Path(directory) / "ledger.jsonl"), \
+                patch.object(gold_alert, "get_email_settings", return_value=("me@example.com", "pw", recipients)), \
+                patch.object(gold_alert, "deliver_outbox", return_value=0):
+            intraday.send_alert(alert)
+            intraday.send_alert(alert)
+            messages = [
+                BytesParser(policy=policy.default).parsebytes(path.read_bytes())
+                for path in sorted((Path(directory) / "outbox").iterdir())
+            ]
+        self.assertEqual(len(messages), 2)
+        subjects = {message["To"]: message["Subject"] for message in messages}
+        self.assertEqual(subjects["me@example.com"], f"Gold signal now BUY ZONE: ${alert.spot_aud:,.2f}/g")
+        self.assertIn("黄金信号", subjects["family@example.com"])
+        body = next(message for message in messages if message["To"] == "me@example.com").get_content()
+        self.assertNotIn("Perth Mint", body)
+        self.assertNotIn("Unavailable", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
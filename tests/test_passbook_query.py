@@ -0,0 +1,112 @@
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import gold_alert
+import passbook_query
+import passbook_store
+
+
+def store_rows(store, start, count, seed=3):
+    rng = np.random.default_rng(seed)
+    moments = [start + timedelta(hours=5 * number) for number in range(count)]
+    spot = 150 + np.cumsum(rng.normal(0, 0.5, count))
+    pm_1g = spot * 1.15
+    pm_1g[rng.random(count) < 0.3] = np.nan
+    store.append_rows({
+        "captured_at": [passbook_store.timestamp_ns(moment) for moment in moments],
+        "spot_aud": spot,
+        "pm_1g": pm_1g,
+    })
+    return moments, spot, pm_1g
+
+
+class PassbookQueryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name) / "passbook"
+        self.store = passbook_store.PassbookStore(self.path)
+        self.start = datetime(2026, 1, 1, 1, 0, tzinfo=gold_alert.PERTH_TIMEZONE)
+        self.moments, self.spot, self.pm_1g = store_rows(self.store, self.start, 1_500)
+
+    def frame(self):
+        index = pd.DatetimeIndex(self.moments).tz_convert(gold_alert.PERTH_TIMEZONE).tz_localize(None)
+        return pd.DataFrame({"spot_aud": self.spot, "pm_1g": self.pm_1g}, index=index)
+
+    def test_range_uses_the_sorted_index(self):
+        query = passbook_query.PassbookQuery(self.path)
+        window = query.range(date(2026, 2, 1), datetime(2026, 2, 8, 12, 0), ("spot_aud",))
+        expected = self.frame().loc["2026-02-01":"2026-02-08 11:59", "spot_aud"]
+        np.testing.assert_array_equal(window["spot_aud"], expected.to_numpy())
+        self.assertEqual(len(query.range(date(2027, 1, 1))["spot_aud"]), 0)
+
+    def test_resample_matches_pandas(self):
+        query = passbook_query.PassbookQuery(self.path)
+        frame = self.frame()
+        rules = {"D": "D", "W": "W-SUN", "M": "MS"}
+        for freq, rule in rules.items():
+            for agg, column in (("mean", "spot_aud"), ("max", "pm_1g"), ("first", "pm_1g"), ("last", "spot_aud")):
+                with self.subTest(freq=freq, agg=agg):
+                    labels, values = query.resample(freq, agg, column)
+                    expected = getattr(frame[column].resample(rule), agg)().dropna()
+                    if freq == "W":
+                        expected.index = expected.index - pd.Timedelta(days=6)
+                    present = ~np.isnan(values)
+                    np.testing.assert_array_equal(labels[present], expected.index.to_numpy().astype("datetime64[D]"))
+                    np.testing.assert_allclose(values[present], expected.to_numpy())
+        with self.assertRaisesRegex(ValueError, "Frequency"):
+            query.resample("Q", "mean", "spot_aud")
+
+    def test_appended_rows_only_recompute_the_last_bucket(self):
+        passbook_query.PassbookQuery(self.path).refresh(freqs=("M",))
+        saved = (self.path / "rollup_M.npz").read_bytes()
+        store_rows(passbook_store.PassbookStore(self.path), self.moments[-1] + timedelta(hours=5), 200, seed=4)
+
+        with patch.object(passbook_query, "compute_rollup", wraps=passbook_query.compute_rollup) as compute:
+            extended = passbook_query.PassbookQuery(self.path).rollup("M")
+        self.assertGreater(compute.call_args.args[2], 1_300)
+        self.assertEqual((self.path / "rollup_M.npz").read_bytes(), saved)
+        full = passbook_query.compute_rollup(passbook_store.open_store(self.path), "M")
+        np.testing.assert_array_equal(extended.labels, full.labels)
+        np.testing.assert_array_equal(extended.starts, full.starts)
+        for key, values in full.stats.items():
+            np.testing.assert_allclose(extended.stats[key], values, err_msg=key)
+
+        (self.path / passbook_store.SCHEMA_NAME).unlink()
+        rebuilt = passbook_store.PassbookStore(self.path)
+        store_rows(rebuilt, self.start, 10, seed=9)
+        with patch.object(passbook_query, "compute_rollup", wraps=passbook_query.compute_rollup) as compute:
+            self.assertEqual(passbook_query.PassbookQuery(self.path).rollup("M").rows, 10)
+        self.assertEqual(compute.call_args.args[2:], ())
+
+    def test_reading_never_writes_and_refresh_imports_an_empty_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            passbook = root / "gold_passbook.csv"
+            passbook.write_text(
+                "Date,Spot_AUD_g\n2026-07-14 10:00,150\n2026-07-14 15:00,152\n2026-07-15 10:00,151\n",
+                encoding="utf-8",
+            )
+            query = passbook_query.PassbookQuery(root / "store")
+            self.assertEqual(query.daily_series()[1].tolist(), [])
+            self.assertEqual(sorted(path.name for path in (root / "store").glob("rollup_*")), [])
+
+            query.refresh(passbook)
+            self.assertEqual(query.daily_series()[1].tolist(), [152.0, 151.0])
+            self.assertEqual(
+                sorted(path.name for path in (root / "store").glob("rollup_*")),
+                ["rollup_D.npz", "rollup_M.npz", "rollup_W.npz"],
+            )
+            reread = passbook_query.PassbookQuery(root / "store")
+            reread.rollup("D")
+            self.assertEqual(reread.unsaved, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import gold_alert
+import passbook_store
+
+
+def snapshot(minute=0, second=0, **changes):
+    values = {
+        "captured_at": datetime(2026, 7, 14, 10, minute, second, tzinfo=gold_alert.PERTH_TIMEZONE),
+        "spot_aud": 150.0, "spot_cny": 700.0, "daily_change_pct": 0.4, "ma50_aud": 149.0, "ma200_aud": 140.0,
+        "pm_1g": 180.0, "pm_5g": 800.0, "taobao_5g_bean_cny": 4_410.0, "portfolio_grams": 5.0,
+        "portfolio_cost_aud": 1_190.0,
+    }
+    return gold_alert.MarketSnapshot(**{**values, **changes})
+
+
+class PassbookStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = Path(self.directory.name)
+        self.store_path = self.root / "passbook"
+
+    def test_snapshots_are_stored_with_types_and_nan_for_missing_values(self):
+        store = passbook_store.PassbookStore(self.store_path)
+        store.append_snapshot(snapshot())
+        store.append_snapshot(snapshot(5, spot_aud=151.5, pm_5g=None))
+
+        columns = passbook_store.open_store(self.store_path)
+        self.assertIsInstance(columns["spot_aud"], np.memmap)
+        self.assertEqual(columns["captured_at"].dtype, np.dtype("int64"))
+        self.assertEqual(
+            columns["captured_at"].view("datetime64[ns]").astype(str).tolist(),
+            ["2026-07-14T02:00:00.000000000", "2026-07-14T02:05:00.000000000"],
+        )
+        self.assertEqual(columns["spot_aud"].tolist(), [150.0, 151.5])
+        self.assertEqual(columns["pm_5g"][0], 800.0)
+        self.assertTrue(np.isnan(columns["pm_5g"][1]))
+        self.assertTrue(np.isnan(columns["taobao_1g_cny"]).all())
+        self.assertEqual(columns["portfolio_cost_aud"].tolist(), [1_190.0, 1_190.0])
+
+    def test_first_mirror_backfills_earlier_csv_rows(self):
+        passbook = self.root / "gold_passbook.csv"
+        passbook.write_text(
+            ",".join(gold_alert.PASSBOOK_COLUMNS) + "\n"
+            "2026-07-13 10:00,148.5,690,148,139,N/A,903,N/A\n"
+            "2026-07-14 10:00,150.0,700.0,149.0,140.0,180.0,N/A,N/A\n",
+            encoding="utf-8",
+        )
+        passbook_store.mirror_snapshot(snapshot(second=37), self.store_path, passbook)
+        passbook_store.mirror_snapshot(snapshot(5), self.store_path, passbook)
+
+        names = ("captured_at", "spot_aud", "pm_1g", "pm_5g", "taobao_1g_cny")
+        columns = passbook_store.open_store(self.store_path, names)
+        self.assertEqual(columns["spot_aud"].tolist(), [148.5, 150.0, 150.0])
+        self.assertEqual(
+            columns["captured_at"][1], passbook_store.timestamp_ns(snapshot(second=37).captured_at),
+        )
+        self.assertTrue(np.isnan(columns["pm_1g"][0]))
+        self.assertTrue(np.isnan(columns["pm_5g"][0]))
+        self.assertEqual(columns["pm_5g"][1], 800.0)
+        self.assertEqual(columns["taobao_1g_cny"][0], 903.0)
+
+    def test_partial_writes_beyond_the_recorded_rows_are_discarded(self):
+        store = passbook_store.PassbookStore(self.store_path)
+        store.append_snapshot(snapshot())
+        with store.column_path("spot_aud").open("ab") as handle:
+            handle.write(b"\x00" * 5)
+        reopened = passbook_store.PassbookStore(self.store_path)
+        reopened.append_snapshot(snapshot(5, spot_aud=152.0))
+        self.assertEqual(passbook_store.open_store(self.store_path)["spot_aud"].tolist(), [150.0, 152.0])
+        self.assertEqual(passbook_store.open_store(self.root / "missing")["spot_aud"].size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
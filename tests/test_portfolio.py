@@ -0,0 +1,129 @@
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+import gold_alert
+import portfolio
+
+
+def write_ledger(directory, rows, header="Date,Item,Grams,Total_Paid_AUD,Source,Notes"):
+    path = Path(directory) / "holdings.csv"
+    path.write_text(header + "\n" + "".join(row + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def fifo_loop(rows):
+    lots = []
+    realized = 0.0
+    for day, grams, paid in sorted(rows, key=lambda row: row[0]):
+        if grams > 0:
+            lots.append([grams, paid / grams])
+            continue
+        remaining = -grams
+        basis = 0.0
+        while remaining > 1e-12:
+            taken = min(lots[0][0], remaining)
+            basis += taken * lots[0][1]
+            lots[0][0] -= taken
+            remaining -= taken
+            if lots[0][0] <= 1e-12:
+                lots.pop(0)
+        realized += paid - basis
+    return sum(grams for grams, _ in lots), sum(grams * unit for grams, unit in lots), realized
+
+
+class FifoTests(unittest.TestCase):
+    def test_sales_match_a_lot_by_lot_fifo_loop(self):
+        rng = np.random.default_rng(5)
+        rows = []
+        held = 0.0
+        for day in range(2_000):
+            when = f"{np.datetime64('2020-01-01') + day}"
+            if held > 10 and rng.random() < 0.3:
+                grams = float(rng.uniform(0.5, held / 2))
+                rows.append((when, -grams, grams * 240.0))
+                held -= grams
+            else:
+                grams = float(rng.choice([1, 2, 5, 10]))
+                rows.append((when, grams, grams * float(rng.uniform(200, 260))))
+                held += grams
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_ledger(directory, [f"{day},Gold,{grams!r},{paid!r},Taobao," for day, grams, paid in rows])
+            book = portfolio.load_ledger(path)
+
+        grams, cost, realized = fifo_loop(rows)
+        self.assertAlmostEqual(book.total_open_grams, grams, places=6)
+        self.assertAlmostEqual(book.total_open_cost, cost, places=4)
+        self.assertAlmostEqual(book.realized_aud, realized, places=4)
+        self.assertTrue(np.all(np.diff(book.open_grams > 0) >= 0))
+
+    def test_selling_more_than_was_held_on_the_sale_date_is_rejected(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_ledger(directory, [
+                "2026-03-10,Bar,5,1190,Taobao,",
+                "2026-03-12,Sold bar,-6,1500,Taobao,",
+                "2026-03-20,Bar,5,1200,Taobao,",
+            ])
+            with self.assertRaisesRegex(RuntimeError, "exceeds the 5g held"):
+                portfolio.load_ledger(path)
+
+    def test_alert_totals_exclude_sold_grams(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_ledger(directory, [
+                "2026-03-10,Lingfeng 5g gold bar,5,1190,Taobao,Stored in China",
+                "2026-05-01,Perth Mint 5g,5,1300,Perth Mint,",
+                "2026-06-01,Sold part of the Taobao bar,-2,520,Taobao,",
+                "not a date,Broken row,abc,12,Taobao,",
+            ])
+            grams, cost = gold_alert.load_portfolio(path)
+        self.assertEqual(grams, 8)
+        self.assertAlmostEqual(cost, 1190 * 3 / 5 + 1300)
+
+
+class ValuationTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.book = portfolio.load_ledger(write_ledger(self.directory.name, [
+            "2026-03-10,Lingfeng 5g gold bar,5,1190,Taobao,Stored in China; shipping and tax excluded",
+            "2026-04-02,Lingfeng 1g gold bar,1,250,Taobao,",
+            "2026-05-01,Perth Mint 5g,5,1300,Perth Mint,Stored in Perth vault",
+            "2026-06-01,Sold Taobao 1g,-1,260,Taobao,",
+        ]))
+
+    def test_lots_are_valued_in_one_pass(self):
+        purchase_spot = portfolio.purchase_spots(
+            self.book, ["2026-03-09", "2026-04-30"], np.array([220.0, 240.0]),
+        )
+        np.testing.assert_array_equal(purchase_spot, [220.0, 220.0, 240.0])
+        valuation = portfolio.value_lots(self.book, 250.0, date(2026, 7, 14), purchase_spot)
+
+        np.testing.assert_allclose(self.book.open_grams, [4, 1, 5])
+        np.testing.assert_allclose(valuation.value, [1000, 250, 1250])
+        np.testing.assert_allclose(valuation.unrealized, [1000 - 952, 0, -50])
+        np.testing.assert_allclose(valuation.break_even, [238, 250, 260])
+        np.testing.assert_allclose(valuation.holding_days, [126, 103, 74])
+        np.testing.assert_allclose(valuation.premium_recovered_pct, [30 / 18 * 100, 100, 50])
+        self.assertAlmostEqual(self.book.realized_aud, 260 - 238)
+        self.assertAlmostEqual(self.book.break_even_spot, (952 + 250 + 1300) / 10)
+
+    def test_allocations_group_open_lots(self):
+        valuation = portfolio.value_lots(self.book, 250.0, date(2026, 7, 14))
+        by_location = portfolio.allocation(self.book, valuation, "location")
+        self.assertEqual([(row.label, row.lots, row.grams) for row in by_location], [
+            ("China", 2, 5.0), ("Perth Vault", 1, 5.0),
+        ])
+        self.assertAlmostEqual(sum(row.share_pct for row in by_location), 100)
+        by_currency = {row.label: row.value for row in portfolio.allocation(self.book, valuation, "currency")}
+        self.assertEqual(by_currency, {"CNY": 1250.0, "AUD": 1250.0})
+        by_size = {row.label: row.grams for row in portfolio.allocation(self.book, valuation, "size")}
+        self.assertEqual(by_size, {"5g": 9.0, "1g": 1.0})
+        with self.assertRaisesRegex(ValueError, "grouped by"):
+            portfolio.allocation(self.book, valuation, "retailer")
+
+
+if __name__ == "__main__":
+    unittest.main()
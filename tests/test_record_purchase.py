@@ -1,6 +1,7 @@
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import record_purchase
 
@@ -48,6 +49,87 @@ class RecordPurchaseTests(unittest.TestCase):
             with self.assertRaisesRegex(ValueError, "greater than zero"):
                 record_purchase.append_purchase(path, "2026-08-20", "Gold", "0", "500", "Other")
 
+    def test_new_rows_are_appended_without_rewriting_the_ledger(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "holdings.csv"
+            existing = (
+                "Date,Item,Grams,Total_Paid_AUD,Source,Notes\n"
+                "2026-03-10,Lingfeng 5g gold bar,5,1190.00,Taobao,Stored in China"
+            )
+            path.write_text(existing, encoding="utf-8")
+            with patch.object(record_purchase, "read_existing", side_effect=AssertionError("rewrote ledger")):
+                self.assertTrue(record_purchase.append_purchase(path, "2026-08-20", "Gold bar", "2", "500", "Other"))
+                self.assertFalse(record_purchase.append_purchase(
+                    path, "2026-03-10", "Lingfeng 5g gold bar", "5.0", "1190", "Taobao", "Stored in China",
+                ))
+            self.assertEqual(
+                path.read_text(encoding="utf-8"),
+                existing + "\n2026-08-20,Gold bar,2,500.00,Other,\n",
+            )
+
+    def test_sales_are_recorded_only_against_grams_held_at_that_date(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "holdings.csv"
+            record_purchase.append_purchase(path, "2026-03-10", "Gold bar", "5", "1190", "Taobao")
+            record_purchase.append_purchase(path, "2026-08-20", "Gold bar", "2", "500", "Other")
+            self.assertTrue(record_purchase.append_sale(path, "2026-06-01", "Gold bar", "3", "800", "Other"))
+            self.assertEqual(path.read_text(encoding="utf-8").splitlines()[-1], "2026-06-01,Gold bar,-3,800.00,Other,")
+
+            with self.assertRaisesRegex(ValueError, "Sale of 3g on 2026-06-02 exceeds the 2g held"):
+                record_purchase.append_sale(path, "2026-06-02", "Gold bar", "3", "800", "Other")
+            with self.assertRaisesRegex(ValueError, "Sale of 3g on 2026-06-01 exceeds the 2g held"):
+                record_purchase.append_sale(path, "2026-04-01", "Gold bar", "3", "500", "Other")
+            with self.assertRaisesRegex(ValueError, "greater than zero"):
+                record_purchase.append_sale(path, "2026-09-01", "Gold bar", "-1", "500", "Other")
+            self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 4)
+            self.assertTrue(record_purchase.append_sale(path, "2026-09-01", "Gold bar", "4", "1100", "Other"))
+
+
+class ImportPurchasesTests(unittest.TestCase):
+    def test_bulk_import_adds_valid_rows_and_reports_rejected_ones(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "holdings.csv"
+            record_purchase.append_purchase(path, "2026-08-20", "Gold bar", "2", "500", "Taobao", "")
+            export = Path(directory) / "orders.csv"
+            lines = ["Date,Item,Grams,Total_Paid_AUD,Notes,Order_ID"]
+            lines += [f"2025-01-{day % 28 + 1:02d},Bean {day},1,{230 + day}.50,,A{day}" for day in range(3_000)]
+            lines += [
+                "2026-08-20,Gold bar,2,500,,dup-ledger",
+                "2025-01-01,Bean 0,1,230.5,,dup-import",
+                "01/02/2025,Bean,1,230,,bad-date",
+                "2025-01-02,Bean,-1,230,,bad-grams",
+            ]
+            export.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            result = record_purchase.import_purchases(path, export, default_source="Taobao")
+            self.assertEqual((result.added, result.duplicates), (3_000, 2))
+            self.assertEqual([(line, error) for line, error, _ in result.rejected], [
+                (3_004, "Purchase date must use YYYY-MM-DD"),
+                (3_005, "Grams must be greater than zero"),
+            ])
+            rows = path.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(len(rows), 3_002)
+            self.assertEqual(rows[2], "2025-01-01,Bean 0,1,230.50,Taobao,")
+
+            rejects = Path(directory) / "rejected.csv"
+            record_purchase.write_rejects(rejects, result.rejected)
+            self.assertEqual(
+                rejects.read_text(encoding="utf-8").splitlines()[:2],
+                ["Line,Error,Date,Item,Grams,Total_Paid_AUD,Notes,Order_ID",
+                 "3004,Purchase date must use YYYY-MM-DD,01/02/2025,Bean,1,230,,bad-date"],
+            )
+
+            again = record_purchase.import_purchases(path, export, default_source="Taobao")
+            self.assertEqual((again.added, again.duplicates), (0, 3_002))
+
+    def test_import_requires_purchase_columns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            export = Path(directory) / "orders.csv"
+            export.write_text("Date,Item,Price\n2025-01-01,Bar,230\n", encoding="utf-8")
+            with self.assertRaisesRegex(ValueError, "Grams, Total_Paid_AUD"):
+                record_purchase.import_purchases(Path(directory) / "holdings.csv", export)
+            self.assertFalse((Path(directory) / "holdings.csv").exists())
+
 
 if __name__ == "__main__":
     unittest.main()
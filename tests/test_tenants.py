@@ -0,0 +1,100 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from email import policy
+from email.parser import BytesParser
+from pathlib import Path
+from unittest.mock import patch
+
+import gold_alert
+import passbook_store
+import tenants
+
+
+def snapshot():
+    return gold_alert.MarketSnapshot(
+        captured_at=datetime(2026, 7, 14, 10, 0, tzinfo=gold_alert.PERTH_TIMEZONE),
+        spot_aud=96.0, spot_cny=450.0, daily_change_pct=-0.8, ma50_aud=100.0, ma200_aud=98.0,
+        pm_1g=120.0, pm_5g=560.0, portfolio_grams=5.0, portfolio_cost_aud=1190.0,
+    )
+
+
+class TenantTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.users = self.root / "users"
+        patcher = patch.object(gold_alert, "DELIVERY_LEDGER_PATH", self.root / "ledger.jsonl")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_user(self, user_id, holdings=None, rules=None, **profile):
+        directory = self.users / user_id
+        directory.mkdir(parents=True)
+        (directory / tenants.PROFILE_NAME).write_text(json.dumps(profile), encoding="utf-8")
+        if holdings:
+            (directory / tenants.HOLDINGS_NAME).write_text(
+                "Date,Item,Grams,Total_Paid_AUD,Source,Notes\n" + "".join(row + "\n" for row in holdings),
+                encoding="utf-8",
+            )
+        if rules:
+            (directory / tenants.RULES_NAME).write_text("Rule_ID,Condition\n" + rules + "\n", encoding="utf-8")
+
+    def queued(self, outbox):
+        messages = [BytesParser(policy=policy.default).parsebytes(path.read_bytes()) for path in outbox.glob("*.eml")]
+        return {message["To"]: message for message in messages}
+
+    def test_each_user_gets_their_own_portfolio_language_and_threshold(self):
+        self.add_user("alice", ["2026-03-10,1g bar,2,200,Perth Mint,"], email="alice@example.com", dip_pct=3)
+        self.add_user("bo", email="bo@example.com", mode="mandarin")
+        self.add_user(
+            "chen", ["2026-03-10,5g bar,5,600,Taobao,"], "spot,spot_aud < 97", email="chen@example.com",
+        )
+        with patch.object(passbook_store, "open_store", return_value={"captured_at": []}), \
+                patch.object(tenants, "USERS_PER_WORKER", 1):
+            pooled = tenants.enqueue_user_reports(snapshot(), "Open", "owner@example.com", self.users,
+                                                  self.root / "pooled", workers=2)
+            inline = tenants.enqueue_user_reports(snapshot(), "Open", "owner@example.com", self.users,
+                                                  self.root / "inline", workers=1)
+            again = tenants.enqueue_user_reports(snapshot(), "Open", "owner@example.com", self.users,
+                                                 self.root / "inline", workers=1)
+        self.assertEqual((pooled, inline, again), (4, 4, 0))
+
+        messages = self.queued(self.root / "pooled")
+        self.assertEqual(sorted(messages), ["alice@example.com", "bo@example.com", "chen@example.com"])
+        self.assertIn("Gold BUY ZONE", messages["alice@example.com"]["Subject"])
+        self.assertIn("at least 3% below", messages["alice@example.com"].get_body(("plain",)).get_content())
+        self.assertIn("黄金关注", messages["bo@example.com"]["Subject"])
+        self.assertIn("Gold WATCH", messages["chen@example.com"]["Subject"])
+        chen = messages["chen@example.com"].get_body(("plain",)).get_content()
+        self.assertIn("A$600.00", chen)
+        self.assertNotIn("A$1,190.00", chen)
+        self.assertEqual(
+            {path.name for path in (self.root / "pooled").iterdir()},
+            {path.name for path in (self.root / "inline").iterdir()},
+        )
+
+    def test_profiles_are_validated(self):
+        self.assertEqual(tenants.load_users(self.users), [])
+        self.add_user("alice", email="alice@example.com")
+        self.add_user("dana", email="dana@example.com", mode="Klingon")
+        self.add_user("eve", email="eve@example.com", dip_pct=150)
+        (self.users / "fay").mkdir()
+        (self.users / "fay" / tenants.PROFILE_NAME).write_text("{not json", encoding="utf-8")
+        with self.assertRaisesRegex(RuntimeError, "dana.*mode must be one of"):
+            tenants.load_profile(self.users / "dana")
+
+        with patch("builtins.print") as printed, \
+                patch.object(passbook_store, "open_store", return_value={"captured_at": []}):
+            queued = tenants.enqueue_user_reports(snapshot(), "Open", "owner@example.com", self.users,
+                                                  self.root / "outbox", workers=1)
+        self.assertEqual(queued, 1)
+        self.assertEqual(list(self.queued(self.root / "outbox")), ["alice@example.com"])
+        skipped = [call.args[0].split(":")[0] for call in printed.call_args_list]
+        self.assertEqual(skipped, ["Skipping user dana", "Skipping user eve", "Skipping user fay"])
+
+
+if __name__ == "__main__":
+    unittest.main()